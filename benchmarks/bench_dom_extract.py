@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import time
+import argparse
+import platform
+from pathlib import Path
+from datetime import datetime
+
+BENCH_DIR = Path(__file__).parent.resolve()
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from dom_extract import (
+    RESULT_PAGE_JS, VIEW_PAGE_JS, NEXT_PAGE_SELECTOR,
+    parse_result_page, parse_view_page, result_row,
+)
+from bench_extract import git_revision
+
+FIXTURES = BENCH_DIR / "fixtures"
+RESULTS_HTML = FIXTURES / "crs_results.html"
+VIEW_HTML = FIXTURES / "crs_view.html"
+RESULTS = BENCH_DIR / "dom_extract_results.jsonl"
+
+VIEW_SELECTORS = {
+    "doc_number": "#divcol1 table tbody tr:nth-child(1) td",
+    "doc_type": "#divcol1 table tbody tr:nth-child(2) td",
+    "date_recorded": "#divcol1 table tbody tr:nth-child(3) td",
+    "address": "#divcol1 table tbody tr:nth-child(6) td span",
+}
+
+# =========================
+# PER-ELEMENT EXTRACTION (BASELINE — ONE ROUND TRIP PER CALL)
+# =========================
+
+class CallCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, result):
+        self.calls += 1
+        return result
+
+
+def legacy_result_page(page, count):
+    # Same calls as the previous phase 1 loop; whitespace collapsed like
+    # the bulk paths, so "matches" compares content only
+    rows = []
+    for row in count(page.query_selector_all("table tbody tr")):
+        cells = count(row.query_selector_all("td"))
+        row_data = []
+        for i, cell in enumerate(cells):
+            if i == 1:
+                link = count(cell.query_selector("a"))
+                href = count(link.get_attribute("href")) if link else ""
+                row_data.append(href or "")
+            else:
+                row_data.append(" ".join(count(cell.inner_text()).split()))
+        rows.append(row_data)
+    has_next = count(page.query_selector(NEXT_PAGE_SELECTOR)) is not None
+    return rows, has_next
+
+
+def bulk_result_page(snapshot):
+    return [result_row(cells, "") for cells in snapshot["rows"]], snapshot["has_next"]
+
+
+def legacy_view_page(page, count):
+    # Same calls as the previous phase 2 scrape_view
+    fields = {}
+    for name, selector in VIEW_SELECTORS.items():
+        el = count(page.query_selector(selector))
+        fields[name] = " ".join(count(el.inner_text()).split()) if el else ""
+    iframe = count(page.query_selector("iframe#iframe"))
+    fields["pdf_src"] = (count(iframe.get_attribute("src")) or "") if iframe else ""
+    return fields
+
+# =========================
+# MEASURE
+# =========================
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - start) / repeat * 1000, out
+
+
+def bench_parser(html, parse, repeat):
+    ms, out = timed(lambda: parse(html), repeat)
+    return {"ms_per_page": round(ms, 3), "round_trips": 1}, out
+
+
+def bench_browser(results_html, view_html, repeat):
+    from playwright.sync_api import sync_playwright
+
+    stats = {}
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+
+        for label, html, js, legacy, parse, shape in (
+            ("results", results_html, RESULT_PAGE_JS, legacy_result_page, parse_result_page, bulk_result_page),
+            ("view", view_html, VIEW_PAGE_JS, legacy_view_page, parse_view_page, dict),
+        ):
+            page.set_content(html)
+
+            counter = CallCounter()
+            ms, expected = timed(lambda: legacy(page, counter), repeat)
+            stats[f"{label}/per_element"] = {
+                "ms_per_page": round(ms, 3), "round_trips": counter.calls // repeat
+            }
+
+            ms, snapshot = timed(lambda: page.evaluate(js), repeat)
+            stats[f"{label}/evaluate"] = {
+                "ms_per_page": round(ms, 3), "round_trips": 1, "matches": shape(snapshot) == expected
+            }
+
+            ms, parsed = timed(lambda: parse(page.content()), repeat)
+            stats[f"{label}/content_parse"] = {
+                "ms_per_page": round(ms, 3), "round_trips": 1, "matches": shape(parsed) == expected
+            }
+
+        browser.close()
+    return stats
+
+# =========================
+# ENTRY POINT
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Phase 1/2 DOM extraction micro-benchmark")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--browser", action="store_true",
+                        help="Also time live Playwright extraction (needs chromium)")
+    parser.add_argument("--output", default=str(RESULTS))
+    args = parser.parse_args()
+
+    results_html = RESULTS_HTML.read_text(encoding="utf-8")
+    view_html = VIEW_HTML.read_text(encoding="utf-8")
+
+    stats = {}
+    stats["results/parser"], snapshot = bench_parser(results_html, parse_result_page, args.repeat * 10)
+    stats["view/parser"], _ = bench_parser(view_html, parse_view_page, args.repeat * 10)
+
+    # Round trips the per-element code makes on the results fixture: the rows
+    # and next-link queries, then per row a td query, one inner_text per cell
+    # and a query + get_attribute for the link cell
+    rows = snapshot["rows"]
+    stats["results/per_element_round_trips"] = 2 + sum(
+        1 + len(row) + (1 if len(row) > 1 and row[1]["href"] else 0) for row in rows
+    )
+
+    if args.browser:
+        stats.update(bench_browser(results_html, view_html, args.repeat))
+
+    for name, value in stats.items():
+        print(f"{name:34} {value}")
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "rows": len(rows),
+        "results": stats,
+    }
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"📄 Appended results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+BENCH_DIR = Path(__file__).parent.resolve()
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from field_extractor import extract_fields
+
+CORPUS = BENCH_DIR / "extract_corpus.jsonl"
+RESULTS = BENCH_DIR / "extract_results.jsonl"
+
+FIELDS = ("case", "amount", "address")
+
+# =========================
+# LEGACY EXTRACTORS (BASELINE — THREE FULL SCANS)
+# =========================
+
+def legacy_extract_fields(text):
+    pattern = re.compile(r"\b(20\d{2}|\d{2})[\s\-]*[A-Z]{1,10}[\s\-]*\d{2,8}\b")
+    candidates = [re.sub(r"[\s\-]+", "", m.group()) for m in pattern.finditer(text)]
+    case = (max(candidates, key=len), 0.95) if candidates else ("", 0.0)
+
+    amount = ("", 0.0)
+    for pat in (
+        r"(?:AMOUNT CLAIMED|CLAIMED AMOUNT|TOTAL AMOUNT)[^$0-9]{0,40}(\$?\s?[\d,]+\.\d{2})",
+        r"(\$[\d,]+\.\d{2})",
+    ):
+        m = re.search(pat, text)
+        if m:
+            val = m.group(1).replace("$", "").replace(",", "")
+            amount = (f"${float(val):,.2f}", 0.9)
+            break
+
+    m = re.compile(
+        r"\b\d{1,6}\s+[A-Z0-9 .,'\-]+?\s+"
+        r"(?:ST|STREET|AVE|AVENUE|RD|ROAD|DR|DRIVE|CT|COURT|BLVD|LN|WAY)\b"
+        r".{0,40}?\b[A-Z]{2}\s*\d{5}\b"
+    ).search(text)
+    address = (m.group(0).strip(), 0.9) if m else ("", 0.0)
+
+    return {"case": case, "amount": amount, "address": address}
+
+
+ENGINES = {
+    "single_pass": extract_fields,
+    "legacy": legacy_extract_fields,
+}
+
+# =========================
+# CORPUS
+# =========================
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def ocr_noise(size, rng):
+    # Word-like OCR garbage (watermarks, speckle, stamps) after normalization
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.,'-"
+    words = []
+    while size > 0:
+        word = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 9)))
+        words.append(word)
+        size -= len(word) + 1
+    return " ".join(words)
+
+
+def noisy_variant(sample, noise_kb, rng):
+    # Simulates the old triple-pass output wrapped in page noise
+    half = noise_kb * 512
+    text = " ".join([ocr_noise(half, rng)] + [sample["text"]] * 3 + [ocr_noise(half, rng)])
+    return {"id": sample["id"] + "+noise", "text": text, "expected": sample["expected"]}
+
+# =========================
+# MEASURE
+# =========================
+
+def run_engine(fn, samples, repeat):
+    hits = {f: 0 for f in FIELDS}
+    total_bytes = sum(len(s["text"]) for s in samples) * repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for s in samples:
+            fields = fn(s["text"])
+    elapsed = time.perf_counter() - start
+
+    for s in samples:
+        fields = fn(s["text"])
+        for f in FIELDS:
+            if fields[f][0] == s["expected"][f]:
+                hits[f] += 1
+
+    docs = len(samples) * repeat
+    return {
+        "docs_per_sec": round(docs / elapsed, 1),
+        "mb_per_sec": round(total_bytes / elapsed / 1e6, 2),
+        "accuracy": {f: round(hits[f] / len(samples), 3) for f in FIELDS},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+# =========================
+# ENTRY POINT
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Phase 3 field extractor benchmark")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--noise-kb", type=int, default=32)
+    parser.add_argument("--output", default=str(RESULTS))
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    rng = random.Random(1234)
+    workloads = {
+        "corpus": corpus,
+        "noisy": [noisy_variant(s, args.noise_kb, rng) for s in corpus],
+    }
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "samples": len(corpus),
+        "results": {},
+    }
+
+    for workload, samples in workloads.items():
+        repeat = args.repeat if workload == "corpus" else max(1, args.repeat // 20)
+        for name, fn in ENGINES.items():
+            stats = run_engine(fn, samples, repeat)
+            record["results"][f"{workload}/{name}"] = stats
+            print(f"{workload:7} {name:12} {stats['docs_per_sec']:>10} docs/s "
+                  f"{stats['mb_per_sec']:>8} MB/s  accuracy {stats['accuracy']}")
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"📄 Appended results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+from datetime import datetime, timedelta
+
+BENCH_DIR = Path(__file__).parent.resolve()
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import metrics
+from bench_extract import git_revision
+from fixture_server import start_server, search_documents, DOC_TYPES
+
+RESULTS = BENCH_DIR / "pipeline_results.jsonl"
+
+# =========================
+# CONFIG
+# =========================
+# All four phases, end to end, against the fixture server: run_phase1,
+# run_phase2, process_all_pdfs and run_phase4 in a scratch working
+# directory. Request rates and phase 4's jitter are lifted, so the numbers
+# are the pipeline's own cost rather than its politeness sleeps.
+# Needs what the phases need: Playwright's Chromium (phase 4) and
+# Tesseract + Poppler (phase 3).
+
+PHASES = ["phase1", "phase2", "phase3", "phase4"]
+DOC_TYPE = "LIS PENDENS FORECLOSURE"
+
+# =========================
+# WORKLOAD
+# =========================
+
+def first_day(days):
+    today = datetime.today()
+    return datetime(today.year, today.month, today.day) - timedelta(days=days)
+
+
+def expected_documents(days):
+    # What phase 1 should find: every fixture document since the first day
+    return sum(1 for _ in search_documents(DOC_TYPES[DOC_TYPE], first_day(days), datetime.today()))
+
+
+def load_phases(args):
+    # Imported from inside the working directory: phase 2 creates pdf/ there
+    import phase1_scraper as p1
+    import phase2_scraper as p2
+    import phase3_results as p3
+    import phase4_results as p4
+
+    p1.BACKFILL_START = first_day(args.days)
+    p1.RATE_PER_HOST = args.rate
+    p4.JITTER = (0, 0)
+
+    return {
+        "phase1": lambda: p1.run_phase1([DOC_TYPE], args.search_workers),
+        "phase2": lambda: p2.run_phase2(args.view_workers, args.rate, args.downloads),
+        "phase3": lambda: p3.process_all_pdfs(args.ocr_workers),
+        "phase4": lambda: asyncio.run(p4.run_phase4(args.contexts, args.rate)),
+    }
+
+# =========================
+# MEASURE
+# =========================
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is KB on Linux, bytes on macOS; a high-water mark
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(who).ru_maxrss / scale, 1)
+
+
+def series_name(row):
+    labels = ",".join(f"{k}={v}" for k, v in row["labels"].items())
+    return f"{row['name']}{{{labels}}}" if labels else row["name"]
+
+
+def measure_phase(name, fn, trace):
+    metrics.METRICS.reset()
+    if trace:
+        tracemalloc.start()
+
+    error = None
+    start = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+
+    snapshot = metrics.METRICS.snapshot(name)
+    records = sum(c["value"] for c in snapshot["counters"] if c["name"] == "records_total")
+    stats = {
+        "seconds": round(elapsed, 3),
+        "records": records,
+        "records_per_sec": round(records / elapsed, 2) if elapsed else None,
+        "failures": sum(c["value"] for c in snapshot["counters"] if c["name"] == "failures_total"),
+        "latency": {
+            series_name(h): {k: h[k] for k in ("count", "p50", "p90", "p99", "max")}
+            for h in snapshot["histograms"]
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        # Largest finished child: an OCR worker or the browser driver
+        "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+    if trace:
+        stats["python_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+        tracemalloc.stop()
+    if error:
+        stats["error"] = error
+
+    print(f"{name:7} {records:>6} records {elapsed:>8.2f}s {stats['records_per_sec'] or 0:>8} rec/s  "
+          f"failures {stats['failures']}  peak RSS {stats['peak_rss_mb']} MB"
+          f"{f'  ERROR {error}' if error else ''}")
+    return stats
+
+
+def run_scale(args):
+    server = start_server(latency=args.latency, pdf_pages=args.pdf_pages, scanned_every=args.scanned_every)
+    os.environ["CRS_BASE_URL"] = server.base_url
+    os.environ["CASE_SEARCH_URL"] = server.case_search_url
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    os.chdir(workdir)   # every phase keeps its state and PDFs relative to the cwd
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(terse=True),
+        "days": args.days,
+        "documents_expected": expected_documents(args.days),
+        "latency": args.latency,
+        "pdf_pages": args.pdf_pages,
+        "scanned_every": args.scanned_every,
+        "workers": {
+            "search": args.search_workers, "views": args.view_workers, "downloads": args.downloads,
+            "ocr": args.ocr_workers, "cases": args.contexts,
+        },
+        "phases": {},
+    }
+    print(f"🧪 {args.days} days, {record['documents_expected']} documents, working in {workdir}")
+
+    runs = load_phases(args)
+    start = time.perf_counter()
+    for name in args.phases:
+        record["phases"][name] = measure_phase(name, runs[name], args.tracemalloc)
+
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    record["requests"] = dict(server.requests)
+    record["peak_rss_mb"] = peak_rss_mb()
+    server.shutdown()
+
+    if not args.keep and not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return record
+
+# =========================
+# COMPARE WITH EARLIER RUNS
+# =========================
+
+def same_workload(a, b):
+    keys = ("days", "latency", "pdf_pages", "scanned_every", "workers")
+    return all(a.get(k) == b.get(k) for k in keys)
+
+
+def compare(record, output):
+    try:
+        with open(output, encoding="utf-8") as f:
+            earlier = [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return
+
+    previous = next((r for r in reversed(earlier) if same_workload(r, record)), None)
+    if previous is None:
+        return
+
+    print(f"\n📊 Against {previous['revision'] or '?'} ({previous['timestamp']}):")
+    for name, stats in record["phases"].items():
+        before = previous["phases"].get(name)
+        if not before or not before["seconds"] or not stats["seconds"]:
+            continue
+        speedup = before["seconds"] / stats["seconds"]
+        print(f"   {name}: {before['seconds']:.2f}s → {stats['seconds']:.2f}s ({speedup:.2f}x), "
+              f"peak RSS {before['peak_rss_mb']} → {stats['peak_rss_mb']} MB")
+
+# =========================
+# ENTRY POINT
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark (offline)")
+    parser.add_argument("--days", type=int, nargs="+", default=[14],
+                        help="Scales: days of recordings to search (about 6 documents a day); "
+                             "each scale runs in its own process")
+    parser.add_argument("--phases", nargs="+", choices=PHASES, default=PHASES)
+    parser.add_argument("--latency", type=float, default=0.0, help="Server seconds per response")
+    parser.add_argument("--pdf-pages", type=int, default=2, help="Pages per lis pendens PDF")
+    parser.add_argument("--scanned-every", type=int, default=4,
+                        help="Every Nth PDF is a scan without a text layer (0: none)")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Requests/sec ceiling per host")
+    parser.add_argument("--search-workers", type=int, default=4)
+    parser.add_argument("--view-workers", type=int, default=4)
+    parser.add_argument("--downloads", type=int, default=4)
+    parser.add_argument("--ocr-workers", type=int, default=2)
+    parser.add_argument("--contexts", type=int, default=4, help="Phase 4 browser contexts")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Also record each phase's Python heap peak (slows the run)")
+    parser.add_argument("--workdir", help="Run in (and keep) this directory instead of a temporary one")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directory")
+    parser.add_argument("--output", default=str(RESULTS))
+    args = parser.parse_args()
+    args.output = str(Path(args.output).resolve())
+
+    if len(args.days) > 1:
+        # Fresh process per scale: clean RSS high-water marks and module state
+        argv, skip = [], False
+        for a in sys.argv[1:]:
+            if a.startswith("--"):
+                skip = a == "--days"
+            if not skip:
+                argv.append(a)
+
+        for days in args.days:
+            subprocess.run([sys.executable, __file__, "--days", str(days), *argv], check=False)
+        return
+
+    args.days = args.days[0]
+    record = run_scale(args)
+    compare(record, args.output)
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"📄 Appended results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
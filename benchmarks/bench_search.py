@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+from pathlib import Path
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = Path(__file__).parent.resolve()
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from crs_http import CrsClient
+from dom_extract import result_row
+from rate_limit import HostRateLimiter
+from bench_extract import git_revision
+from fixture_server import start_server, search_documents, DOC_TYPES
+
+RESULTS = BENCH_DIR / "search_results.jsonl"
+
+# =========================
+# WORKLOAD
+# =========================
+
+def month_windows(months, doc_type):
+    # Same (doc type, from, to) windows as phase 1, oldest month last
+    end = datetime(2026, 6, 30)
+    windows = []
+    for _ in range(months):
+        start = end.replace(day=1)
+        windows.append((doc_type, f"{start:%m/%d/%Y}", f"{end:%m/%d/%Y}"))
+        end = start - timedelta(days=1)
+    return windows
+
+
+def expected_numbers(windows):
+    numbers = []
+    for doc_type, from_date, to_date in windows:
+        numbers += [d["doc_number"] for d in search_documents(
+            DOC_TYPES[doc_type],
+            datetime.strptime(from_date, "%m/%d/%Y"),
+            datetime.strptime(to_date, "%m/%d/%Y"),
+        )]
+    return numbers
+
+# =========================
+# ENGINES
+# =========================
+
+def http_window(base_url, limiter, window):
+    # What phase 1's HttpSearch does, minus the state store
+    client = CrsClient(base_url, limiter)
+    rows, pages = [], 1
+    try:
+        snapshot = client.search(base_url + "/Search", *window)
+        while True:
+            rows += [result_row(cells, base_url) for cells in snapshot["rows"] if len(cells) >= 3]
+            if not snapshot["has_next"]:
+                return rows, pages
+            snapshot = client.results(snapshot["next_href"])
+            pages += 1
+    finally:
+        client.close()
+
+
+def run_http(base_url, windows, workers, rate):
+    limiter = HostRateLimiter(rate, burst=workers)
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(lambda w: http_window(base_url, limiter, w), windows))
+    return [r for rows, _ in results for r in rows], sum(p for _, p in results)
+
+
+def run_browser(base_url, windows):
+    # Phase 1's Playwright engine, one context, windows in order
+    os.environ["CRS_BASE_URL"] = base_url
+    import phase1_scraper as p1
+    from playwright.async_api import async_playwright
+
+    async def scrape():
+        rows, pages = [], 0
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            engine = p1.BrowserSearch(await browser.new_context())
+            for window in windows:
+                snapshot = await engine.search(*window)
+                pages += 1
+                while True:
+                    rows += [result_row(c, base_url) for c in snapshot["rows"] if len(c) >= 3]
+                    if not snapshot["has_next"]:
+                        break
+                    snapshot = await engine.next_page(snapshot)
+                    pages += 1
+            await engine.close()
+            await browser.close()
+        return rows, pages
+
+    return asyncio.run(scrape())
+
+# =========================
+# MEASURE
+# =========================
+
+def measure(name, fn, expected, server):
+    server.requests.clear()
+    start = time.perf_counter()
+    rows, pages = fn()
+    elapsed = time.perf_counter() - start
+
+    numbers = [r[2] for r in rows]
+    stats = {
+        "pages": pages,
+        "rows": len(rows),
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 1),
+        "rows_per_sec": round(len(rows) / elapsed, 1),
+        "requests": sum(server.requests.values()),
+        "matches_fixture": numbers == expected,
+    }
+    print(f"{name:8} {pages:>5} pages {len(rows):>7} rows {elapsed:>8.2f}s "
+          f"{stats['pages_per_sec']:>8} pages/s  requests {stats['requests']}  "
+          f"rows match: {stats['matches_fixture']}")
+    return stats, rows
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux (this process only, not Chromium)
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+# =========================
+# ENTRY POINT
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Phase 1 search engine benchmark (offline)")
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--doc-type", default="LIS PENDENS FORECLOSURE", choices=list(DOC_TYPES))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1000.0, help="HTTP requests/sec ceiling")
+    parser.add_argument("--latency", type=float, default=0.0, help="Server seconds per response")
+    parser.add_argument("--browser", action="store_true", help="Also time the Playwright engine")
+    parser.add_argument("--output", default=str(RESULTS))
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+    windows = month_windows(args.months, args.doc_type)
+    expected = expected_numbers(windows)
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "windows": len(windows),
+        "latency": args.latency,
+        "workers": args.workers,
+        "results": {},
+    }
+
+    stats, http_rows = measure(
+        "http", lambda: run_http(server.base_url, windows, args.workers, args.rate), expected, server
+    )
+    record["results"]["http"] = stats
+
+    if args.browser:
+        stats, browser_rows = measure(
+            "browser", lambda: run_browser(server.base_url, windows), expected, server
+        )
+        stats["same_rows_as_http"] = browser_rows == http_rows
+        record["results"]["browser"] = stats
+        print(f"Same CSV rows from both engines: {stats['same_rows_as_http']}")
+
+    record["peak_rss_mb"] = peak_rss_mb()
+    server.shutdown()
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"📄 Appended results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+
+import re
+import time
+import zlib
+import hashlib
+import argparse
+import threading
+from html import escape
+from functools import lru_cache
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from synthetic_pdf import lis_pendens_pdf
+
+# =========================
+# CONFIG
+# =========================
+# Offline stand-in for the CRS search, view page and PDF endpoints and the
+# civil case search. Pages follow the markup of fixtures/crs_results.html
+# and crs_view.html; all data is synthetic and deterministic, so phases 1
+# and 2 (either engine) can be pointed at it with CRS_BASE_URL and phase 4
+# with CASE_SEARCH_URL.
+
+PAGE_SIZE = 50
+DOCS_PER_DAY = 6            # average; varies per day and type
+TOKEN = "fixture-token-5f2c"
+CASE_SEARCH_PATH = "/CivilCaseSearchAPI.aspx"
+
+DOC_TYPES = {
+    "LIS PENDENS FORECLOSURE": "LPF",
+    "MECHANICS LIEN": "ML",
+    "RELEASE": "REL",
+}
+
+# =========================
+# SYNTHETIC DATA
+# =========================
+
+def day_documents(code, day):
+    seed = zlib.crc32(f"{code}{day:%Y%m%d}".encode())
+    count = seed % (DOCS_PER_DAY * 2 + 1)
+    type_no = list(DOC_TYPES.values()).index(code) + 1
+
+    for n in range(count):
+        doc_no = f"{day:%y}{day.timetuple().tm_yday:03d}{type_no}{n:05d}"
+        yield {
+            "doc_number": doc_no,
+            "doc_id": zlib.crc32(doc_no.encode()) % 10_000_000,
+            "recorded": f"{day:%m/%d/%Y}",
+            "doc_type": next(k for k, v in DOC_TYPES.items() if v == code),
+            "grantor": "EXAMPLE MORTGAGE SERVICING LLC",
+            "grantee": f"DOE, JANE {chr(65 + n % 26)}",
+            "phone": f"(312) 555-{n % 10_000:04d}",
+            "pin": f"{seed % 33:02d}-{n % 36:02d}-{seed % 499:03d}-{n:03d}-0000",
+            "address": f"{100 + (seed + n) % 9000} N DEMO BLVD CHICAGO IL 606{n % 100:02d}",
+        }
+
+
+def find_document(doc_number):
+    # Document numbers encode yy + day of year + type + sequence
+    try:
+        day = datetime(2000 + int(doc_number[:2]), 1, 1) + timedelta(days=int(doc_number[2:5]) - 1)
+        code = list(DOC_TYPES.values())[int(doc_number[5]) - 1]
+    except (ValueError, IndexError):
+        return None
+    return next((d for d in day_documents(code, day) if d["doc_number"] == doc_number), None)
+
+
+def search_documents(code, from_date, to_date):
+    # Newest first, like the real result table
+    day = to_date
+    while day >= from_date:
+        yield from day_documents(code, day)
+        day -= timedelta(days=1)
+
+
+CASE_NUMBER = re.compile(r"^(20\d{2})-?CH-?(\d{5})$")
+
+# Docket endings, picked per case: judgment (GREEN), judgment then a
+# dismissal or a sale (RED), or nothing relevant yet (NEUTRAL)
+OUTCOMES = [
+    ["Judgment of Foreclosure"],
+    ["Judgment of Foreclosure", "Voluntary Dismissal"],
+    ["Judgment of Foreclosure", "Report of Sale"],
+    [],
+]
+
+
+def case_docket(case_number):
+    # -> [(MM/DD/YYYY, event, description), ...] oldest first, or None
+    m = CASE_NUMBER.match(case_number.strip().upper())
+    if not m:
+        return None
+
+    seed = zlib.crc32(m.group(0).replace("-", "").encode())
+    day = datetime(int(m.group(1)), 1, 1) + timedelta(days=seed % 200)
+    events = ["Complaint Filed", "Summons Issued", "Appearance Filed", "Motion Hearing"]
+    events += OUTCOMES[seed % len(OUTCOMES)]
+
+    docket = []
+    for n, event in enumerate(events):
+        day += timedelta(days=7 + (seed >> n) % 30)
+        docket.append((f"{day:%m/%d/%Y}", event, f"{event} - entered by the court"))
+    return docket
+
+# =========================
+# PAGES
+# =========================
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8" /><title>Search - Clerk Recordings Search (fixture)</title></head>
+<body>
+<div class="container body-content">
+    <a href="#advanced" id="advanced-toggle">Advanced Search</a>
+    <div class="accordion" id="advanced">
+        <div class="accordion-item">
+            <h2 class="accordion-header">
+                <button class="accordion-button collapsed" type="button"
+                        onclick="document.getElementById('collapse3').classList.add('show')">Document Type Search</button>
+            </h2>
+            <div id="collapse3" class="accordion-collapse collapse">
+                <form action="/Search/Result" method="post">
+                    <input name="__RequestVerificationToken" type="hidden" value="{token}" />
+                    <input name="SearchType" type="hidden" value="DocumentType" />
+                    <select id="DocumentType" name="DocumentType">
+                        <option value="">-- Select --</option>
+                        {options}
+                    </select>
+                    <input id="RecordedFromDate" name="RecordedFromDate" type="text" value="" />
+                    <input id="RecordedToDate" name="RecordedToDate" type="text" value="" />
+                    <button type="submit" class="btn btn-primary">Search</button>
+                </form>
+            </div>
+        </div>
+    </div>
+</div>
+</body>
+</html>
+"""
+
+RESULT_ROW = """            <tr>
+                <td><input type="checkbox" name="selected" value="{doc_number}" /></td>
+                <td><a href="/Document/Detail?dId={doc_id}&amp;hId=H{doc_number}" class="btn btn-link">View</a></td>
+                <td>{doc_number}</td>
+                <td>{recorded}</td>
+                <td>{recorded}</td>
+                <td>{doc_type}</td>
+                <td></td>
+                <td>{grantor}</td>
+                <td>{grantee}</td>
+                <td>{phone}</td>
+                <td><span class="parcel">{pin}</span><br />{address}</td>
+            </tr>
+"""
+
+RESULT_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8" /><title>Search Results - Clerk Recordings Search (fixture)</title></head>
+<body>
+<div class="container body-content">
+    <h2>Search Results</h2>
+    <table class="table table-striped table-hover">
+        <thead>
+            <tr><th></th><th></th><th>Doc Number</th><th>Recorded</th><th>Filed</th><th>Doc Type</th><th></th><th>Grantor</th><th>Grantee</th><th>Phone</th><th>PIN / Address</th></tr>
+        </thead>
+        <tbody>
+{rows}        </tbody>
+    </table>
+    <div class="pagination-container"><ul class="pagination">{pager}</ul></div>
+</div>
+</body>
+</html>
+"""
+
+
+VIEW_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8" /><title>Document Details - Clerk Recordings Search (fixture)</title></head>
+<body>
+<div class="container body-content">
+    <div class="row">
+        <div class="col-md-4" id="divcol1">
+            <h4>Document Information</h4>
+            <table class="table table-sm">
+                <tbody>
+                    <tr><th>Document Number</th><td>{doc_number}</td></tr>
+                    <tr><th>Document Type</th><td>{doc_type}</td></tr>
+                    <tr><th>Date Recorded</th><td>{recorded}</td></tr>
+                    <tr><th>Date Executed</th><td>{recorded}</td></tr>
+                    <tr><th>Number of Pages</th><td>1</td></tr>
+                    <tr><th>Address</th><td><span>{address}</span><br /><small>PIN {pin}</small></td></tr>
+                    <tr><th>Consideration Amount</th><td>$0.00</td></tr>
+                </tbody>
+            </table>
+        </div>
+        <div class="col-md-8" id="divcol2">
+            <iframe id="iframe" src="/Document/ViewPdf?dId={doc_id}&amp;hId=H{doc_number}" width="100%" height="900"></iframe>
+        </div>
+    </div>
+</div>
+</body>
+</html>
+"""
+
+CASE_SEARCH_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8" /><title>Civil Case Search (fixture)</title></head>
+<body>
+<form method="post" action="{path}" id="form1">
+    <input type="hidden" name="__VIEWSTATE" value="fixture" />
+    <label for="MainContent_txtCaseNumber">Case Number</label>
+    <input type="text" name="ctl00$MainContent$txtCaseNumber" id="MainContent_txtCaseNumber" value="{case_number}" />
+    <input type="submit" name="ctl00$MainContent$btnSearch" id="MainContent_btnSearch" value="Search" />
+</form>
+{results}
+</body>
+</html>
+"""
+
+DOCKET_ROW = """        <tr><td>{date}</td><td>{event}</td><td>{description}</td></tr>
+"""
+
+CHALLENGE_PAGE = """<!DOCTYPE html>
+<html><head><title>Just a moment...</title></head>
+<body><div class="cf-turnstile"></div><p>Checking your browser before accessing the site.</p></body>
+</html>
+"""
+
+
+def search_page():
+    options = "\n".join(
+        f'<option value="{code}">{escape(label)}</option>' for label, code in DOC_TYPES.items()
+    )
+    return SEARCH_PAGE.replace("{token}", TOKEN).replace("{options}", options)
+
+
+def result_page(query, page_size=PAGE_SIZE):
+    code = query.get("DocumentType", "")
+    from_date = datetime.strptime(query["RecordedFromDate"], "%m/%d/%Y")
+    to_date = datetime.strptime(query["RecordedToDate"], "%m/%d/%Y")
+    page = int(query.get("page", 1))
+
+    docs = list(search_documents(code, from_date, to_date))
+    chunk = docs[(page - 1) * page_size: page * page_size]
+    rows = "".join(RESULT_ROW.format(**{k: escape(str(v)) for k, v in d.items()}) for d in chunk)
+
+    # Self-contained PagedList links (search criteria + page number)
+    pager = f'<li class="active"><a>{page}</a></li>'
+    if page * page_size < len(docs):
+        href = "/Search/Result?" + urlencode(dict(
+            DocumentType=code, RecordedFromDate=query["RecordedFromDate"],
+            RecordedToDate=query["RecordedToDate"], page=page + 1,
+        ))
+        pager += f'<li class="PagedList-skipToNext"><a href="{escape(href)}" rel="next">&raquo;</a></li>'
+
+    return RESULT_PAGE.format(rows=rows, pager=pager)
+
+
+def case_search_page(case_number=""):
+    if not case_number:
+        results = ""
+    else:
+        docket = case_docket(case_number)
+        if docket is None:
+            results = "<p>No cases found.</p>"
+        else:
+            rows = "".join(
+                DOCKET_ROW.format(date=d, event=escape(e), description=escape(desc))
+                for d, e, desc in docket
+            )
+            results = (f"<h3>Case {escape(case_number)}</h3>\n"
+                       f"<table id=\"docket\">\n<tr><th>Date</th><th>Event</th><th>Description</th></tr>\n"
+                       f"{rows}</table>")
+
+    return CASE_SEARCH_PAGE.format(path=CASE_SEARCH_PATH, case_number=escape(case_number), results=results)
+
+
+@lru_cache(maxsize=256)
+def fixture_pdf(doc_number, pages=1, scanned_every=0):
+    # Text-layer PDF, or a scan for every Nth document (by number, so the
+    # same document is always the same kind)
+    doc = find_document(doc_number)
+    scanned = bool(scanned_every) and zlib.crc32(doc_number.encode()) % scanned_every == 0
+    return lis_pendens_pdf(doc, pages, scanned)
+
+# =========================
+# SERVER
+# =========================
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"    # keep-alive, like the real site
+    disable_nagle_algorithm = True   # headers and body go out as separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body, content_type, status=200, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_html(self, html, status=200):
+        self.send_body(html.encode("utf-8"), "text/html; charset=utf-8", status)
+
+    def send_pdf(self, doc):
+        body = fixture_pdf(doc["doc_number"], self.server.pdf_pages, self.server.scanned_every)
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            return self.send_body(b"", "application/pdf", 304, [("ETag", etag)])
+        self.send_body(body, "application/pdf", headers=[("ETag", etag)])
+
+    def route(self, method):
+        self.server.count(self.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        url = urlsplit(self.path)
+        query = dict(parse_qsl(url.query))
+
+        if method == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            query.update(parse_qsl(self.rfile.read(length).decode()))
+
+        if url.path == "/Search" and method == "GET":
+            return self.send_html(search_page())
+
+        if url.path == "/Search/Result":
+            if method == "POST" and query.get("__RequestVerificationToken") != TOKEN:
+                return self.send_html("<p>Bad request token</p>", 400)
+            try:
+                return self.send_html(result_page(query, self.server.page_size))
+            except (KeyError, ValueError):
+                return self.send_html("<p>Invalid search</p>", 400)
+
+        if url.path == CASE_SEARCH_PATH:
+            return self.send_html(case_search_page(query.get("ctl00$MainContent$txtCaseNumber", "")))
+
+        if url.path in ("/Document/Detail", "/Document/ViewPdf"):
+            doc = find_document(query.get("hId", "")[1:])
+            if doc is None:
+                return self.send_html("<p>Document not found</p>", 404)
+            if url.path == "/Document/ViewPdf":
+                return self.send_pdf(doc)
+            if self.server.challenged():
+                return self.send_html(CHALLENGE_PAGE, 403)
+            return self.send_html(VIEW_PAGE.format(**{k: escape(str(v)) for k, v in doc.items()}))
+
+        self.send_html("<p>Not found</p>", 404)
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, page_size=PAGE_SIZE, challenge_every=0,
+                 pdf_pages=1, scanned_every=0):
+        super().__init__(("127.0.0.1", port), FixtureHandler)
+        self.latency = latency
+        self.page_size = page_size
+        self.challenge_every = challenge_every   # every Nth view page is a human check
+        self.pdf_pages = pdf_pages
+        self.scanned_every = scanned_every       # every Nth PDF has no text layer
+        self.views = 0
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    def challenged(self):
+        with self.lock:
+            self.views += 1
+            return bool(self.challenge_every) and self.views % self.challenge_every == 0
+
+    def count(self, path):
+        key = urlsplit(path).path
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def case_search_url(self):
+        return self.base_url + CASE_SEARCH_PATH
+
+
+def start_server(**options):
+    # Background server for benchmarks; returns it once it is listening
+    server = FixtureServer(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# =========================
+# ENTRY POINT
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the CRS recordings site")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--challenge-every", type=int, default=0,
+                        help="Serve a human-check page for every Nth view page")
+    parser.add_argument("--pdf-pages", type=int, default=1, help="Pages per lis pendens PDF")
+    parser.add_argument("--scanned-every", type=int, default=0,
+                        help="Serve every Nth PDF as a scan without a text layer")
+    args = parser.parse_args()
+
+    server = FixtureServer(args.port, args.latency, args.page_size, args.challenge_every,
+                           args.pdf_pages, args.scanned_every)
+    print(f"🧪 Fixture server on {server.base_url} "
+          f"(CRS_BASE_URL={server.base_url} CASE_SEARCH_URL={server.case_search_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
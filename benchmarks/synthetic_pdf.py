@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import io
+import zlib
+import argparse
+from pathlib import Path
+
+# =========================
+# CONFIG
+# =========================
+# Synthetic lis pendens notices as PDFs, in the two shapes phase 3 sees:
+# a text layer (read with pdftotext) or a scan (page images only, OCR'd).
+# Every value is derived from the document number, so a fixture PDF always
+# extracts to the same case number, amount and address.
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792   # US letter, PDF points
+SCAN_DPI = 150
+PDF_MIN_SIZE = 10_000                # pdf_downloader rejects anything smaller
+
+FILLER = [
+    "EXHIBIT A",
+    "LEGAL DESCRIPTION OF THE MORTGAGED REAL ESTATE",
+    "THE PROPERTY IS SUBJECT TO THE MORTGAGE DESCRIBED ABOVE",
+    "PREPARED BY AND MAIL TO THE PLAINTIFF'S ATTORNEY",
+]
+
+# =========================
+# NOTICE TEXT
+# =========================
+
+def case_number(doc_number):
+    # Chancery case of the document's year, e.g. 2026-CH-04217
+    seed = zlib.crc32(doc_number.encode())
+    return f"20{doc_number[:2]}-CH-{seed % 100_000:05d}"
+
+
+def notice_lines(doc):
+    seed = zlib.crc32(doc["doc_number"].encode())
+    return [
+        "IN THE CIRCUIT COURT OF COOK COUNTY, ILLINOIS",
+        "COUNTY DEPARTMENT - CHANCERY DIVISION",
+        "",
+        "NOTICE OF FORECLOSURE (LIS PENDENS)",
+        "",
+        f"CASE NO. {case_number(doc['doc_number'])}",
+        f"PLAINTIFF: {doc['grantor']}",
+        f"DEFENDANT: {doc['grantee']}",
+        "",
+        f"PROPERTY ADDRESS: {doc['address']}",
+        f"PERMANENT INDEX NUMBER: {doc['pin']}",
+        f"AMOUNT CLAIMED: ${seed % 400_000 + 50_000:,}.{seed % 100:02d}",
+    ]
+
+
+def page_lines(doc, pages):
+    # Page 1 is the notice; later pages are boilerplate without fields
+    return [notice_lines(doc)] + [FILLER] * (pages - 1)
+
+# =========================
+# TEXT-LAYER PDF
+# =========================
+
+def pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def text_pdf(pages):
+    # One Helvetica content stream per page; padded past PDF_MIN_SIZE
+    font = 3 + 2 * len(pages)
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+    ]
+
+    for i, lines in enumerate(pages):
+        ops = ["BT /F1 11 Tf 14 TL 72 720 Td"]
+        ops += [f"({pdf_string(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        content = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Contents {4 + 2 * i} 0 R /Resources << /Font << /F1 {font} 0 R >> >> >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    padding = PDF_MIN_SIZE // len(b"% fixture padding\n") + 100
+    out += b"% fixture padding\n" * padding
+
+    offsets = []
+    for n, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, body)
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+# =========================
+# SCANNED PDF (IMAGES ONLY)
+# =========================
+
+def scanned_pdf(pages, dpi=SCAN_DPI, seed=0):
+    # Grey page images with a slight skew, like a flatbed scan; no text layer
+    from PIL import Image, ImageDraw, ImageFont
+
+    scale = dpi / 72
+    try:
+        font = ImageFont.load_default(size=int(11 * scale))
+    except TypeError:
+        font = ImageFont.load_default()   # Pillow < 10.1: small bitmap font
+
+    images = []
+    for i, lines in enumerate(pages):
+        img = Image.new("L", (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 245)
+        draw = ImageDraw.Draw(img)
+        y = 72 * scale
+        for line in lines:
+            draw.text((72 * scale, y), line, fill=25, font=font)
+            y += 14 * scale
+
+        angle = ((seed + i) % 7 - 3) * 0.25
+        images.append(img.rotate(angle, fillcolor=245))
+
+    buf = io.BytesIO()
+    images[0].save(buf, "PDF", save_all=True, append_images=images[1:], resolution=dpi)
+    return buf.getvalue()
+
+# =========================
+# ONE DOCUMENT
+# =========================
+
+def lis_pendens_pdf(doc, pages=1, scanned=False, dpi=SCAN_DPI):
+    content = page_lines(doc, pages)
+    if scanned:
+        return scanned_pdf(content, dpi, zlib.crc32(doc["doc_number"].encode()))
+    return text_pdf(content)
+
+# =========================
+# ENTRY POINT
+# =========================
+
+def main():
+    from fixture_server import DOC_TYPES, day_documents
+    from datetime import datetime, timedelta
+
+    parser = argparse.ArgumentParser(description="Write synthetic lis pendens PDFs")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--scanned-every", type=int, default=4, help="Every Nth PDF is a scan (0: none)")
+    parser.add_argument("--dpi", type=int, default=SCAN_DPI)
+    parser.add_argument("--output", default="synthetic_pdfs")
+    args = parser.parse_args()
+
+    out = Path(args.output)
+    out.mkdir(parents=True, exist_ok=True)
+
+    day, written = datetime(2026, 6, 30), 0
+    while written < args.count:
+        for doc in day_documents(DOC_TYPES["LIS PENDENS FORECLOSURE"], day):
+            if written == args.count:
+                break
+            written += 1
+            scanned = bool(args.scanned_every) and written % args.scanned_every == 0
+            (out / f"{doc['doc_number']}.pdf").write_bytes(
+                lis_pendens_pdf(doc, args.pages, scanned, args.dpi)
+            )
+        day -= timedelta(days=1)
+
+    print(f"📄 Wrote {written} PDFs to {out}")
+
+
+if __name__ == "__main__":
+    main()
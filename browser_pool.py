@@ -0,0 +1,97 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+# =========================
+# SHARED BROWSER POOL
+# =========================
+# One Playwright driver per run and one Chromium per set of launch options
+# (headed for Cloudflare checks, headless for case checks), reused by every
+# phase that runs in the process. Playwright itself is only imported once a
+# browser is actually needed; an all-HTTP run never loads it.
+
+class BrowserPool:
+    def __init__(self):
+        self.playwright = None
+        self.browsers = {}          # launch options -> Browser
+        self.lock = asyncio.Lock()  # workers noticing the same crash launch once
+        self.launches = 0
+        self.recycled = 0
+        self.launch_seconds = 0.0
+
+    async def browser(self, **options):
+        # Health check on every lease: a crashed or disconnected browser is
+        # replaced right here instead of failing the whole phase
+        key = tuple(sorted(options.items()))
+        async with self.lock:
+            browser = self.browsers.get(key)
+            if browser is not None and browser.is_connected():
+                return browser
+
+            if browser is not None:
+                self.recycled += 1
+                print("♻️ Browser is gone, launching a fresh one")
+
+            start = time.perf_counter()
+            if self.playwright is None:
+                from playwright.async_api import async_playwright
+                self.playwright = await async_playwright().start()
+
+            browser = await self.playwright.chromium.launch(**options)
+            self.launch_seconds += time.perf_counter() - start
+            self.launches += 1
+            self.browsers[key] = browser
+            return browser
+
+    def healthy(self):
+        return all(b.is_connected() for b in self.browsers.values())
+
+    async def close(self):
+        for browser in self.browsers.values():
+            try:
+                await browser.close()
+            except Exception:
+                pass    # already dead
+        self.browsers = {}
+
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+    def report(self):
+        print(f"🧭 Browsers: {self.launches} launched ({self.recycled} after a crash), "
+              f"{self.launch_seconds:.1f}s launching")
+
+
+async def close_quietly(context):
+    # Contexts of a crashed browser can't be closed; nothing to clean up then
+    try:
+        await context.close()
+    except Exception:
+        pass
+
+# =========================
+# ONE POOL PER RUN
+# =========================
+# The in-process runner opens the pool around all phases; a phase script run
+# on its own gets a private pool for the length of its run. Nested `async
+# with browser_pool()` blocks reuse the pool that is already open.
+
+_shared = None
+
+
+@asynccontextmanager
+async def browser_pool():
+    global _shared
+    if _shared is not None:
+        yield _shared
+        return
+
+    pool = _shared = BrowserPool()
+    try:
+        yield pool
+    finally:
+        _shared = None
+        await pool.close()
+        if pool.launches:
+            pool.report()
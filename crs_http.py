@@ -0,0 +1,127 @@
+from urllib.parse import urljoin, urlencode
+
+from dom_extract import parse_result_page, parse_search_form, parse_view_page
+from metrics import timer
+from pdf_downloader import make_session
+from rate_limit import TooManyRequests, retry_after_seconds
+
+# =========================
+# CONFIG
+# =========================
+
+TIMEOUT = (10, 60)
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+CHALLENGE_MARKERS = ("cloudflare", "checking your browser", "cf-turnstile")
+
+# Same ids the browser engine fills in (div#collapse3)
+DOC_TYPE_ID = "DocumentType"
+FROM_DATE_ID = "RecordedFromDate"
+TO_DATE_ID = "RecordedToDate"
+
+
+class NeedsBrowser(Exception):
+    pass    # challenge page or unexpected markup: hand the work to Playwright
+
+# =========================
+# CRS OVER PLAIN HTTP (ONE POOLED SESSION PER WORKER)
+# =========================
+
+class CrsClient:
+    # One client per worker: the site keeps search state in the session
+    # cookie, just like one browser context per worker
+    def __init__(self, base_url, limiter, session=None):
+        self.base_url = base_url
+        self.limiter = limiter
+        self.session = session or make_session(1)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.last_url = base_url
+
+    def fetch(self, url, method="GET", data=None, page="page"):
+        self.limiter.acquire(url)
+        with timer("page_navigation_seconds", page=page, engine="http"):
+            r = self.session.request(method, url, data=data, timeout=TIMEOUT)
+
+        if r.status_code == 429:
+            rate = self.limiter.penalize(url, retry_after_seconds(r.headers.get("Retry-After")))
+            raise TooManyRequests(f"429 Too Many Requests (rate now {rate:.2f}/s)")
+
+        if r.status_code in (403, 503) and any(m in r.text.lower() for m in CHALLENGE_MARKERS):
+            raise NeedsBrowser(f"challenge page ({r.status_code}) at {url}")
+
+        r.raise_for_status()
+        self.limiter.success(url)
+        self.last_url = r.url
+        return r.text
+
+    # -------------------------
+    # PHASE 1: DOCUMENT TYPE SEARCH
+    # -------------------------
+
+    def search(self, search_url, doc_type, from_date, to_date):
+        # Submits the form exactly as the browser would: hidden fields
+        # (anti-forgery token), defaults of the other fields, our three values
+        html = self.fetch(search_url, page="search")
+        with timer("dom_extraction_seconds", page="search", engine="http"):
+            form = parse_search_form(html, DOC_TYPE_ID)
+        if form is None:
+            raise NeedsBrowser("Document Type Search form not found")
+
+        try:
+            doc_field = form["ids"][DOC_TYPE_ID]
+            fields = dict(form["fields"])
+            fields[form["ids"][FROM_DATE_ID]] = from_date
+            fields[form["ids"][TO_DATE_ID]] = to_date
+        except KeyError as e:
+            raise NeedsBrowser(f"search form field {e} not found")
+
+        options = form["options"].get(doc_field, {})
+        if doc_type not in options:
+            raise ValueError(f"Unknown document type: {doc_type}")
+        fields[doc_field] = options[doc_type]
+
+        if form["submit"]:
+            fields[form["submit"][0]] = form["submit"][1]
+
+        action = urljoin(search_url, form["action"]) if form["action"] else search_url
+        if form["method"] == "POST":
+            html = self.fetch(action, "POST", fields, page="results")
+        else:
+            html = self.fetch(action + ("&" if "?" in action else "?") + urlencode(fields), page="results")
+
+        return self.parse_results(html)
+
+    def results(self, href):
+        # Pagination and checkpoint links, relative to the last page read
+        return self.parse_results(self.fetch(urljoin(self.last_url, href), page="results"))
+
+    def parse_results(self, html):
+        with timer("dom_extraction_seconds", page="results", engine="http"):
+            return parse_result_page(html)
+
+    # -------------------------
+    # PHASE 2: DOCUMENT VIEW PAGE
+    # -------------------------
+
+    def view(self, view_url):
+        html = self.fetch(view_url, page="view")
+        with timer("dom_extraction_seconds", page="view", engine="http"):
+            fields = parse_view_page(html)
+        if not fields["doc_number"]:
+            # Interstitial, login or error page served with a 200
+            raise NeedsBrowser(f"not a document view page: {view_url}")
+        return fields
+
+    def reset(self):
+        # Fresh cookies and connections after a failure. The search state
+        # goes with the cookie: phase 1 submits its search again and pages
+        # forward instead of reopening a saved results link.
+        self.session.close()
+        self.session = make_session(1)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.last_url = self.base_url
+
+    def close(self):
+        self.session.close()
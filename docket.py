@@ -0,0 +1,135 @@
+import re
+import json
+import zlib
+import base64
+from collections import deque
+
+# =========================
+# DOCKET TABLE (PHASE 4)
+# =========================
+# One page.evaluate() returns every table row as its cell texts; rows with
+# a date become (date, event, description) entries.
+
+DOCKET_JS = """
+() => Array.from(document.querySelectorAll("table tr"), tr =>
+    Array.from(tr.querySelectorAll("td"), td => td.innerText.trim())
+).filter(cells => cells.length >= 2)
+"""
+
+DATE = re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{4})\b")
+
+
+def normalize(text):
+    # Case, whitespace and curly apostrophes ("Sheriff’s") don't matter
+    return " ".join(str(text).replace("’", "'").upper().split())
+
+
+def parse_docket(rows):
+    # -> [(YYYY-MM-DD, event, description), ...] in page order
+    docket = []
+    for cells in rows:
+        for i, cell in enumerate(cells):
+            m = DATE.match(cell.strip())
+            if m and i + 1 < len(cells):
+                month, day, year = m.groups()
+                docket.append((
+                    f"{year}-{int(month):02d}-{int(day):02d}",
+                    " ".join(cells[i + 1].split()),
+                    " ".join(" ".join(cells[i + 2:]).split()),
+                ))
+                break
+    return docket
+
+# =========================
+# MULTI-PATTERN EVENT MATCHER (AHO–CORASICK)
+# =========================
+
+class EventMatcher:
+    # Every configured event found in one pass over the text,
+    # however many events there are
+    def __init__(self, events):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        for name in events:
+            node = 0
+            for ch in normalize(name):
+                if ch not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][ch] = len(self.goto) - 1
+                node = self.goto[node][ch]
+            self.out[node].append(name)
+
+        # Failure links, breadth first
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find(self, text):
+        # -> [(end position, event name), ...]
+        hits = []
+        node = 0
+        for i, ch in enumerate(normalize(text)):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for name in self.out[node]:
+                hits.append((i, name))
+        return hits
+
+# =========================
+# LATEST RELEVANT EVENT
+# =========================
+
+def latest_event(docket, matcher):
+    # -> (date, event name) of the most recent matching entry, or None.
+    # Entries on the same day are ordered as they happened, whichever way
+    # the page sorts the docket.
+    descending = len(docket) > 1 and docket[0][0] > docket[-1][0]
+    best = None
+
+    for pos, (date, event, description) in enumerate(docket):
+        hits = matcher.find(f"{event} {description}")
+        if not hits:
+            continue
+
+        name = max((n for _, n in hits), key=len)   # most specific event in the entry
+        rank = (date, -pos if descending else pos)
+        if best is None or rank > best[0]:
+            best = (rank, date, name)
+
+    return (best[1], best[2]) if best else None
+
+
+def last_in_text(text, matcher):
+    # No parsable docket: the event mentioned last on the page
+    hits = matcher.find(text)
+    if not hits:
+        return None
+    _, name = max(hits, key=lambda h: (h[0], len(h[1])))
+    return "", name
+
+# =========================
+# COMPACT STORAGE
+# =========================
+
+def pack_docket(docket):
+    data = json.dumps(docket, separators=(",", ":")).encode("utf-8")
+    return base64.b64encode(zlib.compress(data, 9)).decode("ascii")
+
+
+def unpack_docket(packed):
+    if not packed:
+        return []
+    data = zlib.decompress(base64.b64decode(packed))
+    return [tuple(row) for row in json.loads(data)]
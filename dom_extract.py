@@ -0,0 +1,306 @@
+from html.parser import HTMLParser
+
+# =========================
+# BULK DOM EXTRACTION (PHASE 1 + PHASE 2)
+# =========================
+# Each page is read in ONE round trip: either a single page.evaluate() of the
+# scripts below, or page.content() / an HTTP body run through the parsers.
+# Both return the same structures, with every whitespace run (innerText's
+# line breaks included) collapsed to one space, as clean() does:
+#   results page -> {"rows": [[{"text", "href"}, ...], ...], "has_next": bool, "next_href": str}
+#   view page    -> {"doc_number", "doc_type", "date_recorded", "address", "pdf_src"}
+
+RESULT_PAGE_JS = """
+() => {
+    const clean = s => s.split(/\\s+/).join(" ").trim();
+    return {
+        rows: Array.from(document.querySelectorAll("table tbody tr"), tr =>
+            Array.from(tr.querySelectorAll("td"), td => {
+                const a = td.querySelector("a");
+                return {text: clean(td.innerText), href: a ? (a.getAttribute("href") || "") : ""};
+            })
+        ),
+        has_next: !!document.querySelector("li.PagedList-skipToNext a[rel='next']"),
+        next_href: (document.querySelector("li.PagedList-skipToNext a[rel='next']") || {getAttribute: () => ""})
+            .getAttribute("href") || ""
+    };
+}
+"""
+
+VIEW_PAGE_JS = """
+() => {
+    const clean = s => s.split(/\\s+/).join(" ").trim();
+    const text = sel => {
+        const el = document.querySelector(sel);
+        return el ? clean(el.innerText) : "";
+    };
+    const iframe = document.querySelector("iframe#iframe");
+    return {
+        doc_number: text("#divcol1 table tbody tr:nth-child(1) td"),
+        doc_type: text("#divcol1 table tbody tr:nth-child(2) td"),
+        date_recorded: text("#divcol1 table tbody tr:nth-child(3) td"),
+        address: text("#divcol1 table tbody tr:nth-child(6) td span"),
+        pdf_src: iframe ? (iframe.getAttribute("src") || "") : ""
+    };
+}
+"""
+
+NEXT_PAGE_SELECTOR = "li.PagedList-skipToNext a[rel='next']"
+
+# Elements that innerText renders as a line break
+BREAK_TAGS = {"br", "p", "div", "li"}
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+# =========================
+# HTML SNAPSHOT PARSER (STDLIB, ONE PASS)
+# =========================
+
+class PageSnapshot(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.stack = []         # open elements: (tag, id, classes)
+        self.tbodies = []       # [{"ids": ancestor ids, "rows": [[cell, ...], ...]}]
+        self.iframes = {}       # id -> src
+        self.has_next = False
+        self.next_href = ""
+
+        self.tbody = None
+        self.row = None
+        self.cell = None
+        self.span = None        # text of the first <span> in the current cell
+
+    # -------------------------
+    # TREE TRACKING
+    # -------------------------
+
+    def ids(self):
+        return {el_id for _, el_id, _ in self.stack if el_id}
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        el_id = attrs.get("id") or ""
+        classes = (attrs.get("class") or "").split()
+
+        if tag == "tbody":
+            self.tbody = {"ids": self.ids(), "rows": []}
+            self.tbodies.append(self.tbody)
+        elif tag == "tr" and self.tbody is not None:
+            self.close_row()
+            self.row = []
+            self.tbody["rows"].append(self.row)
+        elif tag == "td" and self.row is not None:
+            self.close_cell()
+            self.cell = {"text": [], "href": "", "span": None}
+            self.row.append(self.cell)
+        elif tag == "a":
+            if self.cell is not None and not self.cell["href"]:
+                self.cell["href"] = attrs.get("href") or ""
+            if attrs.get("rel") == "next" and any(
+                t == "li" and "PagedList-skipToNext" in c for t, _, c in self.stack
+            ):
+                self.has_next = True
+                self.next_href = attrs.get("href") or ""
+        elif tag == "span" and self.cell is not None and self.cell["span"] is None:
+            self.cell["span"] = []
+            self.span = self.cell["span"]
+        elif tag == "iframe" and el_id:
+            self.iframes[el_id] = attrs.get("src") or ""
+
+        if tag in BREAK_TAGS:
+            self.handle_data("\n")
+
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, el_id, classes))
+
+    def handle_endtag(self, tag):
+        if tag == "span":
+            self.span = None
+        elif tag == "td":
+            self.close_cell()
+        elif tag == "tr":
+            self.close_row()
+        elif tag == "tbody":
+            self.close_row()
+            self.tbody = None
+
+        # Pop up to the matching element; tolerates unclosed children
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell["text"].append(data)
+            if self.span is not None:
+                self.span.append(data)
+
+    def close_cell(self):
+        self.cell = None
+        self.span = None
+
+    def close_row(self):
+        self.close_cell()
+        self.row = None
+
+    # -------------------------
+    # RESULTS
+    # -------------------------
+
+    def rows(self):
+        for tbody in self.tbodies:
+            yield from tbody["rows"]
+
+
+def clean(parts):
+    return " ".join("".join(parts or ()).split())
+
+
+def snapshot(html):
+    parser = PageSnapshot()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+# =========================
+# RESULTS PAGE (PHASE 1)
+# =========================
+
+def parse_result_page(html):
+    page = snapshot(html)
+    return {
+        "rows": [
+            [{"text": clean(c["text"]), "href": c["href"]} for c in row]
+            for row in page.rows()
+        ],
+        "has_next": page.has_next,
+        "next_href": page.next_href,
+    }
+
+
+def result_row(cells, base_url):
+    # Same column layout as the CSV: column 1 holds the view link
+    return [
+        (base_url + c["href"] if c["href"] else "") if i == 1 else c["text"]
+        for i, c in enumerate(cells)
+    ]
+
+# =========================
+# VIEW PAGE (PHASE 2)
+# =========================
+
+def parse_view_page(html):
+    page = snapshot(html)
+    rows = next(
+        (t["rows"] for t in page.tbodies if "divcol1" in t["ids"] and t["rows"]), []
+    )
+
+    def cell(n, span=False):
+        if len(rows) < n or not rows[n - 1]:
+            return ""
+        c = rows[n - 1][0]
+        return clean(c["span"] if span else c["text"])
+
+    return {
+        "doc_number": cell(1),
+        "doc_type": cell(2),
+        "date_recorded": cell(3),
+        "address": cell(6, span=True),
+        "pdf_src": page.iframes.get("iframe", ""),
+    }
+
+# =========================
+# SEARCH FORM (PHASE 1 OVER HTTP)
+# =========================
+
+class FormSnapshot(HTMLParser):
+    # Every <form> with the fields a browser would submit by default
+    def __init__(self):
+        super().__init__()
+        self.forms = []
+        self.form = None
+        self.select = None      # name of the open <select>
+        self.option = None      # open <option>: {"value", "selected", "text"}
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        name = attrs.get("name") or ""
+        el_id = attrs.get("id") or ""
+
+        if tag == "form":
+            self.form = {
+                "action": attrs.get("action") or "",
+                "method": (attrs.get("method") or "get").upper(),
+                "fields": {},       # name -> value, in document order
+                "ids": {},          # element id -> field name
+                "options": {},      # select name -> {label: value}
+                "submit": None,     # (name, value) of the first named submit button
+            }
+            self.forms.append(self.form)
+            return
+
+        form = self.form
+        if form is None:
+            return
+        if el_id and name:
+            form["ids"][el_id] = name
+
+        if tag == "input" and name:
+            kind = (attrs.get("type") or "text").lower()
+            if kind in ("checkbox", "radio"):
+                if "checked" in attrs:
+                    form["fields"][name] = attrs.get("value") or "on"
+            elif kind in ("submit", "image"):
+                if form["submit"] is None:
+                    form["submit"] = (name, attrs.get("value") or "")
+            elif kind not in ("button", "reset", "file"):
+                form["fields"][name] = attrs.get("value") or ""
+        elif tag == "button" and name and (attrs.get("type") or "submit").lower() == "submit":
+            if form["submit"] is None:
+                form["submit"] = (name, attrs.get("value") or "")
+        elif tag == "textarea" and name:
+            form["fields"][name] = ""
+        elif tag == "select" and name:
+            self.select = name
+            form["options"][name] = {}
+        elif tag == "option" and self.select:
+            self.close_option()     # </option> is optional
+            self.option = {"value": attrs.get("value"), "selected": "selected" in attrs, "text": []}
+
+    def handle_endtag(self, tag):
+        if tag == "option":
+            self.close_option()
+        elif tag == "select":
+            self.close_option()
+            self.select = None
+        elif tag == "form":
+            self.form = None
+
+    def handle_data(self, data):
+        if self.option is not None:
+            self.option["text"].append(data)
+
+    def close_option(self):
+        option, self.option = self.option, None
+        if option is None or self.form is None:
+            return
+
+        label = clean(option["text"])
+        value = label if option["value"] is None else option["value"]
+        self.form["options"][self.select][label] = value
+
+        # First option is the default unless a later one is selected
+        if option["selected"] or self.select not in self.form["fields"]:
+            self.form["fields"][self.select] = value
+
+
+def parse_search_form(html, field_id):
+    # The form holding the element with `field_id` (e.g. "DocumentType")
+    parser = FormSnapshot()
+    parser.feed(html)
+    parser.close()
+    return next((f for f in parser.forms if field_id in f["ids"]), None)
@@ -0,0 +1,142 @@
+import re
+from collections import namedtuple
+
+# =========================
+# PRECOMPILED FIELD EXTRACTOR (PHASE 3)
+# =========================
+# One precompiled pattern per field, each scanned left to right over the
+# normalized OCR text, so a case number never hides an address starting at
+# the same digit ("10 E 12 WAY ..."). Every repetition is bounded so noisy
+# OCR cannot trigger runaway backtracking.
+
+Candidate = namedtuple("Candidate", "field value start end score")
+
+STREET_SUFFIXES = "ST|STREET|AVE|AVENUE|RD|ROAD|DR|DRIVE|CT|COURT|BLVD|LN|WAY"
+
+FIELD_PATTERNS = {
+    # Case number — no letter assumptions: 2024CH012345, 24-CH-12345, ...
+    "case": re.compile(r"\b(?:20\d{2}|\d{2})[\s\-]{0,3}[A-Z]{1,10}[\s\-]{0,3}\d{2,8}\b"),
+    # Amount next to a label
+    "labeled": re.compile(
+        r"(?:AMOUNT CLAIMED|CLAIMED AMOUNT|TOTAL AMOUNT)[^$0-9]{0,40}(?P<labeled>\$?\s?[\d,]{1,15}\.\d{2})"
+    ),
+    # Any dollar figure
+    "amount": re.compile(r"\$[\d,]{1,15}\.\d{2}"),
+    # US street address ending in STATE ZIP
+    "address": re.compile(
+        r"\b\d{1,6}\s+[A-Z0-9 .,'\-]{1,50}?\s+(?:" + STREET_SUFFIXES + r")\b"
+        r".{0,40}?\b[A-Z]{2}\s*\d{5}\b"
+    ),
+}
+
+# House number and a grid direction in front of another number:
+# "20 W 1000 N ST ..." is one address, not a prefix to drop
+GRID_PREFIX = re.compile(r"\d{1,6}\s+(?:[NSEW]|NORTH|SOUTH|EAST|WEST)\s+")
+
+CASE_SEPARATORS = re.compile(r"[\s\-]+")
+
+SCORES = {
+    "case": 0.95,
+    "labeled": 0.9,   # amount with an AMOUNT CLAIMED / TOTAL AMOUNT label
+    "amount": 0.85,   # bare dollar figure, may not be the claimed amount
+    "address": 0.9,
+}
+
+# =========================
+# SCAN
+# =========================
+
+def scan_fields(text):
+    # Every candidate of every field, in text order
+    candidates = []
+
+    for kind, pattern in FIELD_PATTERNS.items():
+        group = "labeled" if kind == "labeled" else 0
+        pos = 0
+
+        while True:
+            m = pattern.search(text, pos)
+            if not m:
+                break
+
+            # Resume right after the match start rather than its end: fields
+            # may overlap after normalization ("$12,345.00123 MAIN ST ...")
+            pos = m.start() + 1
+
+            if kind == "case":
+                value = CASE_SEPARATORS.sub("", m.group())
+                field = "case"
+            elif kind in ("labeled", "amount"):
+                raw = m.group(group).replace("$", "").replace(",", "").strip()
+                try:
+                    value = f"${float(raw):,.2f}"
+                except ValueError:
+                    continue
+                field = "amount"
+            else:
+                value = m.group().strip()
+                field = "address"
+
+            candidates.append(Candidate(field, value, m.start(group), m.end(group), SCORES[kind]))
+
+    candidates.sort(key=lambda c: c.start)
+    return candidates
+
+# =========================
+# PICK BEST PER FIELD
+# =========================
+
+def best_candidate(candidates, field):
+    matches = [c for c in candidates if c.field == field]
+    if not matches:
+        return None
+
+    if field == "case":
+        # Longest case number wins; the earliest one on ties
+        return max(matches, key=lambda c: len(c.value))
+
+    if field == "address":
+        # A match starting at an earlier number ("07007 LIS PENDENS ... 15 N
+        # TESTING CT ...") swallows the real address; keep the innermost one
+        matches = [
+            c for c in matches
+            if not any(
+                o is not c and c.start <= o.start and o.end <= c.end
+                and not GRID_PREFIX.fullmatch(c.value[:o.start - c.start])
+                for o in matches
+            )
+        ]
+
+    # Highest score wins; the earliest one on ties
+    return max(matches, key=lambda c: (c.score, -c.start))
+
+
+def pick(candidates, field):
+    best = best_candidate(candidates, field)
+    if best is None:
+        return "", 0.0
+    return best.value, best.score
+
+
+def extract_fields(text):
+    candidates = scan_fields(text)
+    return {
+        "case": pick(candidates, "case"),
+        "amount": pick(candidates, "amount"),
+        "address": pick(candidates, "address"),
+    }
+
+# =========================
+# SINGLE-FIELD HELPERS (SAME RETURN SHAPE AS BEFORE)
+# =========================
+
+def extract_case_number(text):
+    return pick(scan_fields(text), "case")
+
+
+def extract_amount(text):
+    return pick(scan_fields(text), "amount")
+
+
+def extract_address(text):
+    return pick(scan_fields(text), "address")
@@ -0,0 +1,296 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+# =========================
+# CONFIG
+# =========================
+# Every phase records into one in-process registry. At the end of a run it
+# is written twice: a JSON run summary (per-stage latency percentiles,
+# counters) and a Prometheus textfile for node_exporter's textfile
+# collector. Point PIPELINE_METRICS_DIR at the collector's directory to
+# have it scraped.
+
+METRICS_DIR = os.environ.get("PIPELINE_METRICS_DIR", "metrics")
+PREFIX = "cookcounty_"
+
+# Set by run_pipeline for its phase subprocesses: they leave a snapshot
+# for the pipeline to merge instead of writing their own textfile
+RUN_ID_ENV = "PIPELINE_RUN_ID"
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_PER_SECOND = (1e4, 3e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7, 1e8)
+
+BUCKETS = {
+    "download_bytes_per_second": BYTES_PER_SECOND,
+}
+
+# =========================
+# HISTOGRAM (FIXED BUCKETS, MERGEABLE)
+# =========================
+
+class Histogram:
+    def __init__(self, buckets=SECONDS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)    # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th value, clipped to the
+        # largest value seen (good enough to tell 50 ms from 5 s)
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (self.max,), self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        for v in (other.min, other.max):
+            if v is not None:
+                self.min = v if self.min is None else min(self.min, v)
+                self.max = v if self.max is None else max(self.max, v)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "min": self.min,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": self.buckets,
+            "counts": self.counts,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        h = cls(data["buckets"])
+        h.counts = list(data["counts"])
+        h.count = data["count"]
+        h.sum = data["sum"]
+        h.min = data["min"]
+        h.max = data["max"]
+        return h
+
+# =========================
+# REGISTRY
+# =========================
+
+def series_key(name, labels):
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()   # page workers, download threads, the OCR thread
+        self.reset()
+
+    def reset(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.time()
+
+    def observe(self, name, value, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(BUCKETS.get(name, SECONDS))
+            self.histograms[key].observe(value)
+
+    def count(self, name, n=1, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[series_key(name, labels)] = value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # -------------------------
+    # SNAPSHOT (JSON) + MERGE
+    # -------------------------
+
+    def snapshot(self, run):
+        finished = time.time()
+        with self.lock:
+            def rows(series, value):
+                return [dict(name=name, labels=dict(labels), **value(v))
+                        for (name, labels), v in sorted(series.items())]
+
+            return {
+                "run": run,
+                "run_id": os.environ.get(RUN_ID_ENV, ""),
+                "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "finished": datetime.fromtimestamp(finished).isoformat(timespec="seconds"),
+                "seconds": round(finished - self.started, 3),
+                "histograms": rows(self.histograms, Histogram.to_dict),
+                "counters": rows(self.counters, lambda v: {"value": v}),
+                "gauges": rows(self.gauges, lambda v: {"value": v}),
+            }
+
+    def merge(self, snapshot):
+        with self.lock:
+            for row in snapshot["histograms"]:
+                key = series_key(row["name"], row["labels"])
+                h = Histogram.from_dict(row)
+                if key in self.histograms:
+                    self.histograms[key].merge(h)
+                else:
+                    self.histograms[key] = h
+            for row in snapshot["counters"]:
+                key = series_key(row["name"], row["labels"])
+                self.counters[key] = self.counters.get(key, 0) + row["value"]
+            for row in snapshot["gauges"]:
+                self.gauges[series_key(row["name"], row["labels"])] = row["value"]
+
+    # -------------------------
+    # PROMETHEUS TEXT FORMAT
+    # -------------------------
+
+    def prometheus(self, run):
+        lines = []
+        typed = set()
+
+        def labels_text(labels, **extra):
+            pairs = [("run", run), *labels, *extra.items()]
+            body = ",".join(f'{k}="{escape(v)}"' for k, v in pairs)
+            return "{" + body + "}"
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        with self.lock:
+            for (name, labels), h in sorted(self.histograms.items()):
+                declare(name, "histogram")
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f"{PREFIX}{name}_bucket{labels_text(labels, le=f'{bound:g}')} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{labels_text(labels, le='+Inf')} {h.count}")
+                lines.append(f"{PREFIX}{name}_sum{labels_text(labels)} {h.sum:.6f}")
+                lines.append(f"{PREFIX}{name}_count{labels_text(labels)} {h.count}")
+
+            for (name, labels), v in sorted(self.counters.items()):
+                declare(name, "counter")
+                lines.append(f"{PREFIX}{name}{labels_text(labels)} {v}")
+
+            for (name, labels), v in sorted(self.gauges.items()):
+                declare(name, "gauge")
+                lines.append(f"{PREFIX}{name}{labels_text(labels)} {v}")
+
+        declare("last_run_timestamp_seconds", "gauge")
+        lines.append(f"{PREFIX}last_run_timestamp_seconds{labels_text(())} {time.time():.0f}")
+        declare("run_duration_seconds", "gauge")
+        lines.append(f"{PREFIX}run_duration_seconds{labels_text(())} {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    # -------------------------
+    # REPORTS
+    # -------------------------
+
+    def print_stages(self):
+        with self.lock:
+            rows = sorted(self.histograms.items())
+        if not rows:
+            return
+
+        print("\n📊 Stage latency (count / p50 / p90 / max)")
+        for (name, labels), h in rows:
+            label = ",".join(v for _, v in labels)
+            unit = "B/s" if name == "download_bytes_per_second" else "s"
+            print(f"   {name}{f' [{label}]' if label else ''}: {h.count} / "
+                  f"{h.quantile(0.5):.3g}{unit} / {h.quantile(0.9):.3g}{unit} / {h.max:.3g}{unit}")
+
+        with self.lock:
+            counters = sorted(self.counters.items())
+        for (name, labels), value in counters:
+            label = ",".join(v for _, v in labels)
+            print(f"   {name}{f' [{label}]' if label else ''}: {value}")
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+# =========================
+# MODULE-LEVEL REGISTRY
+# =========================
+
+METRICS = Metrics()
+observe = METRICS.observe
+count = METRICS.count
+gauge = METRICS.gauge
+timer = METRICS.timer
+
+
+def snapshot_path(run, metrics_dir=METRICS_DIR):
+    return os.path.join(metrics_dir, f"{run}.json")
+
+
+def finish(run, metrics_dir=METRICS_DIR):
+    # End of a phase script or pipeline run: JSON summary always; the
+    # Prometheus textfile only for top-level runs (a phase started by
+    # run_pipeline is written into the pipeline's textfile instead)
+    os.makedirs(metrics_dir, exist_ok=True)
+    write_atomic(snapshot_path(run, metrics_dir), json.dumps(METRICS.snapshot(run), indent=2))
+
+    if not os.environ.get(RUN_ID_ENV) or run == "pipeline":
+        write_atomic(os.path.join(metrics_dir, f"{run}.prom"), METRICS.prometheus(run))
+        METRICS.print_stages()
+        print(f"📈 Metrics: {snapshot_path(run, metrics_dir)} + {run}.prom")
+
+
+def merge_snapshot(run, run_id, metrics_dir=METRICS_DIR):
+    # A phase subprocess's snapshot, if it belongs to this pipeline run
+    try:
+        with open(snapshot_path(run, metrics_dir), encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    if snapshot.get("run_id") != run_id:
+        return False
+    METRICS.merge(snapshot)
+    return True
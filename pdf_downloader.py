@@ -0,0 +1,307 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import requests
+from requests.adapters import HTTPAdapter
+from pdf2image import pdfinfo_from_path
+
+from metrics import count, observe
+from rate_limit import TooManyRequests, retry_after_seconds
+
+# =========================
+# CONFIG
+# =========================
+
+DOWNLOAD_WORKERS = 4        # concurrent downloads (= pooled keep-alive connections)
+DOWNLOAD_QUEUE_SIZE = 20    # pending downloads before page workers wait
+CHUNK_SIZE = 64 * 1024      # bytes per streamed write
+
+MAX_PDF_RETRIES = 3
+PDF_MIN_SIZE = 10_000  # bytes
+
+
+class IncompleteDownload(Exception):
+    pass    # partial file is kept and resumed with a Range request
+
+
+class InvalidPdf(Exception):
+    pass    # partial file is discarded
+
+# =========================
+# POOLED HTTP SESSION
+# =========================
+
+def make_session(pool_size=DOWNLOAD_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# =========================
+# VERIFY (SIZE, PDF MARKERS, SHA-256, PAGE COUNT)
+# =========================
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def count_pages(path):
+    return int(pdfinfo_from_path(path)["Pages"])
+
+
+def manifest_pages(path):
+    try:
+        return count_pages(path)
+    except Exception:
+        return 0    # unknown; phase 3 falls back to reading it itself
+
+
+def verify_pdf(path):
+    size = os.path.getsize(path)
+    if size < PDF_MIN_SIZE:
+        raise InvalidPdf(f"PDF too small ({size} bytes)")
+
+    with open(path, "rb") as f:
+        head = f.read(5)
+        f.seek(max(0, size - 1024))
+        tail = f.read()
+
+    if head != b"%PDF-":
+        raise InvalidPdf("not a PDF")
+    if b"%%EOF" not in tail:
+        raise IncompleteDownload("PDF is truncated (no %%EOF)")
+
+    return {"size": size, "sha256": file_sha256(path), "pages": manifest_pages(path)}
+
+
+def verify_existing(path):
+    # PDFs downloaded before the manifest existed
+    try:
+        return verify_pdf(path)
+    except Exception as e:
+        print(f"⚠ Existing {os.path.basename(path)} failed verification: {e}")
+        return None
+
+# =========================
+# PDF DOWNLOAD (STREAMED, RESUMABLE, CONDITIONAL)
+# =========================
+
+CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+
+
+def load_part_meta(part):
+    try:
+        with open(part + ".json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_part_meta(part, meta):
+    with open(part + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def discard_part(part):
+    for path in (part, part + ".json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def expected_size(r, offset):
+    if r.status_code == 206:
+        m = CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+        if not m or int(m.group(1)) != offset:
+            raise InvalidPdf("server ignored the requested range")
+        return int(m.group(2)) if m.group(2) != "*" else None
+
+    length = r.headers.get("Content-Length")
+    return int(length) if length and "Content-Encoding" not in r.headers else None
+
+
+def download_pdf(session, pdf_url, pdf_path, limiter, known=None):
+    # Returns a manifest entry for the verified PDF, or None after retries.
+    # `known` is the current manifest entry: its ETag / Last-Modified turn
+    # the request into a conditional one (304 = keep the file as is).
+    part = pdf_path + ".part"
+    conditional = known and os.path.exists(pdf_path)
+
+    for attempt in range(1, MAX_PDF_RETRIES + 1):
+        try:
+            headers = {}
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            meta = load_part_meta(part) if offset else {}
+
+            if conditional:
+                if known.get("etag"):
+                    headers["If-None-Match"] = known["etag"]
+                if known.get("last_modified"):
+                    headers["If-Modified-Since"] = known["last_modified"]
+
+            if attempt > 1:
+                count("retries_total", stage="pdf_download")
+
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                validator = meta.get("etag") or meta.get("last_modified")
+                if validator:
+                    headers["If-Range"] = validator   # full body again if it changed
+                print(f"⏯️ Resuming PDF at {offset} bytes (attempt {attempt}): {os.path.basename(pdf_path)}")
+            else:
+                print(f"⬇️ Downloading PDF (attempt {attempt}): {os.path.basename(pdf_path)}")
+
+            limiter.acquire(pdf_url)
+            started = time.perf_counter()
+            received = 0
+
+            with session.get(pdf_url, headers=headers, stream=True, timeout=(10, 60)) as r:
+                if r.status_code == 429:
+                    rate = limiter.penalize(pdf_url, retry_after_seconds(r.headers.get("Retry-After")))
+                    raise TooManyRequests(f"429 Too Many Requests (rate now {rate:.2f}/s)")
+
+                if r.status_code == 416:
+                    discard_part(part)   # our partial file is longer than the document
+                    raise IncompleteDownload("range not satisfiable")
+
+                if r.status_code == 304:
+                    count("pdf_not_modified_total")
+                    limiter.success(pdf_url)
+                    print(f"♻️ Unchanged (304): {os.path.basename(pdf_path)}")
+                    return dict(known, verified_at="")
+
+                r.raise_for_status()
+                limiter.success(pdf_url)
+
+                if r.status_code != 206:
+                    offset = 0
+                    meta = {
+                        "etag": r.headers.get("ETag", ""),
+                        "last_modified": r.headers.get("Last-Modified", ""),
+                    }
+                    save_part_meta(part, meta)
+
+                total = expected_size(r, offset)
+
+                with open(part, "ab" if offset else "wb") as f:
+                    for chunk in r.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        received += len(chunk)
+
+            seconds = time.perf_counter() - started
+            observe("download_seconds", seconds)
+            count("download_bytes_total", received)
+            if received and seconds:
+                observe("download_bytes_per_second", received / seconds)
+
+            size = os.path.getsize(part)
+            if total is not None and size != total:
+                raise IncompleteDownload(f"got {size} of {total} bytes")
+
+            entry = verify_pdf(part)
+            os.replace(part, pdf_path)
+            discard_part(part)
+
+            entry.update(path=pdf_path, url=pdf_url, etag=meta.get("etag", ""),
+                         last_modified=meta.get("last_modified", ""))
+            return entry
+
+        except InvalidPdf as e:
+            print(f"⚠ PDF download failed: {e}")
+            discard_part(part)
+            time.sleep(5 * attempt)
+
+        except Exception as e:
+            # Network errors, 429s and short reads keep the partial file
+            print(f"⚠ PDF download failed: {e}")
+            time.sleep(5 * attempt)
+
+    count("failures_total", stage="pdf_download")
+    return None
+
+
+def fetch_pdf(session, pdf_url, pdf_path, limiter, known=None):
+    if known is None and os.path.exists(pdf_path):
+        entry = verify_existing(pdf_path)
+        if entry:
+            entry.update(path=pdf_path, url=pdf_url)
+            return entry
+
+    return download_pdf(session, pdf_url, pdf_path, limiter, known)
+
+# =========================
+# BACKGROUND DOWNLOAD QUEUE
+# =========================
+
+class PdfDownloader:
+    def __init__(self, limiter, manifest, on_done, on_failed,
+                 workers=DOWNLOAD_WORKERS, queue_size=DOWNLOAD_QUEUE_SIZE, refresh=False):
+        self.limiter = limiter
+        self.manifest = manifest
+        self.on_done = on_done          # on_done(record), plain function or coroutine
+        self.on_failed = on_failed      # on_failed(record, error)
+        self.refresh = refresh          # re-check manifest entries with conditional requests
+        self.workers = workers
+        self.session = make_session(workers)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.pending = set()            # keys queued or downloading
+        self.tasks = []
+
+    def __contains__(self, key):
+        return key in self.pending
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+
+    async def submit(self, key, pdf_url, pdf_path, record):
+        # Waits while the queue is full (backpressure on the page workers)
+        self.pending.add(key)
+        await self.queue.put((key, pdf_url, pdf_path, record))
+
+    async def finish(self, record):
+        # A coroutine on_done (streaming pipeline) waits for room downstream
+        done = self.on_done(record)
+        if asyncio.iscoroutine(done):
+            await done
+
+    async def worker(self):
+        while True:
+            key, pdf_url, pdf_path, record = await self.queue.get()
+            try:
+                # A manifest entry was verified when it was written: trust it
+                # without stat-ing or re-reading the file
+                known = self.manifest.get(key)
+                if known and not self.refresh:
+                    await self.finish(record)
+                    continue
+
+                # requests is blocking; run it off the event loop
+                entry = await asyncio.to_thread(
+                    fetch_pdf, self.session, pdf_url, pdf_path, self.limiter, known
+                )
+                if entry:
+                    self.manifest.put(dict(entry, key=key))
+                    await self.finish(record)
+                else:
+                    self.on_failed(record, "PDF failed after retries")
+            except Exception as e:
+                self.on_failed(record, e)
+            finally:
+                self.pending.discard(key)
+                self.queue.task_done()
+
+    async def drain(self):
+        await self.queue.join()
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.session.close()
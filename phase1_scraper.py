@@ -1,9 +1,16 @@
-from playwright.sync_api import sync_playwright
-import csv
-import json
 import os
+import asyncio
+import argparse
 import calendar
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from dom_extract import RESULT_PAGE_JS, NEXT_PAGE_SELECTOR, result_row
+from browser_pool import browser_pool
+from crs_http import CrsClient, NeedsBrowser
+from metrics import count, timer, finish
+from profiling import add_arguments, configure, profile_phase, profile_record, memory_budget
+from rate_limit import HostRateLimiter
+from state_store import StateStore
 
 # ======================
 # SAFE PRINT
@@ -18,38 +25,47 @@ def safe_print(msg):
 # ======================
 # CONFIG
 # ======================
-BASE_URL = "https://crs.cookcountyclerkil.gov"
+BASE_URL = os.environ.get("CRS_BASE_URL", "https://crs.cookcountyclerkil.gov")
 SEARCH_URL = f"{BASE_URL}/Search"
 
 CSV_FILE = "phase1_results.csv"
 JSON_FILE = "phase1_results.json"
 
+FIELDS = [
+    "Empty", "View URL", "Document Number", "Recorded Date",
+    "Filed Date", "Document Type", "Empty2",
+    "Company", "Name", "Phone", "Parcel/Address"
+]
+
+DOC_TYPE = "LIS PENDENS FORECLOSURE"   # the only type before --doc-type existed
+DOC_TYPES = [DOC_TYPE]
+HEADLESS = False
+ENGINE = "http"             # "http" (browserless, browser as fallback) or "browser"
+RATE_PER_HOST = 1.0         # HTTP engine requests/sec, shared by all workers
+
+BACKFILL_START = datetime(2024, 1, 1)   # also the start for a type with no watermark yet
+OVERLAP_DAYS = 7            # re-query this far behind the watermark (late recordings)
+CONTEXTS = 4                # concurrent windows (browser contexts / HTTP sessions)
+MAX_WINDOW_ATTEMPTS = 2     # per window, per run (checkpoint is kept either way)
+
 
 # ======================
-# LOAD EXISTING DOCS
+# LOAD EXISTING DOCS (STATE STORE)
 # ======================
-def load_existing_docs():
-    seen = set()
+def load_existing_docs(store):
+    seen_docs = store.phase("phase1", key="Document Number")
+
+    # One-time import of outputs written before the state store existed
+    imported = seen_docs.seed(JSON_FILE, CSV_FILE)
+    if imported:
+        safe_print(f"[INFO] Imported {imported} existing documents from CSV/JSON")
 
-    # Load from CSV
-    if os.path.exists(CSV_FILE):
-        with open(CSV_FILE, newline="", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            next(reader, None)
-            for r in reader:
-                if len(r) > 2:
-                    seen.add(r[2])
+    safe_print(f"[INFO] {len(seen_docs)} documents already in the state store")
+    return seen_docs
 
-    # Load from JSON
-    if os.path.exists(JSON_FILE):
-        with open(JSON_FILE, encoding="utf-8") as f:
-            data = json.load(f)
-            for item in data:
-                if "Document Number" in item:
-                    seen.add(item["Document Number"])
 
-    safe_print(f"[INFO] Loaded {len(seen)} existing document numbers from CSV/JSON")
-    return seen
+def export_results(seen_docs):
+    seen_docs.export(CSV_FILE, JSON_FILE, fieldnames=FIELDS)
 
 
 # ======================
@@ -71,119 +87,396 @@ def get_month_dates(year, month):
     )
 
 
+def month_windows(doc_type, start, end):
+    # Newest month first, back to `start` (its month is clipped to start there)
+    current = end.replace(day=1)
+    while current >= start.replace(day=1):
+        from_date, to_date = get_month_dates(current.year, current.month)
+        if (current.year, current.month) == (start.year, start.month):
+            from_date = start.strftime("%m/%d/%Y")
+        yield (doc_type, from_date, to_date)
+
+        if current.month == 1:
+            current = current.replace(year=current.year - 1, month=12)
+        else:
+            current = current.replace(month=current.month - 1)
+
+
+def parse_recorded(value):
+    # "Recorded Date" column: MM/DD/YYYY, possibly followed by a time
+    try:
+        return datetime.strptime(str(value).split()[0], "%m/%d/%Y")
+    except (ValueError, IndexError):
+        return None
+
+
+def latest_on_page(snapshot, latest=None):
+    for cells in snapshot["rows"]:
+        recorded = parse_recorded(cells[3]["text"]) if len(cells) > 3 else None
+        if recorded and (latest is None or recorded > latest):
+            latest = recorded
+    return latest
+
+
 # ======================
-# PHASE 1 CORE (STOP ON ANY DUPLICATE)
+# WATERMARKS (INCREMENTAL RANGE PER DOCUMENT TYPE)
 # ======================
-def run_phase1(from_date, to_date, seen_docs):
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
-        page.goto(SEARCH_URL)
+def latest_recorded(seen_docs, doc_type):
+    # One-time scan for stores written before watermarks existed
+    rows = [r for r in seen_docs.values() if r.get("Document Type") == doc_type]
+    if not rows and doc_type == DOC_TYPE:
+        rows = seen_docs.values()
 
-        page.click("text=Advanced Search")
-        page.wait_for_timeout(1000)
+    dates = [d for d in (parse_recorded(r.get("Recorded Date")) for r in rows) if d]
+    return max(dates) if dates else None
 
-        accordion = page.query_selector(
-            "button.accordion-button:has-text('Document Type Search')"
-        )
-        accordion.scroll_into_view_if_needed()
-        accordion.click()
 
-        page.wait_for_selector("div#collapse3.accordion-collapse.show")
+def incremental_windows(doc_type, watermarks, seen_docs, today):
+    mark = watermarks.get(doc_type) or latest_recorded(seen_docs, doc_type)
+    if mark is None:
+        safe_print(f"[INFO] {doc_type}: no watermark yet, searching from {BACKFILL_START:%m/%d/%Y}")
+        return list(month_windows(doc_type, BACKFILL_START, today))
 
-        page.select_option(
-            "div#collapse3 select#DocumentType",
-            label="LIS PENDENS FORECLOSURE"
-        )
+    start = mark - timedelta(days=OVERLAP_DAYS)
+    safe_print(f"[INFO] {doc_type}: watermark {mark:%m/%d/%Y}, searching {start:%m/%d/%Y} → {today:%m/%d/%Y}")
 
-        # Fill date range
-        page.fill("div#collapse3 input#RecordedFromDate", from_date)
-        page.fill("div#collapse3 input#RecordedToDate", to_date)
+    # A daily run is one small query; a long gap is split into month windows
+    if (today - start).days > 31:
+        return list(month_windows(doc_type, start, today))
+    return [(doc_type, start.strftime("%m/%d/%Y"), today.strftime("%m/%d/%Y"))]
 
-        page.click("div#collapse3 button[type='submit']")
-        page.wait_for_selector("table tbody tr", timeout=30000)
 
-        while True:
-            rows = page.query_selector_all("table tbody tr")
-
-            for row in rows:
-                cells = row.query_selector_all("td")
-                if len(cells) < 3:
-                    continue
-
-                doc_number = cells[2].inner_text().strip()
-
-                # ❌ Stop immediately if duplicate found
-                if doc_number in seen_docs:
-                    safe_print(f"[STOP] Document already exists: {doc_number}")
-                    browser.close()
-                    return False
-
-                # Collect row data
-                row_data = []
-                for i, cell in enumerate(cells):
-                    if i == 1:
-                        link = cell.query_selector("a")
-                        href = link.get_attribute("href") if link else ""
-                        row_data.append(BASE_URL + href if href else "")
-                    else:
-                        row_data.append(cell.inner_text().strip())
-
-                # Write immediately to CSV
-                file_exists = os.path.exists(CSV_FILE)
-                with open(CSV_FILE, "a", newline="", encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    if not file_exists:
-                        writer.writerow([
-                            "Empty", "View URL", "Document Number", "Recorded Date",
-                            "Filed Date", "Document Type", "Empty2",
-                            "Company", "Name", "Phone", "Parcel/Address"
-                        ])
-                    writer.writerow(row_data)
-
-                # Update seen_docs to prevent re-processing within the same run
-                seen_docs.add(doc_number)
-
-            # Pagination
-            next_btn = page.query_selector("li.PagedList-skipToNext a[rel='next']")
-            if next_btn:
-                next_btn.click()
-                page.wait_for_timeout(2000)
-            else:
-                break
+def advance_watermarks(watermarks, todo, finished):
+    # Only when every window of a type finished, so a failed window is
+    # searched again next run instead of falling behind the mark
+    for doc_type in dict.fromkeys(w[0] for w in todo):
+        mine = [w for w in todo if w[0] == doc_type]
+        if not all(w in finished for w in mine):
+            safe_print(f"[WARN] {doc_type}: watermark not advanced ({len(mine)} windows, some failed)")
+            continue
 
-        browser.close()
+        dates = [finished[w] for w in mine if finished[w]]
+        if dates:
+            mark = watermarks.advance(doc_type, max(dates))
+            safe_print(f"[OK] {doc_type}: watermark at {mark:%m/%d/%Y}")
 
-    safe_print(f"[OK] Month {from_date} → {to_date} scraped successfully")
-    return True
+
+# ======================
+# SEARCH FORM
+# ======================
+async def open_search(page, doc_type, from_date, to_date):
+    await page.goto(SEARCH_URL)
+
+    await page.click("text=Advanced Search")
+    await page.wait_for_timeout(1000)
+
+    accordion = await page.query_selector(
+        "button.accordion-button:has-text('Document Type Search')"
+    )
+    await accordion.scroll_into_view_if_needed()
+    await accordion.click()
+
+    await page.wait_for_selector("div#collapse3.accordion-collapse.show")
+
+    await page.select_option(
+        "div#collapse3 select#DocumentType",
+        label=doc_type
+    )
+
+    # Fill date range
+    await page.fill("div#collapse3 input#RecordedFromDate", from_date)
+    await page.fill("div#collapse3 input#RecordedToDate", to_date)
+
+    await page.click("div#collapse3 button[type='submit']")
+    await page.wait_for_selector("table tbody tr", timeout=30000)
 
 
 # ======================
-# AUTO MONTH LOOP
+# SEARCH ENGINES (SAME RESULT-PAGE SNAPSHOTS)
 # ======================
-def run_auto():
-    seen_docs = load_existing_docs()
-    current = datetime.today().replace(day=1)
-    stop_date = datetime(2024, 1, 1)
+class BrowserSearch:
+    # Playwright: drives the visible form (fallback engine)
+    def __init__(self, context):
+        self.context = context
+        self.page = None
 
-    while current >= stop_date:
-        from_date, to_date = get_month_dates(current.year, current.month)
-        safe_print(f"[INFO] Scraping {from_date} → {to_date}")
+    async def search(self, doc_type, from_date, to_date):
+        self.page = self.page or await self.context.new_page()
+        with timer("page_navigation_seconds", page="search", engine="browser"):
+            await open_search(self.page, doc_type, from_date, to_date)
+        return await self.snapshot()
+
+    async def next_page(self, snapshot):
+        with timer("page_navigation_seconds", page="results", engine="browser"):
+            await self.page.click(NEXT_PAGE_SELECTOR)
+            await self.page.wait_for_timeout(2000)
+        return await self.snapshot()
+
+    async def snapshot(self):
+        with timer("dom_extraction_seconds", page="results", engine="browser"):
+            return await self.page.evaluate(RESULT_PAGE_JS)
+
+    async def reset(self):
+        # Fresh page in case this one is wedged
+        if self.page:
+            await self.page.close()
+        self.page = None
+
+    async def close(self):
+        await self.context.close()
+
+
+class HttpSearch:
+    # Browserless: form submit + result pages over a pooled session,
+    # parsed off the event loop (the state store stays on it)
+    def __init__(self, client):
+        self.client = client
+
+    async def search(self, doc_type, from_date, to_date):
+        return await asyncio.to_thread(self.client.search, SEARCH_URL, doc_type, from_date, to_date)
+
+    async def next_page(self, snapshot):
+        return await asyncio.to_thread(self.client.results, snapshot["next_href"])
+
+    async def reset(self):
+        self.client.reset()
 
-        cont = run_phase1(from_date, to_date, seen_docs)
-        if cont is False:
-            safe_print("[STOP] Scraper halted completely due to duplicate document")
+    async def close(self):
+        self.client.close()
+
+
+# ======================
+# ONE DATE WINDOW (CHECKPOINT AFTER EVERY RESULTS PAGE)
+# ======================
+async def scrape_window(engine, window, seen_docs, windows, sink=None):
+    # Returns the latest recorded date seen in the window (or None).
+    # `sink` (streaming pipeline) gets every new row as soon as it is saved.
+    doc_type, from_date, to_date = window
+    state = windows.get(window)
+    page_no = 1
+    latest = None
+
+    snapshot = await engine.search(doc_type, from_date, to_date)
+
+    if state and state["status"] != "done" and state["last_page"]:
+        # The site keeps the search in the session, which a retry (fresh
+        # session) or a new run no longer has, so a saved results link
+        # cannot be trusted: search again and page forward past the pages
+        # already saved. Their rows are in the store and are skipped.
+        safe_print(f"[INFO] Resuming {from_date} → {to_date} after page {state['last_page']}")
+        while page_no <= state["last_page"] and snapshot["has_next"]:
+            latest = latest_on_page(snapshot, latest)
+            snapshot = await engine.next_page(snapshot)
+            page_no += 1
+
+    while True:
+        # Whole results page in one snapshot (rows, cells, links, next)
+        new_rows = 0
+        latest = latest_on_page(snapshot, latest)
+
+        for cells in snapshot["rows"]:
+            if len(cells) < 3:
+                continue
+
+            doc_number = cells[2]["text"]
+
+            # Shared seen-set: the overlap window, another window or an
+            # earlier run already has it
+            if doc_number in seen_docs:
+                continue
+
+            # Commit immediately to the state store; this also marks the
+            # document as seen for every other window
+            row = dict(zip(FIELDS, result_row(cells, BASE_URL)))
+            seen_docs.append(row)
+            new_rows += 1
+
+            if sink:
+                await sink(row)   # waits while phase 2 is behind (backpressure)
+
+        windows.page_done(window, page_no, snapshot["next_href"], new_rows)
+        count("records_total", new_rows, phase="phase1")
+
+        # Pagination
+        if not snapshot["has_next"]:
             break
+        snapshot = await engine.next_page(snapshot)
+        page_no += 1
 
-        # Move to previous month
-        if current.month == 1:
-            current = current.replace(year=current.year - 1, month=12)
-        else:
-            current = current.replace(month=current.month - 1)
+    windows.complete(window)
+    safe_print(f"[OK] {doc_type} {from_date} → {to_date} scraped successfully ({page_no} pages)")
+    return latest
+
+
+# ======================
+# WINDOW POOL (PARALLEL WINDOWS, ONE ENGINE PER WORKER)
+# ======================
+async def window_worker(engine, queue, seen_docs, windows, attempts, finished, fallback, sink=None):
+    budget = memory_budget()
+    try:
+        while True:
+            try:
+                window = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                async with budget.intake():
+                    with profile_record(f"{window[0]} {window[1]} → {window[2]}"):
+                        finished[window] = await scrape_window(engine, window, seen_docs, windows, sink)
+            except NeedsBrowser as e:
+                count("browser_fallbacks_total", stage="search_window")
+                windows.fail(window, e)
+                fallback.append(window)
+                safe_print(f"[WARN] {window[1]} → {window[2]} needs the browser: {e}")
+            except Exception as e:
+                attempts[window] = attempts.get(window, 0) + 1
+                windows.fail(window, e)
+                count("failures_total", stage="search_window")
+                safe_print(f"[WARN] {window[1]} → {window[2]} failed, checkpoint kept: {e}")
+
+                if attempts[window] < MAX_WINDOW_ATTEMPTS:
+                    count("retries_total", stage="search_window")
+                    queue.put_nowait(window)
+                else:
+                    fallback.append(window)
+                await engine.reset()
+    finally:
+        await engine.close()
+
+
+async def run_pool(engines, todo, seen_docs, windows, finished, sink=None):
+    # Returns the windows left over for a fallback engine
+    queue = asyncio.Queue()
+    for window in todo:
+        queue.put_nowait(window)
+
+    attempts = {}
+    fallback = []
+    await asyncio.gather(*(
+        window_worker(engine, queue, seen_docs, windows, attempts, finished, fallback, sink)
+        for engine in engines
+    ))
+    return fallback
+
+
+async def scrape_windows(seen_docs, windows, todo, contexts, engine=ENGINE, sink=None, limiter=None):
+    # Returns {window: latest recorded date} for the windows that finished.
+    # The streaming pipeline passes its CRS limiter, shared with phase 2.
+    finished = {}
+    workers = min(contexts, len(todo))
+    if not todo:
+        return finished
+
+    if engine == "http":
+        limiter = limiter or HostRateLimiter(RATE_PER_HOST)
+        engines = [HttpSearch(CrsClient(BASE_URL, limiter)) for _ in range(workers)]
+        todo = await run_pool(engines, todo, seen_docs, windows, finished, sink)
+        if not todo:
+            return finished
+        safe_print(f"[INFO] Falling back to the browser for {len(todo)} windows")
+
+    async with browser_pool() as pool:
+        browser = await pool.browser(headless=HEADLESS)
+        engines = [BrowserSearch(await browser.new_context()) for _ in range(min(workers, len(todo)))]
+        await run_pool(engines, todo, seen_docs, windows, finished, sink)
+
+    return finished
+
+
+def print_window_summary(windows):
+    for status, (count, docs) in windows.summary().items():
+        safe_print(f"[INFO] Windows {status}: {count} ({docs} documents)")
+
+
+# ======================
+# PHASE 1 CORE (INCREMENTAL FROM THE WATERMARK)
+# ======================
+async def run_phase1_async(doc_types=DOC_TYPES, contexts=CONTEXTS, engine=ENGINE):
+    store = StateStore()
+    seen_docs = load_existing_docs(store)
+    windows = store.windows()
+    watermarks = store.watermarks()
+    today = datetime.today()
+
+    # Recent windows are searched again even if done: new documents keep
+    # being recorded into them
+    todo = [
+        w for doc_type in doc_types
+        for w in incremental_windows(doc_type, watermarks, seen_docs, today)
+    ]
+
+    try:
+        finished = await scrape_windows(seen_docs, windows, todo, contexts, engine)
+        advance_watermarks(watermarks, todo, finished)
+    finally:
+        export_results(seen_docs)
+        store.close()
+
+
+def run_phase1(doc_types=DOC_TYPES, contexts=CONTEXTS, engine=ENGINE):
+    asyncio.run(run_phase1_async(doc_types, contexts, engine))
+
+
+# ======================
+# BACKFILL (EVERY MONTH WINDOW, RESUMABLE)
+# ======================
+def run_backfill(doc_types=DOC_TYPES, start=BACKFILL_START, contexts=CONTEXTS, engine=ENGINE):
+    store = StateStore()
+    seen_docs = load_existing_docs(store)
+    windows = store.windows()
+    today = datetime.today()
+
+    todo = [
+        w for doc_type in doc_types
+        for w in month_windows(doc_type, start, today) if not windows.done(w)
+    ]
+    safe_print(f"[INFO] Backfill: {len(todo)} windows to scrape over {min(contexts, len(todo))} {engine} workers")
+
+    try:
+        finished = asyncio.run(scrape_windows(seen_docs, windows, todo, contexts, engine))
+        advance_watermarks(store.watermarks(), todo, finished)
+    finally:
+        print_window_summary(windows)
+        export_results(seen_docs)
+        store.close()
 
 
 # ======================
 # ENTRY POINT
 # ======================
 if __name__ == "__main__":
-    run_auto()
+    parser = argparse.ArgumentParser(description="Phase 1 — CRS document search")
+    parser.add_argument(
+        "--backfill", action="store_true",
+        help="Scrape every month window concurrently, resuming from checkpoints"
+    )
+    parser.add_argument(
+        "--since", type=lambda s: datetime.strptime(s, "%Y-%m"), default=BACKFILL_START,
+        help="First month of the backfill (YYYY-MM)"
+    )
+    parser.add_argument(
+        "--contexts", type=int, default=CONTEXTS,
+        help="Concurrent windows (browser contexts / HTTP sessions)"
+    )
+    parser.add_argument(
+        "--engine", choices=["http", "browser"], default=ENGINE,
+        help="http: plain HTTP search with the browser as fallback; browser: Playwright only"
+    )
+    parser.add_argument(
+        "--doc-type", dest="doc_types", action="append",
+        help=f"Document type to search; repeat for several (default: {DOC_TYPE})"
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+    doc_types = args.doc_types or DOC_TYPES
+    configure(args.profile, args.memory_budget)
+
+    try:
+        with profile_phase("phase1"):
+            if args.backfill:
+                run_backfill(doc_types, args.since, args.contexts, args.engine)
+            else:
+                run_phase1(doc_types, args.contexts, args.engine)
+    finally:
+        finish("phase1")
@@ -1,11 +1,18 @@
-from playwright.sync_api import sync_playwright
-import csv
-import json
 import os
 import time
-import requests
+import asyncio
+import argparse
 
-BASE_URL = "https://crs.cookcountyclerkil.gov"
+from browser_pool import browser_pool, close_quietly
+from dom_extract import VIEW_PAGE_JS
+from crs_http import CrsClient, NeedsBrowser
+from metrics import count, timer, finish
+from profiling import add_arguments, configure, profile_phase, profile_record, memory_budget
+from pdf_downloader import PdfDownloader, DOWNLOAD_WORKERS
+from rate_limit import HostRateLimiter, Throughput, TooManyRequests, retry_after_seconds
+from state_store import StateStore
+
+BASE_URL = os.environ.get("CRS_BASE_URL", "https://crs.cookcountyclerkil.gov")
 
 PHASE1_CSV = "phase1_results.csv"
 PHASE2_CSV = "phase2_results.csv"
@@ -14,22 +21,26 @@ PHASE2_JSON = "phase2_results.json"
 PDF_DIR = "pdf"
 os.makedirs(PDF_DIR, exist_ok=True)
 
-MAX_PDF_RETRIES = 3
-PDF_MIN_SIZE = 10_000  # bytes
+PAGES = 3               # concurrent view pages (one worker each)
+ENGINE = "http"         # "http" (browser only for human checks) or "browser"
+BROWSER_AFTER = 5       # consecutive non-document responses before the rest go to the browser
+QUICK_RESTARTS = 3      # crashed browsers replaced at once, before waiting between restarts
+RATE_PER_HOST = 1.0     # politeness ceiling, requests/sec per host
+REPORT_EVERY = 10       # records between throughput lines
 
 
 # =========================
 # CLOUDFLARE HUMAN CHECK
 # =========================
-def wait_for_cloudflare(page, timeout=120):
+async def wait_for_cloudflare(page, timeout=120):
     print("⏳ Checking for Cloudflare...")
     start = time.time()
 
     while time.time() - start < timeout:
-        html = page.content().lower()
+        html = (await page.content()).lower()
         if "cloudflare" in html or "checking your browser" in html or "cf-turnstile" in html:
             print("🛑 Cloudflare detected. Please solve it in the browser...")
-            time.sleep(2)
+            await asyncio.sleep(2)
         else:
             print("✅ Cloudflare cleared.")
             return
@@ -38,167 +49,410 @@ def wait_for_cloudflare(page, timeout=120):
 
 
 # =========================
-# LOAD PHASE 1
+# LOAD PHASE 1 (STATE STORE)
 # =========================
-def load_phase1():
-    with open(PHASE1_CSV, newline="", encoding="utf-8") as f:
-        return [r for r in csv.DictReader(f) if r.get("View URL")]
+def load_phase1(store):
+    phase1 = store.phase("phase1", key="Document Number")
+    if not len(phase1):
+        phase1.seed(PHASE1_CSV)
+    return [r for r in phase1.values() if r.get("View URL")]
 
 
 # =========================
-# LOAD COMPLETED DOCS (CSV + PDF)
+# COMPLETED DOCS (STATE STORE)
 # =========================
-def load_completed_docs():
-    done = set()
-    if not os.path.exists(PHASE2_CSV):
-        return done
+def load_completed_docs(store):
+    # A document is only stored as done once its PDF passed the size check,
+    # so membership is an indexed lookup instead of a stat per PDF
+    docs = store.phase("phase2", key="Document Number", artifact="PDF Path")
 
-    with open(PHASE2_CSV, newline="", encoding="utf-8") as f:
-        for r in csv.DictReader(f):
-            pdf_path = r.get("PDF Path", "")
-            if pdf_path and os.path.exists(pdf_path) and os.path.getsize(pdf_path) >= PDF_MIN_SIZE:
-                done.add(r["Document Number"])
-    return done
+    imported = docs.seed(PHASE2_JSON)
+    if imported:
+        print(f"📥 Imported {imported} existing records into the state store")
 
+    return docs
 
-# =========================
-# PDF DOWNLOAD WITH RETRY
-# =========================
-def download_pdf(pdf_url, pdf_path):
-    if os.path.exists(pdf_path) and os.path.getsize(pdf_path) >= PDF_MIN_SIZE:
-        return True
 
-    for attempt in range(1, MAX_PDF_RETRIES + 1):
-        try:
-            print(f"⬇️ Downloading PDF (attempt {attempt})")
-            r = requests.get(pdf_url, timeout=60)
+def export_results(completed_docs):
+    completed_docs.export(PHASE2_CSV, PHASE2_JSON)
 
-            if r.status_code == 429:
-                raise Exception("429 Too Many Requests")
 
-            r.raise_for_status()
+# =========================
+# RESOLVED VIEW PAGES (PDF URL PER DOCUMENT)
+# =========================
+class ViewCache:
+    # Reruns go straight to the PDF download. An entry that was used and
+    # still failed is dropped, so the next run reads the view page again.
+    def __init__(self, store):
+        self.table = store.phase("view", key="Document Number")
+        self.used = set()
+
+    def get(self, key):
+        if key not in self.table:
+            return None
+        self.used.add(key)
+        cached = self.table.get(key)
+        pdf_url = cached.pop("PDF URL", "")
+        return cached, pdf_url
+
+    def put(self, key, data, pdf_url):
+        self.table.upsert(key, dict(data, **{"PDF URL": pdf_url}))
+        self.table.db.commit()
+
+    def failed(self, key):
+        if key in self.used:
+            self.table.forget(key)
+            self.used.discard(key)
 
-            tmp = pdf_path + ".tmp"
-            with open(tmp, "wb") as f:
-                f.write(r.content)
 
-            if os.path.getsize(tmp) < PDF_MIN_SIZE:
-                raise Exception("PDF too small")
+# =========================
+# SCRAPE SINGLE VIEW PAGE (HTTP FIRST)
+# =========================
+async def fetch_view(client, record):
+    # One GET + the stdlib parser; NeedsBrowser when a human check (or any
+    # page that is not the document) comes back
+    fields = await asyncio.to_thread(client.view, record["View URL"])
+    return view_record(fields, record)
 
-            os.replace(tmp, pdf_path)
-            return True
 
-        except Exception as e:
-            print(f"⚠ PDF download failed: {e}")
-            time.sleep(5 * attempt)
+async def scrape_view(page, record, limiter):
+    await limiter.acquire_async(record["View URL"])
+    with timer("page_navigation_seconds", page="view", engine="browser"):
+        response = await page.goto(record["View URL"], timeout=60000)
 
-    return False
+    if response and response.status == 429:
+        rate = limiter.penalize(
+            record["View URL"], retry_after_seconds(await response.header_value("retry-after"))
+        )
+        raise TooManyRequests(f"429 Too Many Requests (rate now {rate:.2f}/s)")
+    limiter.success(record["View URL"])
 
+    await wait_for_cloudflare(page)
 
-# =========================
-# SCRAPE SINGLE VIEW PAGE
-# =========================
-def scrape_view(page, record):
-    page.goto(record["View URL"], timeout=60000)
-    wait_for_cloudflare(page)
+    await page.wait_for_selector("#divcol1 table tbody tr", timeout=30000)
 
-    page.wait_for_selector("#divcol1 table tbody tr", timeout=30000)
+    # All fields and the PDF iframe in one round trip
+    with timer("dom_extraction_seconds", page="view", engine="browser"):
+        fields = await page.evaluate(VIEW_PAGE_JS)
+    return view_record(fields, record)
 
-    def safe_text(selector):
-        el = page.query_selector(selector)
-        return el.inner_text().strip() if el else ""
 
-    doc_number = safe_text("#divcol1 table tbody tr:nth-child(1) td")
-    doc_type = safe_text("#divcol1 table tbody tr:nth-child(2) td")
-    date_recorded = safe_text("#divcol1 table tbody tr:nth-child(3) td")
-    address = safe_text("#divcol1 table tbody tr:nth-child(6) td span")
-
-    iframe = page.query_selector("iframe#iframe")
+def view_record(fields, record):
+    pdf_url = ""
     pdf_path = ""
 
-    if iframe:
-        src = iframe.get_attribute("src")
-        if src:
-            pdf_url = BASE_URL + src
-            pdf_path = os.path.join(PDF_DIR, f"{doc_number}.pdf")
-
-            if not download_pdf(pdf_url, pdf_path):
-                raise Exception("PDF failed after retries")
+    if fields["pdf_src"]:
+        pdf_url = BASE_URL + fields["pdf_src"]
+        pdf_path = os.path.join(PDF_DIR, f"{fields['doc_number']}.pdf")
 
-    return {
-        "Document Number": doc_number,
-        "Document Type": doc_type,
-        "Date Recorded": date_recorded,
-        "Address": address,
+    data = {
+        "Document Number": fields["doc_number"],
+        "Document Type": fields["doc_type"],
+        "Date Recorded": fields["date_recorded"],
+        "Address": fields["address"],
         "View URL": record["View URL"],
         "PDF Path": pdf_path
     }
+    return data, pdf_url
 
 
 # =========================
-# MAIN PHASE 2 (AUTO RESUME)
+# WORKER POOLS (SHARED RATE LIMITER, PDFs IN THE BACKGROUND)
 # =========================
-def run_phase2():
-    phase1_records = load_phase1()
-    completed_docs = load_completed_docs()
+async def hand_off(record, data, pdf_url, downloader):
+    # The worker moves on while the PDF downloads in the background;
+    # the record is only committed once its PDF is on disk
+    if pdf_url:
+        await downloader.submit(record["Document Number"], pdf_url, data["PDF Path"], data)
+    else:
+        await downloader.finish(data)
+
+
+async def http_worker(client, queue, downloader, views, fallback, challenges):
+    budget = memory_budget()
+    while True:
+        record = await queue.get()
+        try:
+            if challenges["streak"] >= BROWSER_AFTER:
+                fallback.append(record)   # the site wants a human; stop asking
+                continue
+
+            async with budget.intake():
+                with profile_record(record["Document Number"]):
+                    data, pdf_url = await fetch_view(client, record)
+                    challenges["streak"] = 0
+                    print(f"🔎 Scraped: {data['Document Number']}")
 
-    results = []
-    if os.path.exists(PHASE2_JSON):
-        with open(PHASE2_JSON, encoding="utf-8") as f:
-            results = json.load(f)
+                    views.put(record["Document Number"], data, pdf_url)
+                    await hand_off(record, data, pdf_url, downloader)
 
-    while True:  # 🔁 AUTO-RESUME LOOP
+        except NeedsBrowser as e:
+            count("browser_fallbacks_total", stage="view")
+            challenges["streak"] += 1
+            fallback.append(record)
+            print(f"🧭 Needs the browser: {e}")
+
+        except Exception as e:
+            downloader.on_failed(record, e)
+
+        finally:
+            queue.task_done()
+
+
+async def http_batch(records, limiter, pages, downloader, views):
+    # Returns the records that need the browser
+    fallback = []
+    challenges = {"streak": 0}
+    if not records:
+        return fallback
+
+    queue = asyncio.Queue()
+    for record in records:
+        queue.put_nowait(record)
+
+    clients = [CrsClient(BASE_URL, limiter) for _ in range(min(pages, len(records)))]
+    workers = [
+        asyncio.create_task(http_worker(c, queue, downloader, views, fallback, challenges))
+        for c in clients
+    ]
+    try:
+        await queue.join()
+    finally:
+        for w in workers:
+            w.cancel()
+        for c in clients:
+            c.close()
+
+    return fallback
+
+
+async def page_worker(page, queue, limiter, downloader, views):
+    budget = memory_budget()
+    while True:
+        record = await queue.get()
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=False, slow_mo=80)
-                context = browser.new_context()
-                pages = [context.new_page() for _ in range(3)]
+            async with budget.intake():
+                with profile_record(record["Document Number"]):
+                    data, pdf_url = await scrape_view(page, record, limiter)
+                    print(f"🔎 Scraped: {data['Document Number']}")
 
-                for i in range(0, len(phase1_records), 3):
-                    batch = phase1_records[i:i + 3]
+                    views.put(record["Document Number"], data, pdf_url)
+                    await hand_off(record, data, pdf_url, downloader)
 
-                    jobs = [
-                        (page, record)
-                        for page, record in zip(pages, batch)
-                        if record["Document Number"] not in completed_docs
-                    ]
+        except Exception as e:
+            downloader.on_failed(record, e)
 
-                    for page, record in jobs:
-                        try:
-                            data = scrape_view(page, record)
+            if page.is_closed():
+                raise  # browser went away; let the pool restart it
 
-                            completed_docs.add(data["Document Number"])
-                            results.append(data)
+        finally:
+            queue.task_done()
 
-                            file_exists = os.path.exists(PHASE2_CSV)
-                            with open(PHASE2_CSV, "a", newline="", encoding="utf-8") as f:
-                                writer = csv.DictWriter(f, fieldnames=data.keys())
-                                if not file_exists:
-                                    writer.writeheader()
-                                writer.writerow(data)
 
-                            with open(PHASE2_JSON, "w", encoding="utf-8") as f:
-                                json.dump(results, f, indent=4)
+async def browser_batch(records, limiter, pages, downloader, views):
+    if not records:
+        return
 
-                            print(f"✅ Scraped: {data['Document Number']}")
+    queue = asyncio.Queue()
+    for record in records:
+        queue.put_nowait(record)
 
-                        except Exception as e:
-                            print(f"❌ Record failed, will retry later: {e}")
+    async with browser_pool() as pool:
+        browser = await pool.browser(headless=False, slow_mo=80)
+        context = await browser.new_context()
+        workers = [
+            asyncio.create_task(
+                page_worker(await context.new_page(), queue, limiter, downloader, views)
+            )
+            for _ in range(min(pages, len(records)))
+        ]
 
-                        time.sleep(1.5)
+        try:
+            # Finishes when the queue drains, or raises as soon as a worker dies
+            drained = asyncio.create_task(queue.join())
+            await asyncio.wait([drained, *workers], return_when=asyncio.FIRST_COMPLETED)
+            for w in workers:
+                if w.done() and w.exception():
+                    raise w.exception()
+        finally:
+            for w in workers:
+                w.cancel()
+            await close_quietly(context)
+
+
+async def scrape_batch(records, limiter, pages, downloader, views, engine=ENGINE):
+    # Cached views skip the view page entirely
+    todo = []
+    for record in records:
+        cached = views.get(record["Document Number"])
+        if cached:
+            print(f"♻️ Cached view: {record['Document Number']}")
+            await hand_off(record, *cached, downloader)
+        else:
+            todo.append(record)
 
-                browser.close()
-                print("🎉 All records processed")
-                return
+    if engine == "http":
+        todo = await http_batch(todo, limiter, pages, downloader, views)
+        if todo:
+            print(f"🧭 Opening the browser for {len(todo)} view pages")
 
-        except Exception as e:
-            print(f"🔥 Browser crashed: {e}")
-            print("🔁 Restarting browser in 30 seconds...")
-            time.sleep(30)
+    await browser_batch(todo, limiter, pages, downloader, views)
+
+
+# =========================
+# SCRAPE LOOP (AUTO RESUME)
+# =========================
+def record_callbacks(completed_docs, views, limiter, meter):
+    # -> (saved, failed) for the PDF downloader, committed as they happen
+    def saved(data):
+        completed_docs.append(data)
+        meter.done += 1
+        count("records_total", phase="phase2")
+
+        print(f"✅ Saved: {data['Document Number']}")
+        if meter.done % REPORT_EVERY == 0:
+            meter.report(limiter)
+
+    def failed(record, error):
+        completed_docs.fail(record["Document Number"], error)
+        views.failed(record["Document Number"])
+        meter.failed += 1
+        count("failures_total", stage="view")
+        print(f"❌ Record failed, will retry later: {error}")
+
+    return saved, failed
+
+
+async def scrape_records(phase1_records, completed_docs, manifest, views, pages=PAGES,
+                         rate=RATE_PER_HOST, downloads=DOWNLOAD_WORKERS, engine=ENGINE):
+    limiter = HostRateLimiter(rate, burst=pages)
+    meter = Throughput()
+    saved, failed = record_callbacks(completed_docs, views, limiter, meter)
+
+    downloader = PdfDownloader(limiter, manifest, saved, failed, workers=downloads)
+    downloader.start()
+    restarts = 0
+
+    try:
+        async with browser_pool() as pool:
+            while True:  # 🔁 AUTO-RESUME LOOP
+                pending = [
+                    r for r in phase1_records
+                    if r["Document Number"] not in completed_docs and r["Document Number"] not in downloader
+                ]
+
+                try:
+                    await scrape_batch(pending, limiter, pages, downloader, views, engine)
+                    break
+
+                except Exception as e:
+                    print(f"🔥 Browser crashed: {e}")
+                    restarts += 1
+
+                    # Health check: a dead browser is replaced by the pool on
+                    # the next batch; anything else gets a pause first
+                    if not pool.healthy() and restarts <= QUICK_RESTARTS:
+                        print("🔁 Restarting browser now...")
+                        continue
+                    print("🔁 Restarting browser in 30 seconds...")
+                    await asyncio.sleep(30)
+
+        # Downloads keep going after the browser has closed
+        await downloader.drain()
+        meter.report(limiter, final=True)
+        print("🎉 All records processed")
+
+    finally:
+        await downloader.close()
+
+
+# =========================
+# RE-CHECK DOWNLOADED PDFS (CONDITIONAL REQUESTS)
+# =========================
+async def refresh_pdfs(manifest, rate=RATE_PER_HOST, downloads=DOWNLOAD_WORKERS):
+    # Every manifest entry is re-requested with If-None-Match / If-Modified-Since;
+    # unchanged PDFs cost a 304, changed ones are re-downloaded and re-hashed
+    entries = [e for e in manifest.all().values() if e["url"]]
+    limiter = HostRateLimiter(rate, burst=downloads)
+    failures = []
+
+    downloader = PdfDownloader(
+        limiter, manifest,
+        on_done=lambda entry: None,
+        on_failed=lambda entry, error: failures.append(entry["key"]),
+        workers=downloads, refresh=True
+    )
+    downloader.start()
+
+    try:
+        for entry in entries:
+            await downloader.submit(entry["key"], entry["url"], entry["path"], entry)
+        await downloader.drain()
+    finally:
+        await downloader.close()
+
+    print(f"🔁 Re-checked {len(entries)} PDFs ({len(failures)} failed)")
+
+
+# =========================
+# MAIN PHASE 2
+# =========================
+async def run_phase2_async(pages=PAGES, rate=RATE_PER_HOST, downloads=DOWNLOAD_WORKERS,
+                           refresh=False, engine=ENGINE):
+    store = StateStore()
+    phase1_records = load_phase1(store)
+    completed_docs = load_completed_docs(store)
+    manifest = store.manifest()
+    views = ViewCache(store)
+
+    try:
+        if refresh:
+            await refresh_pdfs(manifest, rate, downloads)
+        await scrape_records(
+            phase1_records, completed_docs, manifest, views, pages, rate, downloads, engine
+        )
+    finally:
+        export_results(completed_docs)
+        store.close()
+
+
+def run_phase2(pages=PAGES, rate=RATE_PER_HOST, downloads=DOWNLOAD_WORKERS, refresh=False,
+               engine=ENGINE):
+    asyncio.run(run_phase2_async(pages, rate, downloads, refresh, engine))
 
 
 # =========================
 # ENTRY POINT
 # =========================
 if __name__ == "__main__":
-    run_phase2()
+    parser = argparse.ArgumentParser(description="Phase 2 — view pages & PDFs")
+    parser.add_argument(
+        "--pages", type=int, default=PAGES,
+        help="Concurrent view pages (HTTP sessions / browser pages)"
+    )
+    parser.add_argument(
+        "--engine", choices=["http", "browser"], default=ENGINE,
+        help="http: plain GET of the view page, browser only for human checks; browser: Playwright only"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=RATE_PER_HOST,
+        help="Max requests/sec per host (lowered automatically on 429)"
+    )
+    parser.add_argument(
+        "--downloads", type=int, default=DOWNLOAD_WORKERS,
+        help="Concurrent PDF downloads (pooled keep-alive connections)"
+    )
+    parser.add_argument(
+        "--refresh-pdfs", action="store_true",
+        help="Re-check every downloaded PDF with conditional requests (ETag / Last-Modified)"
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure(args.profile, args.memory_budget)
+
+    try:
+        with profile_phase("phase2"):
+            run_phase2(pages=args.pages, rate=args.rate, downloads=args.downloads,
+                       refresh=args.refresh_pdfs, engine=args.engine)
+    finally:
+        finish("phase2")
@@ -1,176 +1,802 @@
 import os
 import re
-import csv
 import json
+import glob
+import time
+import hashlib
+import argparse
+import subprocess
+import queue as queue_module
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from pdf2image import convert_from_path
 import pytesseract
 from PIL import Image, ImageEnhance, ImageOps
 
+from field_extractor import extract_fields, extract_case_number, extract_amount, extract_address
+from metrics import count, observe, timer, finish
+from pdf_downloader import file_sha256, count_pages
+from profiling import add_arguments, configure, profile_phase, add_record, memory_budget, profile_dir, worker_call
+from state_store import StateStore, document_key
+
 PDF_DIR = "pdf"
 PHASE3_CSV = "phase3_results.csv"
 PHASE3_JSON = "phase3_results.json"
 
+TESSERACT_CONFIG = "--oem 3 --psm 6"
+TEXT_LAYER_MIN_CHARS = 40   # alphanumerics needed to trust a page's embedded text
+
+OCR_WORKERS = os.cpu_count() or 1
+MAX_PAGE_CRASHES = 2    # worker crashes tolerated per page before giving up on it
+
 # =========================
-# OCR — SCANNED PDF SAFE
+# OCR LADDER (CHEAP FIRST, ESCALATE ON MISSING FIELDS)
 # =========================
-def ocr_pdf(pdf_path):
-    try:
-        images = convert_from_path(pdf_path, dpi=300)
-        full_text = ""
+# Each rung is (dpi, variants). A document only climbs to the next rung
+# while a field is missing or below MIN_FIELD_CONFIDENCE.
+OCR_LADDER = [
+    (200, ("plain",)),
+    (300, ("plain",)),
+    (300, ("enhanced", "inverted")),
+]
+MIN_FIELD_CONFIDENCE = 0.8
+
+# =========================
+# STREAMING / EARLY STOP
+# =========================
+# Pages are rendered one at a time; at most RENDER_WINDOW pages of a
+# document are in flight at once. With EARLY_STOP a document stops being
+# read once every field reaches HIGH_CONFIDENCE.
+RENDER_WINDOW = 4
+EARLY_STOP = True
+HIGH_CONFIDENCE = 0.9
+
+OCR_CACHE_DIR = "ocr_cache"
+OCR_CACHE_MAX_BYTES = 512 * 1024 * 1024
 
-        for img in images:
-            t1 = pytesseract.image_to_string(img, config="--oem 3 --psm 6")
 
-            gray = img.convert("L")
-            contrast = ImageEnhance.Contrast(gray).enhance(3.0)
-            sharp = ImageEnhance.Sharpness(contrast).enhance(2.0)
-            t2 = pytesseract.image_to_string(sharp, config="--oem 3 --psm 6")
+def parse_ladder(spec):
+    # "200:plain,300:plain,300:enhanced+inverted"
+    ladder = []
+    for rung in spec.split(","):
+        dpi, variants = rung.strip().split(":")
+        ladder.append((int(dpi), tuple(variants.split("+"))))
+    return ladder
 
-            inverted = ImageOps.invert(contrast)
-            t3 = pytesseract.image_to_string(inverted, config="--oem 3 --psm 6")
 
-            full_text += "\n".join([t1, t2, t3]) + "\n"
+def ocr_settings(ladder=None, early_stop=EARLY_STOP, window=RENDER_WINDOW):
+    return {
+        "ladder": ladder or OCR_LADDER,
+        "early_stop": early_stop,
+        "window": max(1, window),
+    }
 
-        text = full_text.upper()
-        text = re.sub(r"(\d)\s+(\d)", r"\1\2", text)
-        text = re.sub(r"\s+", " ", text)
+# =========================
+# OCR — IMAGE VARIANTS
+# =========================
+def preprocess(img, variant):
+    if variant == "plain":
+        return img
 
-        return text.strip()
+    gray = img.convert("L")
+    contrast = ImageEnhance.Contrast(gray).enhance(3.0)
 
-    except Exception as e:
-        print(f"❌ OCR failed on {pdf_path}: {e}")
-        return ""
+    if variant == "enhanced":
+        return ImageEnhance.Sharpness(contrast).enhance(2.0)
+    if variant == "inverted":
+        return ImageOps.invert(contrast)
+
+    raise ValueError(f"Unknown OCR variant: {variant}")
+
+
+def ocr_image(img, variants, passes=None):
+    texts = []
+    for v in variants:
+        start = time.perf_counter()
+        texts.append(pytesseract.image_to_string(preprocess(img, v), config=TESSERACT_CONFIG))
+        if passes is not None:
+            passes.append((v, time.perf_counter() - start))
+    return "\n".join(texts) + "\n"
+
+
+DIGIT_GAP = re.compile(r"(\d)\s+(\d)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(full_text):
+    text = full_text.upper()
+    text = DIGIT_GAP.sub(r"\1\2", text)
+    text = WHITESPACE.sub(" ", text)
+
+    return text.strip()
 
 # =========================
-# CASE NUMBER — NO LETTER ASSUMPTIONS
+# OCR — SINGLE PAGE (WORKER SAFE)
 # =========================
-def extract_case_number(text):
-    pattern = re.compile(
-        r"\b(20\d{2}|\d{2})[\s\-]*[A-Z]{1,10}[\s\-]*\d{2,8}\b"
+def ocr_page(pdf_path, page_no, dpi, variants):
+    # -> (text, seconds, timings); the timings travel back from the worker
+    # process so the parent records them
+    start = time.perf_counter()
+    images = convert_from_path(
+        pdf_path, dpi=dpi, first_page=page_no, last_page=page_no
     )
+    render = time.perf_counter() - start
 
-    candidates = []
-    for m in pattern.finditer(text):
-        raw = m.group()
-        cleaned = re.sub(r"[\s\-]+", "", raw)
+    passes = []
+    text = "".join(ocr_image(img, variants, passes) for img in images)
+    return text, time.perf_counter() - start, {"dpi": dpi, "render": render, "passes": passes}
 
-        if not re.search(r"\d{2,8}$", cleaned):
-            continue
 
-        candidates.append(cleaned)
+def record_timings(timings):
+    observe("pdf_render_seconds", timings["render"], dpi=timings["dpi"])
+    for variant, seconds in timings["passes"]:
+        observe("ocr_pass_seconds", seconds, variant=variant, dpi=timings["dpi"])
 
-    if not candidates:
-        return "", 0.0
+# =========================
+# EMBEDDED TEXT LAYER (POPPLER pdftotext)
+# =========================
+def extract_text_layer(pdf_path, page_count):
+    try:
+        with timer("text_layer_seconds"):
+            out = subprocess.run(
+                ["pdftotext", "-layout", "-enc", "UTF-8", pdf_path, "-"],
+                capture_output=True, timeout=120, check=True
+            ).stdout.decode("utf-8", "ignore")
+    except Exception as e:
+        print(f"⚠ Text layer unreadable for {pdf_path}: {e}")
+        return [""] * page_count
 
-    best = max(candidates, key=len)
-    return best, 0.95
+    # pdftotext ends every page with a form feed, image-only pages included
+    pages = out.split("\f")[:page_count]
+    return pages + [""] * (page_count - len(pages))
+
+
+def has_text_layer(text):
+    return len(re.findall(r"[A-Za-z0-9]", text)) >= TEXT_LAYER_MIN_CHARS
 
 # =========================
-# AMOUNT — FIXED (NO INDEX ERROR)
+# PDF JOB — TEXT LAYER FIRST, OCR LADDER FOR THE REST
 # =========================
-def extract_amount(text):
-    patterns = [
-        r"(?:AMOUNT CLAIMED|CLAIMED AMOUNT|TOTAL AMOUNT)[^$0-9]{0,40}(\$?\s?[\d,]+\.\d{2})",
-        r"(\$[\d,]+\.\d{2})"
-    ]
+class PdfJob:
+    def __init__(self, pdf_path, page_count, settings=None):
+        self.pdf_path = pdf_path
+        self.pdf_file = os.path.basename(pdf_path)
+        self.page_count = page_count
+        self.settings = settings or ocr_settings()
+        self.ladder = self.settings["ladder"]
+        self.pages = {}        # page_no -> raw text (all rungs), kept across worker crashes
+        self.ocr_pages = []    # page numbers with no usable text layer
+        self.pending = set()   # OCR pages not finished at the current rung
+        self.queued = deque()  # OCR pages not yet handed out at the current rung
+        self.crashes = {}      # page_no -> number of pool crashes seen while in flight
+        self.failed_pages = set()   # pages OCR gave up on (error or repeated crashes)
+
+        self.rung = 0
+        self.passes = 0
+        self.ocr_seconds = 0.0
+        self.stopped = False
+
+        self.content_hash = ""
+        self.from_cache = False
+        self.failure = ""      # why the PDF could not be read; retried next run
+
+    def load_text_layer(self):
+        for page_no, text in enumerate(extract_text_layer(self.pdf_path, self.page_count), start=1):
+            if has_text_layer(text):
+                self.pages[page_no] = text + "\n"
+            else:
+                self.ocr_pages.append(page_no)
+
+        self.start_rung()
+
+    def start_rung(self):
+        self.pending = set(self.ocr_pages)
+        self.queued = deque(self.ocr_pages)
+
+    def complete(self):
+        # False after an early stop: some pages were never read
+        return all(n in self.pages for n in range(1, self.page_count + 1))
+
+    def to_cache(self):
+        return {
+            "page_count": self.page_count,
+            "pages": {str(n): t for n, t in self.pages.items()},
+            "ocr_pages": self.ocr_pages,
+            "rung": self.rung,
+            "passes": self.passes,
+            "ocr_seconds": self.ocr_seconds,
+            "complete": self.complete(),
+        }
+
+    def restore(self, entry):
+        self.pages = {int(n): t for n, t in entry["pages"].items()}
+        self.ocr_pages = entry["ocr_pages"]
+        self.pending = set()
+        self.queued = deque()
+        self.stopped = True
+        self.rung = entry["rung"]
+        self.passes = entry["passes"]
+        self.ocr_seconds = entry["ocr_seconds"]
+        self.from_cache = True
+
+    def next_tasks(self, limit=None):
+        # Hand out pages in order, keeping at most `window` of them in flight
+        in_flight = len(self.pending) - len(self.queued)
+        room = self.settings["window"] - in_flight
+        if limit is not None:
+            room = min(room, limit)
+
+        dpi, variants = self.ladder[self.rung]
+        tasks = []
+        while self.queued and room > 0:
+            tasks.append((self.pdf_path, self.queued.popleft(), dpi, variants))
+            room -= 1
+        return tasks
+
+    def add_page(self, page_no, text, seconds=0.0):
+        self.pages[page_no] = self.pages.get(page_no, "") + text
+        self.pending.discard(page_no)
+        self.passes += len(self.ladder[self.rung][1])
+        self.ocr_seconds += seconds
+
+    def confident(self, threshold):
+        fields = extract_fields(self.text())
+        return all(conf >= threshold for _, conf in fields.values())
+
+    def escalate(self):
+        # Called once the current rung is complete; True means more OCR is queued
+        if not self.ocr_pages or self.rung + 1 >= len(self.ladder):
+            return False
+
+        if self.confident(MIN_FIELD_CONFIDENCE):
+            return False
+
+        self.rung += 1
+        self.start_rung()
+        return True
+
+    def settle(self):
+        # True once the document needs no more OCR; pages still in flight are dropped
+        if self.stopped:
+            return True
+
+        if self.failed_pages:
+            self.stopped = True    # read again in full on the next run
+        elif self.settings["early_stop"] and self.confident(HIGH_CONFIDENCE):
+            self.stopped = True
+        elif not self.pending and not self.escalate():
+            self.stopped = True
+
+        return self.stopped
+
+    def text(self):
+        return normalize_text("".join(self.pages.get(n, "") for n in range(1, self.page_count + 1)))
+
+    def error(self):
+        if self.failure:
+            return self.failure
+        if not self.page_count:
+            return "no pages"
+        if self.failed_pages:
+            return f"OCR failed on page(s) {', '.join(map(str, sorted(self.failed_pages)))}"
+        return ""
 
-    for pat in patterns:
-        m = re.search(pat, text)
-        if m:
-            val = m.group(1)
-            val = val.replace("$", "").replace(",", "")
-            return f"${float(val):,.2f}", 0.9
+    def source(self):
+        if self.failure or not self.page_count:
+            return "unreadable"
+        if not self.ocr_pages:
+            return "text"
+        if len(self.ocr_pages) == self.page_count:
+            return "ocr"
+        return "mixed"
+
+    def cost(self):
+        return {
+            "OCR Rungs": self.rung + 1 if self.ocr_pages else 0,
+            "OCR Passes": self.passes,
+            "OCR Seconds": round(self.ocr_seconds, 2),
+        }
+
+
+def open_pdf_job(pdf_path, settings=None, cache=None, manifest=None):
+    settings = settings or ocr_settings()
+
+    # Phase 2 manifest: hash and page count recorded at download time
+    known = (manifest or {}).get(document_key(pdf_path)) or {}
+
+    content_hash = ""
+    if cache:
+        content_hash = known.get("sha256") or file_sha256(pdf_path)
+        entry = cache.get(content_hash, settings)
+        if entry and entry["page_count"]:
+            job = PdfJob(pdf_path, entry["page_count"], settings)
+            job.content_hash = content_hash
+            job.restore(entry)
+            return job
+
+    failure = ""
+    try:
+        page_count = known.get("pages") or count_pages(pdf_path)
+    except Exception as e:
+        print(f"❌ Could not read page count for {pdf_path}: {e}")
+        page_count, failure = 0, f"page count unreadable: {e}"
+
+    job = PdfJob(pdf_path, page_count, settings)
+    job.content_hash = content_hash
+    if not page_count:
+        # Nothing to read: settles at once and is committed as failed
+        job.failure = failure or "no pages"
+        job.stopped = True
+        return job
+
+    job.load_text_layer()
+    return job
+
+
+def finish_job(job, cache=None):
+    # Only complete text is cached: an unreadable PDF or a failed page
+    # must be OCR'd again, not served blank on every later run
+    if cache and not job.from_cache and not job.error():
+        cache.put(job)
+    if job.error():
+        count("failures_total", stage="pdf")
+    else:
+        count("ocr_cache_hits_total" if job.from_cache else "records_total", phase="phase3")
+    add_record(job.pdf_file, job.ocr_seconds)
+    return build_result(job)
 
-    return "", 0.0
+# =========================
+# OCR TEXT CACHE (CONTENT HASH + OCR SETTINGS)
+# =========================
+class OcrCache:
+    def __init__(self, cache_dir=OCR_CACHE_DIR, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.size = sum(os.path.getsize(p) for p in self.entries())
+
+    def entries(self, pattern="*"):
+        return glob.glob(os.path.join(self.cache_dir, f"{pattern}.json"))
+
+    def key(self, content_hash, settings):
+        fingerprint = json.dumps({
+            "ladder": settings["ladder"],
+            "early_stop": settings["early_stop"],
+            "window": settings["window"],   # with early stop, decides which pages were read
+            "tesseract": TESSERACT_CONFIG,
+            "text_layer_min_chars": TEXT_LAYER_MIN_CHARS,
+            "min_field_confidence": MIN_FIELD_CONFIDENCE,
+            "high_confidence": HIGH_CONFIDENCE,
+        }, sort_keys=True)
+        return f"{content_hash}-{hashlib.sha256(fingerprint.encode()).hexdigest()[:16]}"
+
+    def get(self, content_hash, settings, any_settings=False):
+        paths = [os.path.join(self.cache_dir, self.key(content_hash, settings) + ".json")]
+        if any_settings:
+            # Re-extraction is happy with text OCR'd under other settings,
+            # but needs every page: an early-stopped entry only holds the
+            # pages read before the stop, and new extractors may look anywhere
+            paths = sorted(self.entries(f"{content_hash}-*"), key=os.path.getmtime, reverse=True)
+
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if any_settings and not entry.get("complete"):
+                continue
+
+            os.utime(path)  # LRU: eviction drops the least recently used entries
+            return entry
+        return None
+
+    def put(self, job):
+        path = os.path.join(self.cache_dir, self.key(job.content_hash, job.settings) + ".json")
+        tmp = path + ".tmp"
+
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job.to_cache(), f)
+
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+        self.size += os.path.getsize(path) - old_size
+        self.evict()
+
+    def evict(self):
+        if self.size <= self.max_bytes:
+            return
+
+        for path in sorted(self.entries(), key=os.path.getmtime):
+            if self.size <= self.max_bytes * 0.9:
+                break
+            self.size -= os.path.getsize(path)
+            os.remove(path)
 
 # =========================
-# ADDRESS — US FORMAT
+# OCR — SCANNED PDF SAFE
 # =========================
-def extract_address(text):
-    addr_pattern = re.compile(
-        r"\b\d{1,6}\s+[A-Z0-9 .,'\-]+?\s+"
-        r"(?:ST|STREET|AVE|AVENUE|RD|ROAD|DR|DRIVE|CT|COURT|BLVD|LN|WAY)\b"
-        r".{0,40}?\b[A-Z]{2}\s*\d{5}\b"
-    )
+def read_pdf(pdf_path, settings=None, cache=None, manifest=None):
+    job = open_pdf_job(pdf_path, settings, cache, manifest)
+
+    try:
+        # One page rendered at a time; stops as soon as the job settles
+        while not job.settle():
+            for task in job.next_tasks(limit=1):
+                text, seconds, timings = ocr_page(*task)
+                record_timings(timings)
+                job.add_page(task[1], text, seconds)
+    except Exception as e:
+        print(f"❌ OCR failed on {pdf_path}: {e}")
+        job.failure = f"OCR failed: {e}"
+        job.stopped = True
+
+    return job
 
-    m = addr_pattern.search(text)
-    if m:
-        return m.group(0).strip(), 0.9
 
-    return "", 0.0
+def ocr_pdf(pdf_path):
+    return read_pdf(pdf_path).text()
 
 # =========================
 # PROCESS SINGLE PDF
 # =========================
-def process_pdf(pdf_file):
-    text = ocr_pdf(os.path.join(PDF_DIR, pdf_file))
-
-    case, c_conf = extract_case_number(text)
-    amt, a_conf = extract_amount(text)
-    addr, ad_conf = extract_address(text)
-
-    return {
-        "Source PDF": pdf_file,
+def build_result(job):
+    with timer("field_extraction_seconds"):
+        fields = extract_fields(job.text())
+    case, c_conf = fields["case"]
+    amt, a_conf = fields["amount"]
+    addr, ad_conf = fields["address"]
+
+    result = {
+        "Source PDF": job.pdf_file,
         "Case Number": case,
         "Case Confidence": c_conf,
         "Amount (USD)": amt,
         "Amount Confidence": a_conf,
         "Address": addr,
-        "Address Confidence": ad_conf
+        "Address Confidence": ad_conf,
+        "Text Source": job.source(),
+        **job.cost(),
+        "From Cache": job.from_cache
     }
+    if job.error():
+        result["Error"] = job.error()
+    return result
+
+
+def process_pdf(pdf_file, settings=None, cache=None, manifest=None):
+    return finish_job(read_pdf(os.path.join(PDF_DIR, pdf_file), settings, cache, manifest), cache)
 
 # =========================
-# LOAD CSV STATE (RESUME)
+# PDF SOURCE (FIXED LIST OR STREAMED IN)
 # =========================
-def load_csv_state():
-    completed = set()
-    if not os.path.exists(PHASE3_CSV):
-        return completed
-
-    with open(PHASE3_CSV, encoding="utf-8") as f:
-        for row in csv.DictReader(f):
-            completed.add(row["Source PDF"])
+class PdfFeed:
+    # PDF file names for the OCR scheduler. A fixed list is simply
+    # iterated; the streaming pipeline put()s names while OCR is running
+    # and close()s the feed once phase 2 is done.
+    POLL_SECONDS = 0.2
+
+    def __init__(self, pdf_files=None, maxsize=0):
+        self.queue = queue_module.Queue(maxsize)
+        self.live = pdf_files is None
+        self.exhausted = False
+        self.stopped = False
+        for pdf in pdf_files or []:
+            self.queue.put(pdf)
+        if not self.live:
+            self.queue.put(None)
+
+    def put(self, pdf_file):
+        # Blocks while the feed is full (backpressure on phase 2)
+        if not self.stopped:
+            self.queue.put(pdf_file)
+
+    def close(self):
+        self.put(None)
+
+    def stop(self):
+        # The OCR scheduler is gone: drop what is waiting, take nothing more
+        self.stopped = True
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue_module.Empty:
+                return
+
+    def next(self, block):
+        # -> next file name, or None when nothing is waiting (or ever will)
+        if self.exhausted:
+            return None
+        try:
+            pdf = self.queue.get(block=block)
+        except queue_module.Empty:
+            return None
+        if pdf is None:
+            self.exhausted = True
+        return pdf
+
+    def poll_timeout(self):
+        # A live feed is checked while pages are in flight
+        return self.POLL_SECONDS if self.live and not self.exhausted else None
 
-    return completed
+# =========================
+# PARALLEL OCR (PAGE GRANULARITY)
+# =========================
+def ocr_pdfs_parallel(pdf_files, workers, on_result, settings=None, cache=None, manifest=None):
+    feed = pdf_files if isinstance(pdf_files, PdfFeed) else PdfFeed(pdf_files)
+    queue = deque()      # OCR tasks waiting for a worker
+    in_flight = {}       # future -> (job, task)
+    max_in_flight = workers * 2
+    limit = max_in_flight
+
+    budget = memory_budget()
+    measured = None
+    # With --profile each worker profiles the pages it OCRs
+    run_page = partial(worker_call, ocr_page) if profile_dir() else ocr_page
+
+    def page_done(job, page_no, text, seconds=0.0):
+        if job.stopped:
+            return  # early-stopped document, late page is not needed
+        job.add_page(page_no, text, seconds)
+        if job.settle():
+            on_result(finish_job(job, cache))
+        else:
+            queue.extend((job, task) for task in job.next_tasks())
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            # Over the memory budget: no new PDFs and fewer pages in flight
+            # (halved per measurement), then back up one page at a time
+            if budget.over():
+                if budget.checked != measured:
+                    measured = budget.checked
+                    limit = max(1, limit // 2)
+                    print(f"🧠 OCR pages in flight capped at {limit}")
+            elif limit < max_in_flight:
+                limit += 1
+
+            # Pull the next PDF only when the task queue runs dry so
+            # documents complete roughly in the order they were listed.
+            while not queue and len(in_flight) < limit and not (budget.exceeded and in_flight):
+                # Only wait for the feed when there is nothing else to do
+                pdf = feed.next(block=not in_flight)
+                if pdf is None:
+                    break
+                job = open_pdf_job(os.path.join(PDF_DIR, pdf), settings, cache, manifest)
+                if job.settle():
+                    on_result(finish_job(job, cache))
+                    continue
+                queue.extend((job, task) for task in job.next_tasks())
+
+            while queue and len(in_flight) < limit:
+                job, task = queue.popleft()
+                if job.stopped:
+                    continue
+                try:
+                    future = executor.submit(run_page, *task)
+                except BrokenProcessPool:
+                    # The pool died between polls; in-flight futures will
+                    # report the crash below, otherwise restart right away.
+                    queue.appendleft((job, task))
+                    if not in_flight:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = ProcessPoolExecutor(max_workers=workers)
+                        continue
+                    break
+                in_flight[future] = (job, task)
+
+            if not in_flight:
+                if feed.exhausted:
+                    break
+                continue
+
+            finished, _ = wait(in_flight, timeout=feed.poll_timeout(), return_when=FIRST_COMPLETED)
+            crashed = []
+
+            for future in finished:
+                job, task = in_flight.pop(future)
+                page_no = task[1]
+                try:
+                    text, seconds, timings = future.result()
+                    record_timings(timings)
+                except BrokenProcessPool:
+                    crashed.append((job, task))
+                    continue
+                except Exception as e:
+                    count("failures_total", stage="ocr_page")
+                    print(f"❌ OCR failed on {job.pdf_file} page {page_no}: {e}")
+                    if not job.stopped:
+                        job.failed_pages.add(page_no)
+                    text, seconds = "", 0.0
+
+                page_done(job, page_no, text, seconds)
+
+            if crashed:
+                # Finished pages live in the parent, so only the pages that
+                # were in flight when the pool died need to be resubmitted.
+                print("🔥 OCR worker crashed, restarting pool...")
+                count("ocr_pool_restarts_total")
+                crashed.extend(in_flight.values())
+                in_flight.clear()
+
+                for job, task in reversed(crashed):
+                    if job.stopped:
+                        continue
+                    page_no = task[1]
+                    job.crashes[page_no] = job.crashes.get(page_no, 0) + 1
+                    if job.crashes[page_no] > MAX_PAGE_CRASHES:
+                        count("failures_total", stage="ocr_page")
+                        print(f"❌ Giving up on {job.pdf_file} page {page_no}")
+                        job.failed_pages.add(page_no)
+                        page_done(job, page_no, "")
+                        continue
+                    queue.appendleft((job, task))
+
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
 
 # =========================
-# SAVE RESULT (UPSERT)
+# RESULT STATE (RESUME + UPSERT)
 # =========================
-def save_result(result):
-    rows = []
+def open_journal(store):
+    # Keyed by document number ("<Document Number>.pdf" → "<Document Number>")
+    journal = store.phase("phase3", key="Source PDF", artifact="Source PDF")
+    imported = journal.seed(PHASE3_JSON)
+    if imported:
+        print(f"📥 Imported {imported} existing results into the state store")
+    return journal
 
-    if os.path.exists(PHASE3_CSV):
-        with open(PHASE3_CSV, encoding="utf-8") as f:
-            rows = list(csv.DictReader(f))
 
-    rows = [r for r in rows if r["Source PDF"] != result["Source PDF"]]
-    rows.append(result)
+def save_result(journal, result):
+    # A PDF that could not be read is stored as failed, so the next run
+    # picks it up again instead of keeping its empty fields
+    if result.get("Error"):
+        journal.fail(result["Source PDF"], result["Error"])
+        print(f"❌ Failed: {result['Source PDF']} ({result['Error']}), will retry next run")
+        return False
 
-    with open(PHASE3_CSV, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=result.keys())
-        writer.writeheader()
-        writer.writerows(rows)
+    journal.append(result)
+    return True
 
-    with open(PHASE3_JSON, "w", encoding="utf-8") as f:
-        json.dump(rows, f, indent=4)
+
+def export_results(journal):
+    journal.export(PHASE3_CSV, PHASE3_JSON)
 
 # =========================
-# MAIN LOOP
+# RUN SUMMARY (OCR COST VS. QUALITY)
 # =========================
-def process_all_pdfs():
-    completed = load_csv_state()
+def print_summary(results):
+    if not results:
+        return
+
+    n = len(results)
+    cached = sum(1 for r in results if r.get("From Cache"))
+    passes = sum(r["OCR Passes"] for r in results if not r.get("From Cache"))
+    seconds = sum(r["OCR Seconds"] for r in results if not r.get("From Cache"))
+
+    failed = sum(1 for r in results if r.get("Error"))
+
+    print(f"\n📊 {n} PDFs ({cached} from cache, {failed} failed) | {passes} OCR passes | {seconds:.0f}s OCR time")
+    for label, key in (("Case", "Case Number"), ("Amount", "Amount (USD)"), ("Address", "Address")):
+        found = sum(1 for r in results if r[key])
+        print(f"   {label}: {found}/{n} found")
+
+# =========================
+# RE-EXTRACT FROM CACHED TEXT (NO OCR)
+# =========================
+def reextract_all(journal, cache, settings=None, manifest=None):
+    settings = settings or ocr_settings()
+    results = []
+    missing = 0
 
     for pdf in sorted(os.listdir(PDF_DIR)):
         if not pdf.lower().endswith(".pdf"):
             continue
-        if pdf in completed:
+
+        pdf_path = os.path.join(PDF_DIR, pdf)
+        known = (manifest or {}).get(document_key(pdf)) or {}
+        entry = cache.get(known.get("sha256") or file_sha256(pdf_path), settings, any_settings=True)
+        if not entry or not entry["page_count"]:
+            missing += 1
             continue
 
-        print(f"Processing {pdf}...")
-        result = process_pdf(pdf)
-        save_result(result)
-        print(f"✅ Done: {result['Case Number']}\n")
+        job = PdfJob(pdf_path, entry["page_count"], settings)
+        job.restore(entry)
+        result = build_result(job)
+        save_result(journal, result)
+        results.append(result)
+
+    print(f"♻️ Re-extracted {len(results)} PDFs from cached text "
+          f"({missing} not cached in full; --read-all-pages caches every page)")
+    print_summary(results)
+
+# =========================
+# MAIN LOOP
+# =========================
+def process_all_pdfs(workers=OCR_WORKERS, settings=None, use_cache=True, reextract=False):
+    settings = settings or ocr_settings()
+    cache = OcrCache() if use_cache or reextract else None
+    store = StateStore()
+    journal = open_journal(store)
+    manifest = store.manifest().all()
+
+    try:
+        if reextract:
+            reextract_all(journal, cache, settings, manifest)
+            return
+
+        results = []
+        pending = [
+            pdf for pdf in sorted(os.listdir(PDF_DIR))
+            if pdf.lower().endswith(".pdf") and pdf not in journal
+        ]
+
+        if workers > 1:
+            print(f"⚙️ OCR worker pool: {workers} processes, {len(pending)} PDFs")
+
+            def on_result(result):
+                results.append(result)
+                if save_result(journal, result):
+                    print(f"✅ Done: {result['Source PDF']} → {result['Case Number']} "
+                          f"({result['Text Source']}, {result['OCR Passes']} passes)")
+
+            ocr_pdfs_parallel(pending, workers, on_result, settings, cache, manifest)
+        else:
+            for pdf in pending:
+                print(f"Processing {pdf}...")
+                result = process_pdf(pdf, settings, cache, manifest)
+                results.append(result)
+                if save_result(journal, result):
+                    print(f"✅ Done: {result['Case Number']} ({result['Text Source']}, {result['OCR Passes']} passes)\n")
+
+        print_summary(results)
+
+    finally:
+        export_results(journal)
+        store.close()
 
 if __name__ == "__main__":
-    process_all_pdfs()
+    parser = argparse.ArgumentParser(description="Phase 3 — OCR & data extraction")
+    parser.add_argument(
+        "--workers", type=int, default=OCR_WORKERS,
+        help="OCR worker processes (1 = sequential)"
+    )
+    parser.add_argument(
+        "--ladder", type=parse_ladder, default=OCR_LADDER,
+        help='OCR escalation ladder, e.g. "200:plain,300:plain,300:enhanced+inverted"'
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Do not read or write the OCR text cache"
+    )
+    parser.add_argument(
+        "--reextract", action="store_true",
+        help="Re-run the extractors over cached OCR text for every PDF (no OCR)"
+    )
+    parser.add_argument(
+        "--window", type=int, default=RENDER_WINDOW,
+        help="Max pages of one PDF rendered/OCR'd at the same time"
+    )
+    parser.add_argument(
+        "--read-all-pages", action="store_true",
+        help="Disable early stop once all fields are found with high confidence"
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure(args.profile, args.memory_budget)
+
+    try:
+        with profile_phase("phase3"):
+            process_all_pdfs(
+                workers=args.workers,
+                settings=ocr_settings(args.ladder, not args.read_all_pages, args.window),
+                use_cache=not args.no_cache, reextract=args.reextract
+            )
+    finally:
+        finish("phase3")
     print("🎯 PHASE 3 COMPLETE")
@@ -1,12 +1,20 @@
+import os
 import asyncio
-import csv
-import json
 import random
-import time
-from pathlib import Path
-
-import pandas as pd
-from playwright.async_api import async_playwright, TimeoutError
+import json
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+
+from browser_pool import browser_pool, close_quietly
+from docket import (
+    DOCKET_JS, EventMatcher, parse_docket, latest_event, last_in_text,
+    pack_docket, unpack_docket,
+)
+from metrics import count, timer, finish
+from profiling import add_arguments, configure, profile_phase, profile_record, memory_budget
+from rate_limit import HostRateLimiter, Throughput, TooManyRequests, retry_after_seconds
+from state_store import StateStore, now
 
 # =========================
 # CONFIG
@@ -16,11 +24,22 @@ PHASE3_CSV = "phase3_results.csv"
 OUTPUT_CSV = "phase4_results.csv"
 OUTPUT_JSON = "phase4_results.json"
 
-SEARCH_URL = "https://casesearch.cookcountyclerkofcourt.org/CivilCaseSearchAPI.aspx"
+OUTPUT_FIELDS = ["Case Number", "Address", "Status", "Color Tag"]
+
+SEARCH_URL = os.environ.get(
+    "CASE_SEARCH_URL", "https://casesearch.cookcountyclerkofcourt.org/CivilCaseSearchAPI.aspx"
+)
+
+CONTEXTS = 4                # long-lived browser contexts (one worker each)
+RATE = 0.5                  # requests/sec across all workers (two per case)
+JITTER = (0.5, 2.0)         # per-worker pause between cases, on top of the rate
+CASES_PER_CONTEXT = 50      # then a fresh context with a new user agent / viewport
+REPORT_EVERY = 25           # cases between throughput lines
 
-BATCH_SIZE = 5
-SHORT_DELAY = (4, 8)        # between individual cases
-LONG_DELAY = (30, 90)      # after every 5 cases
+# Recheck schedule: a changed docket brings the case back after MIN_INTERVAL
+# days, every unchanged check doubles the wait up to MAX_INTERVAL
+MIN_INTERVAL = 1            # days
+MAX_INTERVAL = 32           # days
 
 # =========================
 # USER AGENTS
@@ -77,112 +96,334 @@ EXCLUDE_EVENTS = [
     "Eviction",
 ]
 
+# Every relevant event and its tag; the latest one on the docket wins
+JUDGMENT_EVENT = "Judgment of Foreclosure"
+EVENTS = {JUDGMENT_EVENT: "GREEN", **{event: "RED" for event in EXCLUDE_EVENTS}}
+MATCHER = EventMatcher(EVENTS)
+
+# Statuses after which the case is never checked again
+TERMINAL_EVENTS = {
+    "Certificate of Sale",
+    "Receipt of Sale",
+    "Report of Sale",
+    "Sheriff’s Sale Approved",
+    "Mortgage Foreclosure Disposed",
+    "Dismissed",
+    "Voluntary Dismissal",
+    "Order for Possession",
+    "Eviction",
+}
+
 # =========================
-# FILE INITIALIZATION
+# RESULT STATE
 # =========================
 
-def init_files():
-    if not Path(OUTPUT_CSV).exists():
-        with open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Case Number", "Address", "Status", "Color Tag"])
+def init_files(store):
+    journal = store.phase("phase4", key="Case Number")
+
+    imported = journal.seed(OUTPUT_JSON)
+    if imported:
+        print(f"📥 Imported {imported} existing results into the state store")
+
+    return journal
+
 
-    if not Path(OUTPUT_JSON).exists():
-        with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-            json.dump([], f, indent=2)
+def load_cases(store):
+    # Phase 3 results straight from the state store (CSV only as a one-time import)
+    phase3 = store.phase("phase3", key="Source PDF", artifact="Source PDF")
+    if not len(phase3):
+        phase3.seed(PHASE3_CSV)
+    # One check per case number, even if several PDFs belong to the same case
+    cases = {}
+    for r in phase3.values():
+        case_number = str(r.get("Case Number") or "").strip()
+        if case_number:
+            cases[case_number] = r
+    return list(cases.values())
 
 
-def save_result(row):
-    # CSV (real-time)
-    with open(OUTPUT_CSV, "a", newline="", encoding="utf-8") as f:
-        csv.writer(f).writerow(row)
+def open_dockets(store):
+    # Parsed docket per case (packed), so statuses can be re-derived offline
+    return store.phase("docket", key="Case Number")
 
-    # JSON (real-time)
-    with open(OUTPUT_JSON, "r+", encoding="utf-8") as f:
-        data = json.load(f)
-        data.append({
-            "Case Number": row[0],
-            "Address": row[1],
-            "Status": row[2],
-            "Color Tag": row[3],
-        })
-        f.seek(0)
-        json.dump(data, f, indent=2)
-        f.truncate()
+
+def save_docket(dockets, case_number, docket):
+    dockets.append({"Case Number": case_number, "Checked": now(), "Docket": pack_docket(docket)})
+
+
+def save_result(journal, row):
+    # Committed in real time, keyed by case number
+    journal.append(dict(zip(OUTPUT_FIELDS, row)))
+
+
+def export_results(journal):
+    journal.export(OUTPUT_CSV, OUTPUT_JSON, fieldnames=OUTPUT_FIELDS, indent=2)
 
 
 # =========================
 # SCRAPE SINGLE CASE
 # =========================
 
-async def check_case(page, case_number):
-    await page.goto(SEARCH_URL, timeout=60000)
+async def check_response(response, limiter):
+    # After every navigation: a 429 slows the shared rate down and fails the check
+    if response and response.status == 429:
+        rate = limiter.penalize(
+            SEARCH_URL, retry_after_seconds(await response.header_value("retry-after"))
+        )
+        raise TooManyRequests(f"429 Too Many Requests (rate now {rate:.2f}/s)")
+    limiter.success(SEARCH_URL)
 
-    await page.fill("#MainContent_txtCaseNumber", case_number)
-    await page.click("#MainContent_btnSearch")
-
-    await page.wait_for_load_state("networkidle")
 
-    text = await page.inner_text("body")
+async def check_case(page, case_number, limiter):
+    # Two requests per case (search page, search postback), both paced
+    await limiter.acquire_async(SEARCH_URL)
+    with timer("page_navigation_seconds", page="case_search", engine="browser"):
+        response = await page.goto(SEARCH_URL, timeout=60000)
+    await check_response(response, limiter)
 
-    if "Judgment of Foreclosure" in text:
-        return "Judgment of Foreclosure", "GREEN"
+    await page.fill("#MainContent_txtCaseNumber", case_number)
+    await limiter.acquire_async(SEARCH_URL)
+    with timer("page_navigation_seconds", page="case_results", engine="browser"):
+        async with page.expect_navigation(timeout=60000) as navigation:
+            await page.click("#MainContent_btnSearch")
+        response = await navigation.value
+        await page.wait_for_load_state("networkidle")
+    await check_response(response, limiter)
 
-    for event in EXCLUDE_EVENTS:
-        if event in text:
-            return event, "RED"
+    # Whole docket table in one round trip
+    with timer("dom_extraction_seconds", page="docket", engine="browser"):
+        docket = parse_docket(await page.evaluate(DOCKET_JS))
+        text = "" if docket else await page.inner_text("body")
 
-    return "No Judgment Found", "NEUTRAL"
+    status, color = classify(docket, text)
+    return status, color, docket
 
 
 # =========================
-# MAIN RUNNER
+# STATUS FROM THE LATEST RELEVANT EVENT
 # =========================
 
-async def run_phase4():
-    init_files()
+def classify(docket, text=""):
+    # One automaton pass per docket entry; the most recent matching entry
+    # decides (a dismissal after the judgment is RED, not GREEN)
+    hit = latest_event(docket, MATCHER) if docket else last_in_text(text, MATCHER)
+    if hit is None:
+        return "No Judgment Found", "NEUTRAL"
 
-    df = pd.read_csv(PHASE3_CSV)
-    cases = df.dropna(subset=["Case Number"]).to_dict("records")
+    _, event = hit
+    return event, EVENTS[event]
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
 
-        for batch_index in range(0, len(cases), BATCH_SIZE):
-            batch = cases[batch_index: batch_index + BATCH_SIZE]
+def reclassify(journal, dockets, schedule):
+    # Re-derive every status from the stored dockets; no browser, no requests
+    changed = 0
+    for record in dockets.values():
+        case_number = record["Case Number"]
+        status, color = classify(unpack_docket(record["Docket"]))
 
-            print(f"\n🔵 Batch {(batch_index // BATCH_SIZE) + 1}")
+        current = journal.get(case_number) or {}
+        if (current.get("Status"), current.get("Color Tag")) != (status, color):
+            save_result(journal, [case_number, current.get("Address", ""), status, color])
+            changed += 1
+            print(f"🔁 {case_number}: {current.get('Status')} → {status}")
 
-            for i, row in enumerate(batch, start=1):
-                case_number = str(row["Case Number"]).strip()
-                address = row.get("Address", "")
+            # A case that is no longer terminal is due again right away
+            terminal = status in TERMINAL_EVENTS
+            fields = {"status": status, "terminal": int(terminal)}
+            if not terminal:
+                fields.update(interval_days=MIN_INTERVAL, next_due=datetime.now().date().isoformat())
+            schedule.save(case_number, **fields)
 
-                print(f"[{batch_index + i}] Checking case {case_number}")
+    print(f"🏁 Re-classified {len(dockets)} stored dockets ({changed} changed)")
 
-                viewport = random.choice(VIEWPORTS)
 
-                context = await browser.new_context(
-                    user_agent=random.choice(USER_AGENTS),
-                    viewport=viewport
-                )
+# =========================
+# RECHECK SCHEDULE (DUE CASES ONLY)
+# =========================
+
+def fingerprint(status, docket):
+    return hashlib.sha1(json.dumps([status, docket]).encode("utf-8")).hexdigest()[:16]
+
+
+def reschedule(schedule, case_number, status, docket):
+    checked = datetime.now()
+    previous = schedule.get(case_number)
+    fp = fingerprint(status, docket)
+    changed = previous is None or previous["fingerprint"] != fp
+
+    if changed:
+        interval = MIN_INTERVAL
+    else:
+        interval = min(MAX_INTERVAL, max(MIN_INTERVAL, previous["interval_days"] * 2))
+
+    # Due by calendar day, so a nightly run never misses a case by minutes
+    schedule.save(
+        case_number,
+        status=status,
+        fingerprint=fp,
+        interval_days=interval,
+        terminal=int(status in TERMINAL_EVENTS),
+        checked_at=checked.isoformat(timespec="seconds"),
+        changed_at=checked.isoformat(timespec="seconds") if changed else previous["changed_at"],
+        next_due=(checked.date() + timedelta(days=interval)).isoformat(),
+    )
+
+
+def defer(schedule, case_number):
+    # Failed check: try again tomorrow, behind the cases that did answer.
+    # A case never checked has no row and stays first in line.
+    previous = schedule.get(case_number)
+    if previous is None:
+        return
+    schedule.save(
+        case_number,
+        interval_days=previous["interval_days"] or MIN_INTERVAL,
+        next_due=(datetime.now().date() + timedelta(days=MIN_INTERVAL)).isoformat(),
+    )
+
+
+def due_cases(cases, schedule, max_cases=None):
+    by_number = {str(r["Case Number"]).strip(): r for r in cases}
+    today = datetime.now().date().isoformat()
+
+    due = schedule.due(list(by_number), today)
+    counts = schedule.summary(today)
+    print(f"🗓 {len(due)} of {len(by_number)} cases due "
+          f"({counts['terminal']} terminal, {counts['waiting']} not due yet)")
+
+    if max_cases:
+        due = due[:max_cases]
+    return [by_number[k] for k in due]
+
 
-                page = await context.new_page()
+# =========================
+# WORKER POOL (LONG-LIVED CONTEXTS, SHARED REQUEST RATE)
+# =========================
 
-                try:
-                    status, color = await check_case(page, case_number)
-                    save_result([case_number, address, status, color])
-                except TimeoutError:
-                    print(f"❌ Timeout: {case_number}")
-                except Exception as e:
-                    print(f"❌ Failed {case_number}: {e}")
-                finally:
-                    await context.close()
-                    time.sleep(random.uniform(*SHORT_DELAY))
+async def open_context(pool):
+    # The pool hands out a live browser, relaunching it after a crash
+    browser = await pool.browser(headless=True)
+    context = await browser.new_context(
+        user_agent=random.choice(USER_AGENTS),
+        viewport=random.choice(VIEWPORTS)
+    )
+    return context, await context.new_page()
+
+
+async def case_worker(pool, queue, checked, failed, limiter, meter):
+    context = page = None   # opened with the first case, so no cases = no browser
+    used = 0
+    budget = memory_budget()
+
+    try:
+        while True:
+            # None = no more cases for this worker
+            row = await queue.get()
+            if row is None:
+                return
+
+            case_number = str(row["Case Number"]).strip()
+            address = row.get("Address", "")
+
+            try:
+                if context is None or used >= CASES_PER_CONTEXT:
+                    if context:
+                        await close_quietly(context)
+                    context = None
+                    context, page = await open_context(pool)
+                    used = 0
+
+                used += 1
+                async with budget.intake():
+                    with timer("case_check_seconds"), profile_record(case_number):
+                        status, color, docket = await check_case(page, case_number, limiter)
+                checked(case_number, address, status, color, docket)
+                meter.done += 1
+                count("records_total", phase="phase4")
+                print(f"✅ {case_number}: {status}")
+            except Exception as e:
+                meter.failed += 1
+                count("failures_total", stage="case_check")
+                failed(case_number)
+                print(f"❌ {'Timeout' if type(e).__name__ == 'TimeoutError' else 'Failed'} {case_number}: {e}")
+
+                # The page may be stuck mid-navigation (or the browser gone);
+                # the next case starts clean
+                if context:
+                    await close_quietly(context)
+                context = None
+
+            if (meter.done + meter.failed) % REPORT_EVERY == 0:
+                meter.report(limiter)
+
+            # Non-blocking: the other workers keep going
+            await asyncio.sleep(random.uniform(*JITTER))
+    finally:
+        if context:
+            await close_quietly(context)
 
-            print("⏸ Pausing before next batch...")
-            time.sleep(random.uniform(*LONG_DELAY))
 
-        await browser.close()
+# =========================
+# MAIN RUNNER
+# =========================
+
+async def check_cases(cases, journal, dockets, schedule, contexts=CONTEXTS, rate=RATE):
+    if not cases:
+        return
+
+    workers = min(contexts, len(cases))
+    queue = asyncio.Queue()
+    for row in cases:
+        queue.put_nowait(row)
+    for _ in range(workers):
+        queue.put_nowait(None)
+
+    print(f"🔵 Checking {len(cases)} cases over {workers} contexts at {rate} requests/sec")
+    await check_queue(queue, journal, dockets, schedule, workers, rate, total=len(cases))
+
+
+async def check_queue(queue, journal, dockets, schedule, workers, rate=RATE, total=None):
+    # Workers take cases until each one gets a None; the streaming pipeline
+    # keeps filling the queue while phase 3 finishes PDFs
+    def checked(case_number, address, status, color, docket):
+        if docket:
+            save_docket(dockets, case_number, docket)
+        save_result(journal, [case_number, address, status, color])
+        reschedule(schedule, case_number, status, docket)
+
+    def failed(case_number):
+        defer(schedule, case_number)
+
+    limiter = HostRateLimiter(rate)
+    meter = Throughput("Phase 4", "cases", total, count_failed=True)
+
+    async with browser_pool() as pool:
+        await asyncio.gather(*(
+            case_worker(pool, queue, checked, failed, limiter, meter)
+            for _ in range(workers)
+        ))
+
+    meter.report(limiter, final=True)
+
+
+async def run_phase4(contexts=CONTEXTS, rate=RATE, reclassify_only=False,
+                     check_all=False, max_cases=None):
+    store = StateStore()
+    journal = init_files(store)
+    dockets = open_dockets(store)
+    schedule = store.schedule()
+
+    try:
+        if reclassify_only:
+            reclassify(journal, dockets, schedule)
+        else:
+            cases = load_cases(store)
+            if not check_all:
+                cases = due_cases(cases, schedule, max_cases)
+            await check_cases(cases, journal, dockets, schedule, contexts, rate)
+    finally:
+        export_results(journal)
+        store.close()
 
 
 # =========================
@@ -190,4 +431,33 @@ async def run_phase4():
 # =========================
 
 if __name__ == "__main__":
-    asyncio.run(run_phase4())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Phase 4 — civil case status")
+    parser.add_argument(
+        "--contexts", type=int, default=CONTEXTS,
+        help="Concurrent browser contexts (kept open across cases)"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=RATE,
+        help="Max requests/sec across all contexts (lowered automatically on 429)"
+    )
+    parser.add_argument(
+        "--reclassify", action="store_true",
+        help="Re-derive statuses from the stored dockets without fetching anything"
+    )
+    parser.add_argument(
+        "--all", dest="check_all", action="store_true",
+        help="Check every case, ignoring the recheck schedule"
+    )
+    parser.add_argument(
+        "--max-cases", type=int, default=None,
+        help="Check at most this many due cases (highest priority first)"
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure(args.profile, args.memory_budget)
+
+    try:
+        with profile_phase("phase4"):
+            asyncio.run(run_phase4(args.contexts, args.rate, args.reclassify, args.check_all, args.max_cases))
+    finally:
+        finish("phase4")
\ No newline at end of file
@@ -0,0 +1,336 @@
+import io
+import os
+import glob
+import time
+import heapq
+import asyncio
+import pstats
+import cProfile
+import subprocess
+import tracemalloc
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+
+from metrics import count, gauge
+
+# =========================
+# CONFIG
+# =========================
+# Off unless asked for. --profile on a phase script or on run_pipeline
+# (which hands it to its phase subprocesses through the environment)
+# writes, per phase:
+#   <dir>/<phase>.prof   CPU profile (pstats / snakeviz)
+#   <dir>/<phase>.txt    top-N hot spots: functions, allocation sites,
+#                        slowest records, records that kept the most memory
+# --memory-budget caps this process plus its children (OCR workers,
+# browsers); over the budget a phase takes in fewer records at a time
+# instead of growing until it is killed.
+
+PROFILE_DIR_ENV = "PIPELINE_PROFILE_DIR"
+MEMORY_BUDGET_ENV = "PIPELINE_MEMORY_BUDGET_MB"
+
+TOP_N = 25
+TRACE_FRAMES = 1            # tracemalloc frames kept per allocation (more = slower)
+
+CHECK_SECONDS = 1.0         # memory is measured at most this often
+RESUME_FRACTION = 0.85      # full concurrency again below this share of the budget
+
+WORKER_PROFILE = "ocr_worker_{pid}.prof"
+
+
+def add_arguments(parser, default_dir="profiles"):
+    parser.add_argument(
+        "--profile", nargs="?", const=default_dir, metavar="DIR",
+        help=f"Write CPU/memory profiles and hot-spot reports (default directory: {default_dir})"
+    )
+    parser.add_argument(
+        "--memory-budget", type=int, metavar="MB",
+        help="Peak memory of this process and its children; intake slows down above it"
+    )
+
+
+def configure(profile_dir=None, memory_budget=None):
+    # Through the environment, so phase subprocesses and OCR workers see it
+    if profile_dir:
+        os.environ[PROFILE_DIR_ENV] = os.path.abspath(profile_dir)
+    if memory_budget:
+        os.environ[MEMORY_BUDGET_ENV] = str(memory_budget)
+
+
+def profile_dir():
+    return os.environ.get(PROFILE_DIR_ENV)
+
+# =========================
+# MEMORY (THIS PROCESS + CHILDREN)
+# =========================
+
+def tree_rss_mb():
+    # Resident memory of this process and everything under it; `ps` works
+    # the same on macOS and Linux
+    try:
+        out = subprocess.run(
+            ["ps", "-A", "-o", "pid=,ppid=,rss="], capture_output=True, text=True, timeout=5
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return 0.0
+
+    children, rss = {}, {}
+    for line in out.splitlines():
+        try:
+            pid, ppid, kb = (int(v) for v in line.split())
+        except ValueError:
+            continue
+        children.setdefault(ppid, []).append(pid)
+        rss[pid] = kb
+
+    total, todo = 0, [os.getpid()]
+    while todo:
+        pid = todo.pop()
+        total += rss.get(pid, 0)
+        todo += children.get(pid, [])
+    return total / 1024
+
+
+class MemoryBudget:
+    def __init__(self, limit_mb=None):
+        self.limit_mb = limit_mb
+        self.checked = 0.0
+        self.usage = 0.0
+        self.peak = 0.0
+        self.exceeded = False
+        self.pauses = 0
+        self.locks = weakref.WeakKeyDictionary()   # one per event loop (phases run one each)
+
+    def usage_mb(self):
+        now = time.monotonic()
+        if now - self.checked >= CHECK_SECONDS:
+            self.checked = now
+            self.usage = tree_rss_mb()
+            self.peak = max(self.peak, self.usage)
+        return self.usage
+
+    def over(self):
+        # True from the moment usage passes the budget until it is back
+        # under RESUME_FRACTION of it
+        if not self.limit_mb:
+            return False
+
+        usage = self.usage_mb()
+        if not self.exceeded and usage > self.limit_mb:
+            self.exceeded = True
+            self.pauses += 1
+            count("memory_budget_exceeded_total")
+            print(f"🧠 Memory {usage:.0f} MB over the {self.limit_mb} MB budget: slowing intake")
+            snapshot_on_budget()
+        elif self.exceeded and usage < self.limit_mb * RESUME_FRACTION:
+            self.exceeded = False
+            print(f"🧠 Memory back to {usage:.0f} MB: full intake again")
+        return self.exceeded
+
+    @asynccontextmanager
+    async def intake(self):
+        # Around one record in an async worker. Over the budget the workers
+        # take turns, one record at a time, until memory is back down.
+        if not self.over():
+            yield
+            return
+
+        loop = asyncio.get_running_loop()
+        if loop not in self.locks:
+            self.locks[loop] = asyncio.Lock()
+        async with self.locks[loop]:
+            yield
+
+
+_budget = None
+
+
+def memory_budget():
+    # One budget per process, from --memory-budget / the environment
+    global _budget
+    limit = int(os.environ.get(MEMORY_BUDGET_ENV) or 0) or None
+    if _budget is None or _budget.limit_mb != limit:
+        _budget = MemoryBudget(limit)
+    return _budget
+
+# =========================
+# PHASE PROFILE (CPU + ALLOCATIONS + RECORDS)
+# =========================
+
+class PhaseProfile:
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+        self.profiler = cProfile.Profile()
+        self.slowest = []       # heaps of (value, key), TOP_N each
+        self.retained = []
+        self.records = 0
+        self.budget_snapshot = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for path in glob.glob(os.path.join(self.directory, WORKER_PROFILE.format(pid="*"))):
+            os.remove(path)   # left over from an earlier run
+
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.tracing = not tracemalloc.is_tracing()   # someone else may be tracing already
+        if self.tracing:
+            tracemalloc.start(TRACE_FRAMES)
+        tracemalloc.reset_peak()
+        self.first = take_snapshot()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.last = take_snapshot()
+        self.peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        if self.tracing:
+            tracemalloc.stop()
+        self.seconds = time.perf_counter() - self.started
+        self.cpu_seconds = time.process_time() - self.cpu_started
+        gauge("python_peak_mb", round(self.peak_mb, 1), phase=self.name)
+
+    def add_record(self, key, seconds, retained_kb):
+        self.records += 1
+        for heap, value in ((self.slowest, seconds), (self.retained, retained_kb)):
+            item = (value, str(key))
+            if len(heap) < TOP_N:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+
+    def write(self):
+        prof_path = os.path.join(self.directory, f"{self.name}.prof")
+        report_path = os.path.join(self.directory, f"{self.name}.txt")
+        self.profiler.dump_stats(prof_path)
+
+        out = io.StringIO()
+        budget = memory_budget()
+        print(f"{self.name}: {self.seconds:.1f}s wall, {self.cpu_seconds:.1f}s CPU, "
+              f"{self.records} records, Python heap peak {self.peak_mb:.1f} MB"
+              + (f", process tree peak {budget.peak:.0f} MB of {budget.limit_mb} MB "
+                 f"(exceeded {budget.pauses}x)" if budget.limit_mb else ""), file=out)
+
+        section(out, f"Top {TOP_N} functions by cumulative time")
+        stats = pstats.Stats(self.profiler, stream=out).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(TOP_N)
+        section(out, f"Top {TOP_N} functions by own time")
+        stats.sort_stats("tottime").print_stats(TOP_N)
+
+        # OCR worker processes profile themselves (see worker_call)
+        workers = glob.glob(os.path.join(self.directory, WORKER_PROFILE.format(pid="*")))
+        if workers:
+            section(out, f"OCR workers ({len(workers)} processes): top {TOP_N} functions by own time")
+            pstats.Stats(*workers, stream=out).strip_dirs().sort_stats("tottime").print_stats(TOP_N)
+
+        section(out, f"Top {TOP_N} allocation sites still held at the end (growth during the phase)")
+        for stat in self.last.compare_to(self.first, "lineno")[:TOP_N]:
+            print(f"  {stat}", file=out)
+
+        if self.budget_snapshot is not None:
+            section(out, f"Top {TOP_N} allocation sites when the memory budget was first exceeded")
+            for stat in self.budget_snapshot.statistics("lineno")[:TOP_N]:
+                print(f"  {stat}", file=out)
+
+        # Records overlap in the async phases, so these are approximate there
+        section(out, f"Slowest {TOP_N} records (seconds)")
+        for seconds, key in sorted(self.slowest, reverse=True):
+            print(f"  {seconds:10.3f}  {key}", file=out)
+        section(out, f"Top {TOP_N} records by memory kept after them (KB)")
+        for kb, key in sorted(self.retained, reverse=True):
+            print(f"  {kb:10.1f}  {key}", file=out)
+
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        print(f"🔬 Profile: {report_path} (CPU profile: {prof_path})")
+
+
+def section(out, title):
+    print(f"\n{'=' * len(title)}\n{title}\n{'=' * len(title)}", file=out)
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+
+
+def snapshot_on_budget():
+    # Where the memory is at the moment the budget is first exceeded
+    if _active is not None and _active.budget_snapshot is None:
+        _active.budget_snapshot = take_snapshot()
+
+# =========================
+# HOOKS FOR THE PHASES
+# =========================
+
+_active = None
+
+
+@contextmanager
+def profile_phase(name):
+    # Around a phase's entry point; does nothing unless profiling is on.
+    # Nested phases (the in-process runner) report into the outer profile.
+    global _active
+    directory = profile_dir()
+    if not directory or _active is not None:
+        yield
+        return
+
+    profile = _active = PhaseProfile(name, directory)
+    profile.start()
+    try:
+        yield
+    finally:
+        profile.stop()
+        _active = None
+        profile.write()
+
+
+@contextmanager
+def profile_record(key):
+    # Around one record (search window, view page, PDF, case)
+    profile = _active
+    if profile is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    before = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        retained = (tracemalloc.get_traced_memory()[0] - before) / 1024
+        profile.add_record(key, time.perf_counter() - start, retained)
+
+
+def add_record(key, seconds, retained_kb=0.0):
+    # Records measured elsewhere (phase 3 pages run in worker processes)
+    if _active is not None:
+        _active.add_record(key, seconds, retained_kb)
+
+# =========================
+# WORKER PROCESSES
+# =========================
+
+_worker_profiler = None
+
+
+def worker_call(fn, *args):
+    # Runs fn in an OCR worker under a per-process profiler; the stats file
+    # is rewritten after every call, so it survives the pool shutting down
+    global _worker_profiler
+    if _worker_profiler is None:
+        _worker_profiler = cProfile.Profile()
+
+        os.makedirs(profile_dir(), exist_ok=True)
+
+    _worker_profiler.enable()
+    try:
+        return fn(*args)
+    finally:
+        _worker_profiler.disable()
+        _worker_profiler.dump_stats(os.path.join(profile_dir(), WORKER_PROFILE.format(pid=os.getpid())))
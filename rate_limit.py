@@ -0,0 +1,141 @@
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+from metrics import count
+
+# =========================
+# CONFIG
+# =========================
+
+MIN_RATE = 0.05         # requests/sec floor after repeated 429s
+BACKOFF = 0.5           # rate multiplier on every 429
+RECOVER_AFTER = 20      # clean responses before stepping the rate back up
+RECOVER_STEP = 0.1      # fraction of the ceiling added per recovery step
+
+
+class TooManyRequests(Exception):
+    pass    # 429 after the limiter was slowed down; the caller retries later
+
+# =========================
+# TOKEN BUCKET (THREAD- AND ASYNC-SAFE)
+# =========================
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.ceiling = rate     # politeness ceiling, never exceeded
+        self.rate = rate        # current rate, lowered by 429s
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.streak = 0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # Takes a token now and returns how long the caller must wait for it;
+        # tokens may go negative, which queues callers in arrival order
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def penalize(self, retry_after=None):
+        # 429: halve the rate and drop any saved-up burst
+        with self.lock:
+            self.rate = max(MIN_RATE, self.rate * BACKOFF)
+            self.tokens = min(self.tokens, 0)
+            if retry_after:
+                self.tokens = min(self.tokens, -retry_after * self.rate)
+            self.streak = 0
+
+    def success(self):
+        with self.lock:
+            self.streak += 1
+            if self.streak >= RECOVER_AFTER and self.rate < self.ceiling:
+                self.rate = min(self.ceiling, self.rate + self.ceiling * RECOVER_STEP)
+                self.streak = 0
+
+# =========================
+# PER-HOST LIMITER
+# =========================
+
+class HostRateLimiter:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc or url
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        self.bucket(url).acquire()
+
+    async def acquire_async(self, url):
+        await self.bucket(url).acquire_async()
+
+    def penalize(self, url, retry_after=None):
+        count("rate_limited_total", host=urlsplit(url).netloc or url)
+        bucket = self.bucket(url)
+        bucket.penalize(retry_after)
+        return bucket.rate
+
+    def success(self, url):
+        self.bucket(url).success()
+
+    def rates(self):
+        return {host: round(b.rate, 3) for host, b in self.buckets.items()}
+
+
+def retry_after_seconds(value):
+    # Retry-After header: seconds (HTTP dates are treated as "unknown")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# =========================
+# THROUGHPUT (ITEMS / MINUTE)
+# =========================
+
+class Throughput:
+    # Phase 2 (records/min, finished ones) and phase 4 (cases/min, every
+    # attempt: count_failed)
+    def __init__(self, phase="Phase 2", unit="records", total=None, count_failed=False):
+        self.start = time.monotonic()
+        self.phase = phase
+        self.unit = unit
+        self.total = total
+        self.count_failed = count_failed
+        self.done = 0
+        self.failed = 0
+
+    def per_minute(self):
+        minutes = (time.monotonic() - self.start) / 60
+        handled = self.done + self.failed if self.count_failed else self.done
+        return handled / minutes if minutes else 0.0
+
+    def report(self, limiter, final=False):
+        label = f"🏁 {self.phase} throughput" if final else "📈 Throughput"
+        of = f" of {self.total}" if self.total else ""
+        print(f"{label}: {self.per_minute():.1f} {self.unit}/min "
+              f"({self.done} done, {self.failed} failed{of}, rate limits {limiter.rates()})")
@@ -2,10 +2,20 @@
 
 import subprocess
 import sys
+import os
+import re
+import csv
+import time
+import asyncio
+import argparse
+import importlib
 from pathlib import Path
-import pandas as pd
 import json
 
+import metrics
+import profiling
+from pdf_downloader import file_sha256
+
 # =========================
 # PYINSTALLER SAFE PATHS
 # =========================
@@ -27,6 +37,11 @@ OUTPUT_DIR = Path.home() / "cookcounty_pipeline_output"
 OUTPUT_DIR.mkdir(exist_ok=True)
 
 OUTPUT_EXCEL = OUTPUT_DIR / "final_pipeline_results.xlsx"
+BUILD_MANIFEST = OUTPUT_DIR / "build_manifest.json"   # source hashes of the last build
+
+# Run summary (JSON) + Prometheus textfile; every phase reports into it
+METRICS_DIR = Path(os.environ.get("PIPELINE_METRICS_DIR", OUTPUT_DIR / "metrics"))
+RUN_ID = time.strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
 
 # =========================
 # PIPELINE PHASE CONFIG
@@ -39,6 +54,14 @@ PHASES = [
     ("Phase4", "phase4_results.py", "phase4_results.csv", "phase4_results.json"),
 ]
 
+# In-process entry point of each phase (coroutine, or a plain function run in a thread)
+ENTRY_POINTS = {
+    "Phase1": "run_phase1_async",
+    "Phase2": "run_phase2_async",
+    "Phase3": "process_all_pdfs",
+    "Phase4": "run_phase4",
+}
+
 # =========================
 # ENSURE JSON FILES EXIST
 # =========================
@@ -58,11 +81,17 @@ def run_phase(name, script):
     print(f"\n🚀 Running {name}")
 
     script_path = BASE_DIR / script
+    env = dict(os.environ, PIPELINE_METRICS_DIR=str(METRICS_DIR))
 
+    start = time.perf_counter()
     result = subprocess.run(
         [PYTHON_BIN, str(script_path)],
-        cwd=BASE_DIR
+        cwd=BASE_DIR, env=env
     )
+    metrics.gauge("phase_seconds", round(time.perf_counter() - start, 3), phase=name)
+
+    # The phase left its own metrics behind for this run
+    metrics.merge_snapshot(Path(script).stem.split("_")[0], RUN_ID, METRICS_DIR)
 
     if result.returncode != 0:
         # Phase stopped due to duplicates is NOT a failure
@@ -73,43 +102,250 @@ def run_phase(name, script):
     return True
 
 # =========================
-# WRITE CSV TO EXCEL SHEET
+# IN-PROCESS RUNNER (ONE INTERPRETER, ONE BROWSER POOL)
+# =========================
+
+async def run_phases_in_process():
+    # Each phase module is imported only when its turn comes, and every
+    # browser comes from one pool that lives for the whole run
+    from browser_pool import browser_pool
+
+    imports = 0.0
+    async with browser_pool() as pool:
+        for name, script, _, _ in PHASES:
+            print(f"\n🚀 Running {name} (in process)")
+
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(Path(script).stem)
+                imports += time.perf_counter() - start
+                entry = getattr(module, ENTRY_POINTS[name])
+
+                phase = name.lower()
+                if asyncio.iscoroutinefunction(entry):
+                    with profiling.profile_phase(phase):
+                        await entry()
+                else:
+                    # Profiled in its own thread, where it runs
+                    def run(entry=entry, phase=phase):
+                        with profiling.profile_phase(phase):
+                            entry()
+                    await asyncio.to_thread(run)
+            except Exception as e:
+                print(f"⚠ {name} stopped: {e}. Continuing...")
+                continue
+            finally:
+                metrics.gauge("phase_seconds", round(time.perf_counter() - start, 3), phase=name)
+
+            print(f"✅ {name} completed in {time.perf_counter() - start:.1f}s")
+
+        cold_start = imports + pool.launch_seconds
+        metrics.gauge("cold_start_seconds", round(cold_start, 3))
+        metrics.gauge("browser_launches", pool.launches)
+        print(f"\n🧊 Cold start: {cold_start:.1f}s "
+              f"(imports {imports:.1f}s, {pool.launches} browser launches {pool.launch_seconds:.1f}s)")
+
+
+def run_in_process():
+    # Same working directory the phase scripts get as subprocesses
+    os.chdir(BASE_DIR)
+    asyncio.run(run_phases_in_process())
+
+# =========================
+# STREAMING MODE (ALL PHASES IN ONE PROCESS)
+# =========================
+
+def run_streaming(stages, queue_size):
+    # Same working directory the phase scripts get as subprocesses
+    os.chdir(BASE_DIR)
+    from stream_pipeline import run_stream
+
+    print("\n🌊 Running all phases as one stream")
+    with profiling.profile_phase("stream"):
+        run_stream(stages, queue_size)
+    print("✅ Stream completed")
+
+# =========================
+# BUILD MANIFEST (SKIP UNCHANGED SOURCES)
+# =========================
+
+def load_manifest():
+    try:
+        with open(BUILD_MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    tmp = BUILD_MANIFEST.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, BUILD_MANIFEST)
+
+# =========================
+# WORKBOOK (ALL SHEETS, ONE STREAMING PASS)
+# =========================
+
+NUMBER = re.compile(r"-?(?:0|[1-9]\d{0,14})(?:\.\d+)?")
+
+
+def cell_value(value):
+    # Numbers stay numbers in Excel (as pd.read_csv did); IDs with leading
+    # zeros, phone numbers and the like stay text
+    if value == "":
+        return None
+    if NUMBER.fullmatch(value):
+        return float(value) if "." in value else int(value)
+    return value
+
+
+def write_workbook(sources):
+    # Write-only workbook: rows are streamed from each CSV straight into the
+    # sheet XML, never held as a document in memory or re-read from disk
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    counts = {}
+    start = time.perf_counter()
+
+    for sheet_name, csv_path in sources.items():
+        if not csv_path.exists():
+            print(f"⚠ CSV not found for {sheet_name}, skipping")
+            continue
+
+        ws = wb.create_sheet(sheet_name)
+        rows = -1   # header
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                ws.append([cell_value(v) for v in row])
+                rows += 1
+
+        counts[sheet_name] = max(rows, 0)
+        print(f"📄 {sheet_name} written to Excel ({counts[sheet_name]} records)")
+
+    if not counts:
+        return counts
+
+    tmp = OUTPUT_EXCEL.with_name(OUTPUT_EXCEL.stem + ".tmp.xlsx")
+    wb.save(tmp)
+    os.replace(tmp, OUTPUT_EXCEL)
+    metrics.observe("output_build_seconds", time.perf_counter() - start, output="excel")
+    return counts
+
+# =========================
+# PARQUET (ONE FILE PER PHASE)
+# =========================
+
+def write_parquet(name, csv_path):
+    # Columnar copy for analytics; all columns as text, exactly as exported
+    import pandas as pd
+
+    parquet_path = csv_path.with_suffix(".parquet")
+    start = time.perf_counter()
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    try:
+        df.to_parquet(parquet_path, index=False)
+    except ImportError:
+        print("⚠ Parquet skipped: install pyarrow to enable it")
+        return False
+
+    metrics.observe("output_build_seconds", time.perf_counter() - start, output="parquet")
+    print(f"🧱 {name} written to {parquet_path.name} ({len(df)} records)")
+    return True
+
+# =========================
+# CONSOLIDATE ALL PHASES
 # =========================
 
-def write_excel_sheet(sheet_name, csv_file):
-    csv_path = OUTPUT_DIR / csv_file
-    if not csv_path.exists():
-        print(f"⚠ CSV not found for {sheet_name}, skipping")
-        return 0
+def build_outputs():
+    sources = {name: OUTPUT_DIR / csv_file for name, _, csv_file, _ in PHASES}
+    hashes = {name: file_sha256(p) if p.exists() else None for name, p in sources.items()}
 
-    df = pd.read_csv(csv_path)
-    new_records = len(df)
+    manifest = load_manifest()
+    built_excel = manifest.get("excel", {})
+    built_parquet = manifest.get("parquet", {})
 
-    mode = "a" if OUTPUT_EXCEL.exists() else "w"
-    kwargs = {"engine": "openpyxl", "mode": mode}
-    if mode == "a":
-        kwargs["if_sheet_exists"] = "replace"
+    # Parquet: only the phases whose CSV changed since the last build
+    for name, csv_path in sources.items():
+        parquet_path = csv_path.with_suffix(".parquet")
+        if hashes[name] is None:
+            continue
+        if hashes[name] == built_parquet.get(name) and parquet_path.exists():
+            print(f"⏭ {name} Parquet unchanged")
+            continue
+        if not write_parquet(name, csv_path):
+            break   # no Parquet engine installed
+        built_parquet[name] = hashes[name]
 
-    with pd.ExcelWriter(OUTPUT_EXCEL, **kwargs) as writer:
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
+    # Workbook: one pass over every sheet, or nothing at all
+    if hashes == built_excel and OUTPUT_EXCEL.exists():
+        print("⏭ Excel unchanged: no phase produced new data")
+        counts = {}
+    else:
+        counts = write_workbook(sources)
+        built_excel = hashes
 
-    print(f"📄 {sheet_name} written to Excel ({new_records} records)")
-    return new_records
+    save_manifest({"excel": built_excel, "parquet": built_parquet})
+    return counts
 
 # =========================
 # MAIN PIPELINE
 # =========================
 
 def main():
-    for name, script, csv_file, _ in PHASES:
-        # Run the phase
-        run_phase(name, script)
+    parser = argparse.ArgumentParser(description="Cook County pipeline — all phases + consolidated outputs")
+    parser.add_argument(
+        "--in-process", action="store_true",
+        help="Run the phases one after another in this process, sharing one browser"
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Run the phases concurrently in one process, handing each record on as soon as it is ready"
+    )
+    parser.add_argument("--search-workers", type=int, help="Stream: phase 1 date windows in parallel")
+    parser.add_argument("--view-workers", type=int, help="Stream: phase 2 view page workers")
+    parser.add_argument("--downloads", type=int, help="Stream: phase 2 concurrent PDF downloads")
+    parser.add_argument("--ocr-workers", type=int, help="Stream: phase 3 OCR processes")
+    parser.add_argument("--case-workers", type=int, help="Stream: phase 4 browser contexts")
+    parser.add_argument(
+        "--queue-size", type=int, default=50,
+        help="Stream: records waiting between two phases before the earlier one waits"
+    )
+    profiling.add_arguments(parser, str(OUTPUT_DIR / "profiles"))
+    args = parser.parse_args()
+    # Phase subprocesses pick both up from the environment
+    profiling.configure(args.profile, args.memory_budget)
 
-        # Consolidate CSV into centralized Excel
-        count = write_excel_sheet(name, csv_file)
+    # Phase subprocesses inherit it and tag their metrics with it
+    os.environ[metrics.RUN_ID_ENV] = RUN_ID
+
+    if args.stream:
+        stages = {
+            stage: value for stage, value in (
+                ("search", args.search_workers),
+                ("views", args.view_workers),
+                ("downloads", args.downloads),
+                ("ocr", args.ocr_workers),
+                ("cases", args.case_workers),
+            ) if value
+        }
+        run_streaming(stages, args.queue_size)
+    elif args.in_process:
+        run_in_process()
+    else:
+        for name, script, _, _ in PHASES:
+            run_phase(name, script)
+
+    # Consolidate every CSV once, after all phases ran
+    print("\n📊 Building consolidated outputs")
+    counts = build_outputs()
+    for name, count in counts.items():
         if count == 0:
             print(f"⚠ {name} had no new records today")
 
+    metrics.finish("pipeline", str(METRICS_DIR))
+
     print("\n🎯 ALL PHASES COMPLETE")
     print(f"📊 Centralized Excel: {OUTPUT_EXCEL}")
     print(f"📁 Outputs saved to: {OUTPUT_DIR}")
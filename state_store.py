@@ -0,0 +1,524 @@
+import os
+import csv
+import json
+import sqlite3
+from datetime import datetime
+
+# =========================
+# CONFIG
+# =========================
+
+STATE_DB = "pipeline_state.db"
+
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    phase      TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    artifact   TEXT NOT NULL DEFAULT '',
+    data       TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE (phase, key)
+);
+CREATE INDEX IF NOT EXISTS records_status ON records (phase, status);
+CREATE INDEX IF NOT EXISTS records_key ON records (key);
+
+CREATE TABLE IF NOT EXISTS imports (
+    source      TEXT PRIMARY KEY,
+    phase       TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    imported_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS manifest (
+    key           TEXT PRIMARY KEY,
+    path          TEXT NOT NULL,
+    url           TEXT NOT NULL DEFAULT '',
+    size          INTEGER NOT NULL,
+    sha256        TEXT NOT NULL,
+    pages         INTEGER NOT NULL DEFAULT 0,
+    etag          TEXT NOT NULL DEFAULT '',
+    last_modified TEXT NOT NULL DEFAULT '',
+    verified_at   TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS windows (
+    doc_type   TEXT NOT NULL,
+    from_date  TEXT NOT NULL,
+    to_date    TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    last_page  INTEGER NOT NULL DEFAULT 0,
+    next_url   TEXT NOT NULL DEFAULT '',
+    rows       INTEGER NOT NULL DEFAULT 0,
+    error      TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (doc_type, from_date, to_date)
+);
+
+CREATE TABLE IF NOT EXISTS schedule (
+    key           TEXT PRIMARY KEY,
+    status        TEXT NOT NULL DEFAULT '',
+    fingerprint   TEXT NOT NULL DEFAULT '',
+    interval_days REAL NOT NULL DEFAULT 0,
+    terminal      INTEGER NOT NULL DEFAULT 0,
+    checked_at    TEXT NOT NULL DEFAULT '',
+    changed_at    TEXT NOT NULL DEFAULT '',
+    next_due      TEXT NOT NULL DEFAULT '',
+    updated_at    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS schedule_due ON schedule (terminal, next_due);
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    doc_type      TEXT PRIMARY KEY,
+    recorded_date TEXT NOT NULL,
+    updated_at    TEXT NOT NULL
+);
+"""
+
+
+def now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def document_key(value):
+    # PDFs are saved as <Document Number>.pdf, so phase 3 results keyed by
+    # file name land on the same key as phases 1 and 2
+    value = str(value).strip()
+    if value.lower().endswith(".pdf"):
+        value = os.path.splitext(os.path.basename(value))[0]
+    return value
+
+# =========================
+# STATE STORE (SQLITE, ONE ROW PER PHASE + DOCUMENT)
+# =========================
+
+class StateStore:
+    def __init__(self, path=STATE_DB):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+
+        # WAL: each commit is one append to the log, readers never block
+        # the writer, and a crashed process loses nothing it committed.
+        # synchronous=NORMAL batches the fsyncs: commits are not synced one
+        # by one, the log is synced at each checkpoint (~1000 pages). A
+        # power cut can drop the last commits, never corrupt the database.
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+    def phase(self, name, key, artifact=None):
+        return PhaseTable(self, name, key, artifact)
+
+    def manifest(self):
+        return PdfManifest(self)
+
+    def windows(self):
+        return WindowLog(self)
+
+    def watermarks(self):
+        return Watermarks(self)
+
+    def schedule(self):
+        return CaseSchedule(self)
+
+    def document(self, key):
+        # Cross-phase view of one document: {phase: (status, updated_at, artifact)}
+        rows = self.db.execute(
+            "SELECT phase, status, updated_at, artifact FROM records WHERE key = ?",
+            (document_key(key),)
+        )
+        return {r["phase"]: (r["status"], r["updated_at"], r["artifact"]) for r in rows}
+
+    def summary(self):
+        rows = self.db.execute(
+            "SELECT phase, status, COUNT(*) AS n FROM records GROUP BY phase, status ORDER BY phase"
+        )
+        return [(r["phase"], r["status"], r["n"]) for r in rows]
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =========================
+# PER-PHASE TABLE (DROP-IN FOR THE OLD RESULT FILES)
+# =========================
+
+class PhaseTable:
+    def __init__(self, store, name, key, artifact=None):
+        self.store = store
+        self.db = store.db
+        self.name = name
+        self.key = key              # record field holding the document key
+        self.artifact = artifact    # record field holding the output file, if any
+
+    # -------------------------
+    # LOOKUPS (INDEXED)
+    # -------------------------
+
+    def __contains__(self, key):
+        # Only successful records count as done; failures are retried
+        return self.status(key) == DONE
+
+    def __len__(self):
+        return self.db.execute(
+            "SELECT COUNT(*) FROM records WHERE phase = ? AND status = ?",
+            (self.name, DONE)
+        ).fetchone()[0]
+
+    def status(self, key):
+        row = self.db.execute(
+            "SELECT status FROM records WHERE phase = ? AND key = ?",
+            (self.name, document_key(key))
+        ).fetchone()
+        return row["status"] if row else None
+
+    def get(self, key, default=None):
+        row = self.db.execute(
+            "SELECT data FROM records WHERE phase = ? AND key = ?",
+            (self.name, document_key(key))
+        ).fetchone()
+        return json.loads(row["data"]) if row else default
+
+    def values(self, status=DONE):
+        rows = self.db.execute(
+            "SELECT data FROM records WHERE phase = ? AND status = ? ORDER BY rowid",
+            (self.name, status)
+        )
+        return [json.loads(r["data"]) for r in rows]
+
+    # -------------------------
+    # WRITES
+    # -------------------------
+
+    def upsert(self, key, record, status=DONE, artifact=""):
+        stamp = now()
+        self.db.execute(
+            "INSERT INTO records (phase, key, status, artifact, data, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (phase, key) DO UPDATE SET "
+            "status = excluded.status, artifact = excluded.artifact, "
+            "data = excluded.data, updated_at = excluded.updated_at",
+            (self.name, document_key(key), status, artifact or "",
+             json.dumps(record), stamp, stamp)
+        )
+
+    def append(self, record, status=DONE):
+        artifact = record.get(self.artifact, "") if self.artifact else ""
+        self.upsert(record[self.key], record, status, artifact)
+        self.db.commit()
+
+    def fail(self, key, error):
+        # Keep an earlier success; otherwise remember why this one failed
+        if key in self:
+            return
+        self.upsert(key, {self.key: key, "Error": str(error)}, FAILED)
+        self.db.commit()
+
+    def forget(self, key):
+        self.db.execute(
+            "DELETE FROM records WHERE phase = ? AND key = ?", (self.name, document_key(key))
+        )
+        self.db.commit()
+
+    # -------------------------
+    # ONE-TIME IMPORT OF EXISTING OUTPUTS
+    # -------------------------
+
+    def seed(self, *paths):
+        # Imports each CSV / JSON file once; later files win on the
+        # same key, so list them oldest first
+        total = 0
+
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+
+            source = os.path.abspath(path)
+            if self.db.execute("SELECT 1 FROM imports WHERE source = ?", (source,)).fetchone():
+                continue
+
+            count = 0
+            with self.db:
+                for row in read_rows(path):
+                    if not row.get(self.key):
+                        continue
+                    artifact = row.get(self.artifact, "") if self.artifact else ""
+                    self.upsert(row[self.key], row, DONE, artifact)
+                    count += 1
+
+                self.mark_imported(path, count)
+            total += count
+
+        return total
+
+    def mark_imported(self, path, rows):
+        self.db.execute(
+            "INSERT OR REPLACE INTO imports (source, phase, rows, imported_at) VALUES (?, ?, ?, ?)",
+            (os.path.abspath(path), self.name, rows, now())
+        )
+
+    # -------------------------
+    # EXPORT (CSV / JSON ARE GENERATED FROM THE STORE)
+    # -------------------------
+
+    def fieldnames(self, records):
+        names = {}
+        for record in records:
+            names.update(dict.fromkeys(record))
+        return list(names)
+
+    def export_csv(self, csv_path, records, fieldnames=None):
+        tmp = csv_path + ".tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(
+                f, fieldnames=fieldnames or self.fieldnames(records),
+                restval="", extrasaction="ignore"
+            )
+            writer.writeheader()
+            writer.writerows(records)
+        os.replace(tmp, csv_path)
+
+    def export_json(self, json_path, records, indent=4):
+        tmp = json_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=indent)
+        os.replace(tmp, json_path)
+
+    def export(self, csv_path, json_path, fieldnames=None, indent=4):
+        """Rebuild a phase's CSV and JSON outputs from its done records.
+
+        The store is the source of truth; every phase calls this once at
+        the end of a run instead of rewriting its files per record. The
+        written files are marked as imported, so seed() never reads them
+        back.
+        """
+        records = self.values()
+        self.export_csv(csv_path, records, fieldnames)
+        self.export_json(json_path, records, indent)
+
+        with self.db:
+            self.mark_imported(csv_path, len(records))
+            self.mark_imported(json_path, len(records))
+
+
+# =========================
+# PDF MANIFEST (SIZE, SHA-256, PAGE COUNT, HTTP VALIDATORS)
+# =========================
+
+MANIFEST_FIELDS = ("key", "path", "url", "size", "sha256", "pages", "etag", "last_modified", "verified_at")
+
+
+class PdfManifest:
+    def __init__(self, store):
+        self.db = store.db
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key):
+        row = self.db.execute(
+            "SELECT * FROM manifest WHERE key = ?", (document_key(key),)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def all(self):
+        # One query for phase 3: {document key: entry}
+        return {r["key"]: dict(r) for r in self.db.execute("SELECT * FROM manifest")}
+
+    def put(self, entry):
+        entry = {f: entry.get(f) or "" for f in MANIFEST_FIELDS}
+        entry["key"] = document_key(entry["key"])
+        entry["size"] = int(entry["size"] or 0)
+        entry["pages"] = int(entry["pages"] or 0)
+        entry["verified_at"] = entry["verified_at"] or now()
+
+        self.db.execute(
+            f"INSERT OR REPLACE INTO manifest ({', '.join(MANIFEST_FIELDS)}) "
+            f"VALUES ({', '.join('?' * len(MANIFEST_FIELDS))})",
+            [entry[f] for f in MANIFEST_FIELDS]
+        )
+        self.db.commit()
+        return entry
+
+
+# =========================
+# PHASE 1 SEARCH WINDOWS (COMPLETION + LAST-PAGE CHECKPOINTS)
+# =========================
+
+class WindowLog:
+    # A window is (document type, from date, to date) as typed into the form
+    def __init__(self, store):
+        self.db = store.db
+
+    def get(self, window):
+        row = self.db.execute(
+            "SELECT * FROM windows WHERE doc_type = ? AND from_date = ? AND to_date = ?", window
+        ).fetchone()
+        return dict(row) if row else None
+
+    def done(self, window):
+        state = self.get(window)
+        return bool(state) and state["status"] == DONE
+
+    def save(self, window, **fields):
+        state = self.get(window) or {"status": "running", "last_page": 0, "next_url": "", "rows": 0, "error": ""}
+        state.update(fields)
+        self.db.execute(
+            "INSERT OR REPLACE INTO windows "
+            "(doc_type, from_date, to_date, status, last_page, next_url, rows, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*window, state["status"], state["last_page"], state["next_url"],
+             state["rows"], state["error"], now())
+        )
+        self.db.commit()
+
+    def page_done(self, window, page_no, next_url, new_rows):
+        state = self.get(window)
+        rows = (state["rows"] if state else 0) + new_rows
+        self.save(window, status="running", last_page=page_no, next_url=next_url or "", rows=rows)
+
+    def complete(self, window):
+        self.save(window, status=DONE, next_url="", error="")
+
+    def fail(self, window, error):
+        self.save(window, status=FAILED, error=str(error))
+
+    def summary(self):
+        rows = self.db.execute(
+            "SELECT status, COUNT(*) AS n, SUM(rows) AS docs FROM windows GROUP BY status"
+        )
+        return {r["status"]: (r["n"], r["docs"] or 0) for r in rows}
+
+
+# =========================
+# PHASE 4 RECHECK SCHEDULE (ONE ROW PER CASE)
+# =========================
+
+SCHEDULE_FIELDS = ("status", "fingerprint", "interval_days", "terminal", "checked_at", "changed_at", "next_due")
+
+
+class CaseSchedule:
+    def __init__(self, store):
+        self.db = store.db
+
+    def get(self, key):
+        row = self.db.execute("SELECT * FROM schedule WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def save(self, key, **fields):
+        state = self.get(key) or {
+            "status": "", "fingerprint": "", "interval_days": 0, "terminal": 0,
+            "checked_at": "", "changed_at": "", "next_due": "",
+        }
+        state.update(fields)
+        self.db.execute(
+            f"INSERT OR REPLACE INTO schedule (key, {', '.join(SCHEDULE_FIELDS)}, updated_at) "
+            f"VALUES ({', '.join('?' * (len(SCHEDULE_FIELDS) + 2))})",
+            (key, *(state[f] for f in SCHEDULE_FIELDS), now())
+        )
+        self.db.commit()
+        return state
+
+    def due(self, keys, at):
+        # Never-checked cases first, then the most active (shortest
+        # interval), then the longest overdue; terminal cases never
+        known = {
+            r["key"]: (r["terminal"], r["interval_days"], r["next_due"])
+            for r in self.db.execute("SELECT key, terminal, interval_days, next_due FROM schedule")
+        }
+        new = [k for k in keys if k not in known]
+        due = [k for k in keys if k in known and not known[k][0] and known[k][2] <= at]
+        due.sort(key=lambda k: (known[k][1], known[k][2]))
+        return new + due
+
+    def is_due(self, key, at):
+        # One case (streaming pipeline): a primary-key lookup, not a table scan
+        row = self.db.execute(
+            "SELECT terminal, next_due FROM schedule WHERE key = ?", (key,)
+        ).fetchone()
+        return row is None or (not row["terminal"] and row["next_due"] <= at)
+
+    def summary(self, at):
+        row = self.db.execute(
+            "SELECT SUM(terminal = 1) AS terminal, "
+            "SUM(terminal = 0 AND next_due <= ?) AS due, "
+            "SUM(terminal = 0 AND next_due > ?) AS waiting FROM schedule",
+            (at, at)
+        ).fetchone()
+        return {k: row[k] or 0 for k in ("terminal", "due", "waiting")}
+
+
+# =========================
+# PHASE 1 HIGH-WATER MARKS (LATEST RECORDED DATE PER DOCUMENT TYPE)
+# =========================
+
+class Watermarks:
+    def __init__(self, store):
+        self.db = store.db
+
+    def get(self, doc_type):
+        row = self.db.execute(
+            "SELECT recorded_date FROM watermarks WHERE doc_type = ?", (doc_type,)
+        ).fetchone()
+        return datetime.fromisoformat(row["recorded_date"]) if row else None
+
+    def advance(self, doc_type, recorded_date):
+        # Only ever moves forward; returns the mark now in effect
+        current = self.get(doc_type)
+        if current and current >= recorded_date:
+            return current
+
+        self.db.execute(
+            "INSERT OR REPLACE INTO watermarks (doc_type, recorded_date, updated_at) VALUES (?, ?, ?)",
+            (doc_type, recorded_date.date().isoformat(), now())
+        )
+        self.db.commit()
+        return recorded_date
+
+    def all(self):
+        rows = self.db.execute("SELECT doc_type, recorded_date FROM watermarks ORDER BY doc_type")
+        return {r["doc_type"]: r["recorded_date"] for r in rows}
+
+
+def read_rows(path):
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+    else:
+        try:
+            with open(path, encoding="utf-8") as f:
+                yield from json.load(f)
+        except ValueError:
+            return
+
+
+# =========================
+# ENTRY POINT (STATUS REPORT)
+# =========================
+
+if __name__ == "__main__":
+    import sys
+
+    with StateStore() as store:
+        if len(sys.argv) > 1:
+            for doc in sys.argv[1:]:
+                print(f"📄 {doc}: {store.document(doc) or 'not found'}")
+        else:
+            for phase, status, n in store.summary():
+                print(f"{phase:8} {status:8} {n}")
+            for doc_type, recorded_date in store.watermarks().all().items():
+                print(f"watermark {doc_type}: {recorded_date}")
@@ -0,0 +1,291 @@
+import os
+import time
+import asyncio
+from datetime import datetime
+
+import phase1_scraper as phase1
+import phase2_scraper as phase2
+import phase3_results as phase3
+import phase4_results as phase4
+from browser_pool import browser_pool
+from crs_http import CrsClient
+from pdf_downloader import PdfDownloader, DOWNLOAD_WORKERS
+from rate_limit import HostRateLimiter, Throughput
+from state_store import StateStore
+
+# =========================
+# CONFIG
+# =========================
+# All four phases in one process, connected by bounded queues: a document
+# found by phase 1 is fetched by phase 2 right away, its PDF is OCR'd as
+# soon as it is on disk and its case is checked as soon as it is extracted.
+# A full queue makes the phase in front of it wait (backpressure).
+
+QUEUE_SIZE = 50     # items waiting between two phases
+
+STAGES = {
+    "search": phase1.CONTEXTS,       # phase 1 date windows in parallel
+    "views": phase2.PAGES,           # phase 2 view page workers
+    "downloads": DOWNLOAD_WORKERS,   # phase 2 PDF downloads
+    "ocr": phase3.OCR_WORKERS,       # phase 3 OCR processes
+    "cases": phase4.CONTEXTS,        # phase 4 browser contexts
+}
+
+# =========================
+# STREAMING RUN
+# =========================
+
+class StreamRun:
+    def __init__(self, store, stages, queue_size=QUEUE_SIZE, doc_types=phase1.DOC_TYPES,
+                 engine=phase1.ENGINE, rate=phase1.RATE_PER_HOST, case_rate=phase4.RATE):
+        self.store = store
+        self.stages = stages
+        self.doc_types = doc_types
+        self.engine = engine
+        self.case_rate = case_rate
+
+        # Phases 1 and 2 hit the same CRS host: one politeness budget
+        self.crs = HostRateLimiter(rate, burst=stages["views"])
+
+        self.seen_docs = phase1.load_existing_docs(store)
+        self.completed_docs = phase2.load_completed_docs(store)
+        self.manifest = store.manifest()
+        self.views = phase2.ViewCache(store)
+        self.ocr_journal = phase3.open_journal(store)
+        self.case_journal = phase4.init_files(store)
+        self.dockets = phase4.open_dockets(store)
+        self.schedule = store.schedule()
+
+        # Phase 3 runs in a thread; it reads this snapshot of the PDF
+        # manifest, updated by phase 2 before a PDF is handed over
+        self.known = self.manifest.all()
+
+        self.view_queue = asyncio.Queue(queue_size)
+        self.pdf_feed = phase3.PdfFeed(maxsize=queue_size)
+        self.case_queue = asyncio.Queue(queue_size)
+        self.cases_closed = False   # every case and worker sentinel is queued
+
+        self.queued_pdfs = set()
+        self.queued_cases = set()
+        self.ocr_results = []
+        self.start = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    # -------------------------
+    # HAND-OFFS BETWEEN PHASES
+    # -------------------------
+
+    async def to_views(self, row):
+        if row.get("View URL"):
+            await self.view_queue.put(row)
+
+    async def to_ocr(self, pdf_file):
+        if pdf_file in self.queued_pdfs or pdf_file in self.ocr_journal:
+            return
+        self.queued_pdfs.add(pdf_file)
+        await asyncio.to_thread(self.pdf_feed.put, pdf_file)
+
+    async def to_cases(self, row):
+        case_number = str(row.get("Case Number") or "").strip()
+        if not case_number or case_number in self.queued_cases:
+            return
+        # Only cases the recheck schedule says are due (new ones always are)
+        if not self.schedule.is_due(case_number, datetime.now().date().isoformat()):
+            return
+        self.queued_cases.add(case_number)
+        await self.case_queue.put(row)
+
+    # -------------------------
+    # PHASE 1: SEARCH
+    # -------------------------
+
+    async def search(self):
+        watermarks = self.store.watermarks()
+        today = datetime.today()
+        todo = [
+            w for doc_type in self.doc_types
+            for w in phase1.incremental_windows(doc_type, watermarks, self.seen_docs, today)
+        ]
+
+        try:
+            finished = await phase1.scrape_windows(
+                self.seen_docs, self.store.windows(), todo, self.stages["search"],
+                self.engine, sink=self.to_views, limiter=self.crs
+            )
+            phase1.advance_watermarks(watermarks, todo, finished)
+        except Exception as e:
+            print(f"🔥 Search stopped: {e}")
+
+        print(f"🔎 Phase 1 finished after {self.elapsed():.0f}s")
+
+    # -------------------------
+    # PHASE 2: VIEW PAGES + PDFs
+    # -------------------------
+
+    async def fetch(self):
+        meter = Throughput()
+        saved, failed = phase2.record_callbacks(self.completed_docs, self.views, self.crs, meter)
+
+        async def saved_and_forward(data):
+            saved(data)
+            if data["PDF Path"]:
+                key = data["Document Number"]
+                self.known[key] = self.manifest.get(key)
+                await self.to_ocr(os.path.basename(data["PDF Path"]))
+
+        downloader = PdfDownloader(
+            self.crs, self.manifest, saved_and_forward, failed, workers=self.stages["downloads"]
+        )
+        downloader.start()
+
+        fallback, challenges = [], {"streak": 0}
+        clients = [CrsClient(phase2.BASE_URL, self.crs) for _ in range(self.stages["views"])]
+        workers = [
+            asyncio.create_task(phase2.http_worker(
+                c, self.view_queue, downloader, self.views, fallback, challenges
+            ))
+            for c in clients
+        ]
+
+        try:
+            # Earlier runs' leftovers and phase 1's new documents share the queue
+            await asyncio.gather(self.search(), self.pending_views(downloader))
+            await self.view_queue.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            for c in clients:
+                c.close()
+
+        try:
+            if fallback:
+                print(f"🧭 Opening the browser for {len(fallback)} view pages")
+                await phase2.browser_batch(fallback, self.crs, self.stages["views"], downloader, self.views)
+        except Exception as e:
+            print(f"🔥 Browser fallback stopped, {len(fallback)} records left for the next run: {e}")
+
+        try:
+            await downloader.drain()
+        finally:
+            await downloader.close()
+
+        meter.report(self.crs, final=True)
+
+    async def pending_views(self, downloader):
+        for record in self.seen_docs.values():
+            key = record["Document Number"]
+            if not record.get("View URL") or key in self.completed_docs or key in downloader:
+                continue
+
+            cached = self.views.get(key)
+            if cached:
+                await phase2.hand_off(record, *cached, downloader)
+            else:
+                await self.view_queue.put(record)
+
+    # -------------------------
+    # PHASE 3: OCR (WORKER PROCESSES, SCHEDULER IN A THREAD)
+    # -------------------------
+
+    def ocr_thread(self, loop):
+        def on_result(result):
+            # Back on the event loop: the state store lives there, and a
+            # full case queue holds the OCR scheduler (backpressure)
+            asyncio.run_coroutine_threadsafe(self.ocr_done(result), loop).result()
+
+        try:
+            phase3.ocr_pdfs_parallel(
+                self.pdf_feed, self.stages["ocr"], on_result,
+                phase3.ocr_settings(), phase3.OcrCache(), self.known
+            )
+        finally:
+            self.pdf_feed.stop()   # nobody reads any more; don't hold up phase 2
+
+    async def ocr_done(self, result):
+        self.ocr_results.append(result)
+        if not phase3.save_result(self.ocr_journal, result):
+            return
+        print(f"✅ Done: {result['Source PDF']} → {result['Case Number']} "
+              f"({result['Text Source']}, {result['OCR Passes']} passes)")
+        await self.to_cases(result)
+
+    async def pending_pdfs(self):
+        for pdf in sorted(os.listdir(phase3.PDF_DIR)):
+            if pdf.lower().endswith(".pdf"):
+                await self.to_ocr(pdf)
+
+    # -------------------------
+    # PHASE 4: CASE CHECKS
+    # -------------------------
+
+    async def check(self):
+        try:
+            await phase4.check_queue(
+                self.case_queue, self.case_journal, self.dockets, self.schedule,
+                self.stages["cases"], self.case_rate
+            )
+        except Exception as e:
+            # Unchecked cases keep their schedule and are due next run
+            print(f"🔥 Case checks stopped: {e}")
+            # Keep taking cases so producers never block on a full queue.
+            # run() queues one None per worker, and some may be left: drain
+            # until all of them are in, not up to the first one
+            while not (self.cases_closed and self.case_queue.empty()):
+                await self.case_queue.get()
+
+    async def due_cases(self):
+        for row in phase4.due_cases(phase4.load_cases(self.store), self.schedule):
+            await self.to_cases(row)
+
+    # -------------------------
+    # ALL PHASES
+    # -------------------------
+
+    async def run(self):
+        print(f"🌊 Streaming pipeline: {self.stages}, queues of {self.view_queue.maxsize}")
+
+        ocr = asyncio.create_task(asyncio.to_thread(self.ocr_thread, asyncio.get_running_loop()))
+        check = asyncio.create_task(self.check())
+
+        try:
+            await asyncio.gather(self.fetch(), self.pending_pdfs(), self.due_cases())
+        finally:
+            # Upstream is done: let each downstream phase finish its queue
+            await asyncio.to_thread(self.pdf_feed.close)
+            await ocr
+            phase3.print_summary(self.ocr_results)
+
+            for _ in range(self.stages["cases"]):
+                await self.case_queue.put(None)
+            self.cases_closed = True
+            await check
+
+        print(f"⏱ All phases finished after {self.elapsed():.0f}s")
+
+    def export(self):
+        # CSV/JSON exports, as each phase script writes them
+        phase1.export_results(self.seen_docs)
+        phase2.export_results(self.completed_docs)
+        phase3.export_results(self.ocr_journal)
+        phase4.export_results(self.case_journal)
+
+
+def run_stream(stages=None, queue_size=QUEUE_SIZE, doc_types=phase1.DOC_TYPES, engine=phase1.ENGINE):
+    stages = dict(STAGES, **(stages or {}))
+    store = StateStore()
+
+    async def main():
+        stream = StreamRun(store, stages, queue_size, doc_types, engine)
+        try:
+            # Phase 1/2 fallbacks and phase 4 share one browser pool
+            async with browser_pool():
+                await stream.run()
+        finally:
+            stream.export()
+
+    try:
+        asyncio.run(main())
+    finally:
+        store.close()
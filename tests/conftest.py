@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The pipeline is a set of top-level scripts; make them importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
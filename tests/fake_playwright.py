@@ -0,0 +1,316 @@
+import sys
+import json
+import types
+import shutil
+import subprocess
+from contextlib import asynccontextmanager
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+
+from dom_extract import NEXT_PAGE_SELECTOR, parse_search_form
+
+# =========================
+# FAKE PLAYWRIGHT (NO BROWSER)
+# =========================
+# Just enough of playwright.async_api for the phases.
+#   Site      phase 4: goto, fill, a click inside expect_navigation,
+#             evaluate and inner_text. Every navigation gets the next
+#             scripted status (200 once the script runs out) and the
+#             docket rows of the case number filled in last.
+#   HttpSite  phase 1 against a real HTTP server (the fixture server):
+#             the search form is submitted as a browser would, and the
+#             page scripts run under Node against the innerText a browser
+#             renders for the page.
+
+
+class Site:
+    def __init__(self, dockets=None, statuses=(), retry_after=None):
+        self.dockets = dockets or {}
+        self.statuses = list(statuses)
+        self.retry_after = retry_after
+        self.navigations = []
+        self.contexts = 0
+        self.closed = 0
+
+    def respond(self, what):
+        self.navigations.append(what)
+        status = self.statuses.pop(0) if self.statuses else 200
+        headers = {"retry-after": self.retry_after} if self.retry_after is not None else {}
+        return Response(status, headers)
+
+    def new_page(self):
+        return Page(self)
+
+
+class Response:
+    def __init__(self, status, headers):
+        self.status = status
+        self.headers = headers
+
+    async def header_value(self, name):
+        return self.headers.get(name)
+
+
+class Navigation:
+    def __init__(self):
+        self.response = None
+
+    @property
+    async def value(self):
+        return self.response
+
+
+class Page:
+    def __init__(self, site):
+        self.site = site
+        self.fields = {}
+        self.navigation = None
+
+    async def goto(self, url, timeout=None):
+        return self.site.respond(("goto", url))
+
+    async def fill(self, selector, value):
+        self.fields[selector] = value
+
+    @asynccontextmanager
+    async def expect_navigation(self, timeout=None):
+        self.navigation = Navigation()
+        yield self.navigation
+        self.navigation = None
+
+    async def click(self, selector):
+        response = self.site.respond(("click", selector))
+        if self.navigation is not None:
+            self.navigation.response = response
+
+    async def wait_for_load_state(self, state=None):
+        pass
+
+    async def evaluate(self, script):
+        case_number = self.fields.get("#MainContent_txtCaseNumber")
+        return self.site.dockets.get(case_number, [])
+
+    async def inner_text(self, selector):
+        return ""
+
+
+class Context:
+    def __init__(self, site):
+        self.site = site
+        site.contexts += 1
+
+    async def new_page(self):
+        return self.site.new_page()
+
+    async def close(self):
+        self.site.closed += 1
+
+
+class Browser:
+    def __init__(self, site):
+        self.site = site
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        return Context(self.site)
+
+    async def close(self):
+        self.connected = False
+
+
+class Chromium:
+    def __init__(self, site):
+        self.site = site
+
+    async def launch(self, **options):
+        return Browser(self.site)
+
+
+class Playwright:
+    def __init__(self, site):
+        self.chromium = Chromium(site)
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+def install(monkeypatch, site):
+    # browser_pool imports playwright.async_api lazily; this is what it gets
+    api = types.ModuleType("playwright.async_api")
+    api.async_playwright = lambda: Playwright(site)
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+    monkeypatch.setitem(sys.modules, "playwright.async_api", api)
+
+
+# =========================
+# PAGE SCRIPTS UNDER NODE
+# =========================
+# A stand-in document answering the selectors dom_extract's scripts use:
+#   {"rows": [[{"text", "href"}, ...], ...], "next": href or null,
+#    "text": {selector: innerText}, "iframe": src}
+
+DOCUMENT_JS = """
+const el = (text, attrs = {}, children = {}) => ({
+    innerText: text,
+    getAttribute: name => name in attrs ? attrs[name] : null,
+    querySelector: sel => children[sel] || null,
+    querySelectorAll: sel => children[sel + "*"] || [],
+});
+const dom = %s;
+const link = href => href === null ? null : el("", {href});
+const document = {
+    querySelectorAll: sel => sel === "table tbody tr" ? (dom.rows || []).map(row =>
+        el("", {}, {"td*": row.map(c => el(c.text, {}, {a: link(c.href)}))})) : [],
+    querySelector: sel => {
+        if (sel === "iframe#iframe") return dom.iframe ? el("", {src: dom.iframe}) : null;
+        if (sel.startsWith("li.PagedList-skipToNext")) return link(dom.next ?? null);
+        return sel in (dom.text || {}) ? el(dom.text[sel]) : null;
+    },
+};
+console.log(JSON.stringify((%s)()));
+"""
+
+
+def node():
+    return shutil.which("node")
+
+
+def run_script(script, dom):
+    out = subprocess.run(
+        [node(), "-e", DOCUMENT_JS % (json.dumps(dom), script)],
+        capture_output=True, text=True, check=True, timeout=30,
+    ).stdout
+    return json.loads(out)
+
+
+class InnerText(HTMLParser):
+    # Results-page cells as a browser renders them: source whitespace
+    # collapsed, <br> as a line break
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.next = None
+        self.in_tbody = False
+        self.cell = None
+        self.pager = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "tbody":
+            self.in_tbody = True
+        elif tag == "tr" and self.in_tbody:
+            self.rows.append([])
+        elif tag == "td" and self.in_tbody and self.rows:
+            self.cell = {"lines": [[]], "href": None}
+            self.rows[-1].append(self.cell)
+        elif tag == "br" and self.cell is not None:
+            self.cell["lines"].append([])
+        elif tag == "a":
+            if self.cell is not None and self.cell["href"] is None:
+                self.cell["href"] = attrs.get("href") or ""
+            if self.pager and attrs.get("rel") == "next":
+                self.next = attrs.get("href") or ""
+        elif tag == "li":
+            self.pager = "PagedList-skipToNext" in (attrs.get("class") or "")
+
+    def handle_endtag(self, tag):
+        if tag == "tbody":
+            self.in_tbody = False
+        elif tag == "td":
+            self.cell = None
+        elif tag == "li":
+            self.pager = False
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell["lines"][-1].append(data)
+
+    def dom(self):
+        rows = [
+            [{"text": "\n".join(" ".join("".join(line).split()) for line in c["lines"]).strip(),
+              "href": c["href"]} for c in row]
+            for row in self.rows
+        ]
+        return {"rows": rows, "next": self.next}
+
+
+def rendered(html):
+    parser = InnerText()
+    parser.feed(html)
+    parser.close()
+    return parser.dom()
+
+
+class HttpSite:
+    def __init__(self):
+        self.contexts = 0
+        self.closed = 0
+
+    def new_page(self):
+        return HttpPage()
+
+
+class Element:
+    async def scroll_into_view_if_needed(self):
+        pass
+
+    async def click(self):
+        pass
+
+
+class HttpPage:
+    def __init__(self):
+        self.http = requests.Session()
+        self.url = ""
+        self.html = ""
+        self.form = None
+
+    def load(self, response):
+        response.raise_for_status()
+        self.url, self.html = response.url, response.text
+        self.form = parse_search_form(self.html, "DocumentType") or self.form
+
+    async def goto(self, url, timeout=None):
+        self.load(self.http.get(url))
+
+    async def click(self, selector):
+        if selector == NEXT_PAGE_SELECTOR:
+            self.load(self.http.get(urljoin(self.url, rendered(self.html)["next"])))
+        elif "submit" in selector:
+            fields = dict(self.form["fields"])
+            if self.form["submit"]:
+                fields[self.form["submit"][0]] = self.form["submit"][1]
+            self.load(self.http.request(self.form["method"], urljoin(self.url, self.form["action"]), data=fields))
+
+    def field(self, selector):
+        return self.form["ids"][selector.split("#")[-1]]
+
+    async def select_option(self, selector, label):
+        name = self.field(selector)
+        self.form["fields"][name] = self.form["options"][name][label]
+
+    async def fill(self, selector, value):
+        self.form["fields"][self.field(selector)] = value
+
+    async def query_selector(self, selector):
+        return Element()
+
+    async def wait_for_selector(self, selector, timeout=None):
+        pass
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+    async def evaluate(self, script):
+        return run_script(script, rendered(self.html))
+
+    async def close(self):
+        self.http.close()
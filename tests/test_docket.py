@@ -0,0 +1,69 @@
+from docket import (
+    EventMatcher, normalize, parse_docket, latest_event, last_in_text,
+    pack_docket, unpack_docket,
+)
+
+EVENTS = ["Judgment of Foreclosure", "Dismissed", "Voluntary Dismissal", "Sheriff’s Sale Approved"]
+MATCHER = EventMatcher(EVENTS)
+
+
+def test_normalize():
+    assert normalize("  Sheriff’s   sale\napproved ") == "SHERIFF'S SALE APPROVED"
+
+
+def test_parse_docket_skips_rows_without_a_date():
+    rows = [
+        ["Date", "Event", "Description"],
+        ["1/5/2026", "Judgment  of Foreclosure", "for\nplaintiff", "Judge A"],
+        ["", "03/02/2026", "Dismissed"],
+        ["04/01/2026"],
+    ]
+    assert parse_docket(rows) == [
+        ("2026-01-05", "Judgment of Foreclosure", "for plaintiff Judge A"),
+        ("2026-03-02", "Dismissed", ""),
+    ]
+
+
+def test_matcher_finds_overlapping_events():
+    names = sorted(name for _, name in MATCHER.find("voluntary   DISMISSAL; case dismissed"))
+    assert names == ["Dismissed", "Voluntary Dismissal"]
+    assert [name for _, name in MATCHER.find("Sheriff's Sale Approved")] == ["Sheriff’s Sale Approved"]
+    assert MATCHER.find("Motion to continue") == []
+
+
+def test_latest_event_wins_over_earlier_ones():
+    docket = [
+        ("2026-01-05", "Judgment of Foreclosure", ""),
+        ("2026-03-02", "Order", "Case dismissed"),
+        ("2026-04-01", "Motion", "Motion to continue"),
+    ]
+    assert latest_event(docket, MATCHER) == ("2026-03-02", "Dismissed")
+    assert latest_event(list(reversed(docket)), MATCHER) == ("2026-03-02", "Dismissed")
+    assert latest_event(docket[2:], MATCHER) is None
+
+
+def test_same_day_entries_keep_page_order():
+    ascending = [
+        ("2026-03-02", "Judgment of Foreclosure", ""),
+        ("2026-03-02", "Dismissed", ""),
+    ]
+    descending = [
+        ("2026-04-01", "Motion", ""),
+        ("2026-03-02", "Dismissed", ""),
+        ("2026-03-02", "Judgment of Foreclosure", ""),
+    ]
+    assert latest_event(ascending, MATCHER)[1] == "Dismissed"
+    assert latest_event(descending, MATCHER)[1] == "Dismissed"
+
+
+def test_last_in_text():
+    assert last_in_text("Dismissed ... Judgment of Foreclosure entered", MATCHER) == (
+        "", "Judgment of Foreclosure"
+    )
+    assert last_in_text("nothing here", MATCHER) is None
+
+
+def test_pack_round_trip():
+    docket = [("2026-01-05", "Judgment of Foreclosure", "for plaintiff")]
+    assert unpack_docket(pack_docket(docket)) == docket
+    assert unpack_docket("") == []
@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+from dom_extract import (
+    RESULT_PAGE_JS, VIEW_PAGE_JS, parse_result_page, parse_view_page, parse_search_form, result_row,
+)
+from fake_playwright import node, run_script, rendered
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_result_page_fixture():
+    page = parse_result_page(fixture("crs_results.html"))
+    assert len(page["rows"]) == 50
+    assert page["has_next"] and page["next_href"] == "/Search/Result?page=2"
+
+    row = result_row(page["rows"][0], "https://crs.example")
+    assert row[1] == "https://crs.example/Document/Detail?dId=1973060&hId=H000"
+    assert row[2] == "24447712782"
+    assert row[5] == "LIS PENDENS FORECLOSURE"
+
+
+def test_result_page_last_page():
+    html = """
+    <table><tbody>
+      <tr><td></td><td><a href="/Document/Detail?dId=1">View</a></td><td>  2401 <br> 000001 </td></tr>
+    </tbody></table>
+    <ul><li class="PagedList-skipToNext disabled"><a>Next</a></li></ul>
+    """
+    page = parse_result_page(html)
+    assert page["rows"] == [[
+        {"text": "", "href": ""},
+        {"text": "View", "href": "/Document/Detail?dId=1"},
+        {"text": "2401 000001", "href": ""},
+    ]]
+    assert not page["has_next"] and page["next_href"] == ""
+
+
+def test_view_page_fixture():
+    assert parse_view_page(fixture("crs_view.html")) == {
+        "doc_number": "2401234567",
+        "doc_type": "LIS PENDENS FORECLOSURE",
+        "date_recorded": "01/16/2024",
+        "address": "1234 W EXAMPLE AVE CHICAGO IL 60614",
+        "pdf_src": "/Document/ViewPdf?dId=1234567&page=1",
+    }
+
+
+def test_view_page_missing_parts():
+    assert parse_view_page("<html><body>Not found</body></html>") == {
+        "doc_number": "", "doc_type": "", "date_recorded": "", "address": "", "pdf_src": "",
+    }
+
+
+def test_search_form():
+    html = """
+    <form action="/Account/Login" method="post"><input name="User"></form>
+    <form action="/Search/Result" method="post">
+      <input type="hidden" name="SearchType" value="DocumentType">
+      <select id="DocumentType" name="DocumentType">
+        <option value="">-- Select --
+        <option value="LP">LIS PENDENS FORECLOSURE
+        <option value="MTG" selected>MORTGAGE
+      </select>
+      <input type="checkbox" name="Exact" value="1">
+      <input type="text" id="RecordedFromDate" name="RecordedFromDate">
+      <input type="submit" name="Search" value="Search">
+      <input type="submit" name="Reset" value="Reset">
+    </form>
+    """
+    form = parse_search_form(html, "DocumentType")
+    assert form["action"] == "/Search/Result" and form["method"] == "POST"
+    assert form["fields"] == {"SearchType": "DocumentType", "DocumentType": "MTG", "RecordedFromDate": ""}
+    assert form["options"]["DocumentType"]["LIS PENDENS FORECLOSURE"] == "LP"
+    assert form["ids"]["RecordedFromDate"] == "RecordedFromDate"
+    assert form["submit"] == ("Search", "Search")
+    assert parse_search_form(html, "Missing") is None
+
+
+# =========================
+# BROWSER SCRIPTS VS PARSERS
+# =========================
+# The page scripts run under Node against a stand-in document whose
+# innerText values are what a browser renders for the same HTML (<br> as a
+# line break, other whitespace collapsed). Both engines must write the same
+# cells, or phase 1's CSV and dedup keys depend on the engine.
+
+# Cell like the fixture server's: <span>pin</span><br />address
+RESULTS_HTML = """
+<table><tbody>
+  <tr>
+    <td>1</td>
+    <td><a href="/Document/Detail?dId=1">View</a></td>
+    <td>  2401
+        000001 </td>
+    <td><span class="parcel">17-01-100-001</span><br />123 N MAIN ST</td>
+  </tr>
+</tbody></table>
+<ul><li class="PagedList-skipToNext"><a rel="next" href="/Search/Result?page=2">Next</a></li></ul>
+"""
+RESULTS_INNER_TEXT = [["1", "View", "2401 000001", "17-01-100-001\n123 N MAIN ST"]]
+
+VIEW_HTML = """
+<div id="divcol1"><table><tbody>
+  <tr><td>2401000001</td></tr>
+  <tr><td>LIS PENDENS<br>FORECLOSURE</td></tr>
+  <tr><td>01/16/2024</td></tr>
+  <tr><td></td></tr>
+  <tr><td></td></tr>
+  <tr><td><span>123 N MAIN ST<br>CHICAGO IL 60601</span></td></tr>
+</tbody></table></div>
+<iframe id="iframe" src="/Document/ViewPdf?dId=1"></iframe>
+"""
+VIEW_INNER_TEXT = {
+    "#divcol1 table tbody tr:nth-child(1) td": "2401000001",
+    "#divcol1 table tbody tr:nth-child(2) td": "LIS PENDENS\nFORECLOSURE",
+    "#divcol1 table tbody tr:nth-child(3) td": "01/16/2024",
+    "#divcol1 table tbody tr:nth-child(6) td span": "123 N MAIN ST\nCHICAGO IL 60601",
+}
+
+def run_in_node(script, dom):
+    if not node():
+        pytest.skip("needs Node.js")
+    return run_script(script, dom)
+
+
+def test_result_page_engines_agree():
+    hrefs = [None, "/Document/Detail?dId=1", None, None]
+    dom = {
+        "rows": [[{"text": t, "href": h} for t, h in zip(row, hrefs)] for row in RESULTS_INNER_TEXT],
+        "next": "/Search/Result?page=2",
+    }
+    assert rendered(RESULTS_HTML) == dom    # the emulator fake_playwright uses
+    browser = run_in_node(RESULT_PAGE_JS, dom)
+    assert browser == parse_result_page(RESULTS_HTML)
+    assert browser["rows"][0][3]["text"] == "17-01-100-001 123 N MAIN ST"
+
+
+def test_view_page_engines_agree():
+    dom = {"text": VIEW_INNER_TEXT, "iframe": "/Document/ViewPdf?dId=1"}
+    browser = run_in_node(VIEW_PAGE_JS, dom)
+    assert browser == parse_view_page(VIEW_HTML)
+    assert browser["address"] == "123 N MAIN ST CHICAGO IL 60601"
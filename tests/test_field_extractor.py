@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+from field_extractor import extract_fields, extract_amount, extract_address, scan_fields
+
+CORPUS = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "extract_corpus.jsonl")
+
+with open(CORPUS, encoding="utf-8") as f:
+    SAMPLES = [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("sample", SAMPLES, ids=[s["id"] for s in SAMPLES])
+def test_corpus(sample):
+    fields = extract_fields(sample["text"])
+    for field, expected in sample["expected"].items():
+        assert fields[field][0] == expected
+
+
+def test_empty_text():
+    assert extract_fields("") == {"case": ("", 0.0), "amount": ("", 0.0), "address": ("", 0.0)}
+
+
+def test_labelled_amount_beats_bare_amount():
+    text = "ORIGINAL PRINCIPAL $150,000.00 AMOUNT CLAIMED: $143,221.55"
+    assert extract_amount(text) == ("$143,221.55", 0.9)
+    assert extract_amount("ORIGINAL PRINCIPAL $150,000.00") == ("$150,000.00", 0.85)
+
+
+def test_overlapping_fields():
+    # Normalization joins the amount's cents to the house number
+    text = "TOTAL AMOUNT $12,345.00123 MAIN ST, CHICAGO, IL 60601"
+    assert extract_amount(text)[0] == "$12,345.00"
+    assert extract_address(text)[0] == "00123 MAIN ST, CHICAGO, IL 60601"
+
+
+def test_innermost_address_wins():
+    text = "07007 LIS PENDENS COMMON ADDRESS 15 N TESTING CT, CHICAGO, IL 60601"
+    assert extract_address(text)[0] == "15 N TESTING CT, CHICAGO, IL 60601"
+
+
+def test_case_number_separators_removed():
+    case = [c for c in scan_fields("NO. 24-CH-05678") if c.field == "case"]
+    assert [c.value for c in case] == ["24CH05678"]
+
+
+@pytest.mark.parametrize("text, address", [
+    # A case-number lookalike at the same digit must not hide the address
+    ("10 E 12 WAY CHICAGO IL 60601", "10 E 12 WAY CHICAGO IL 60601"),
+    # Grid address: the number after the direction is part of it
+    ("20 W 1000 N ST CHICAGO IL 60601", "20 W 1000 N ST CHICAGO IL 60601"),
+])
+def test_address_next_to_case_lookalike(text, address):
+    assert extract_address(text) == (address, 0.9)
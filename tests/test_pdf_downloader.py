@@ -0,0 +1,158 @@
+import os
+import re
+import socket
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import pdf_downloader
+from pdf_downloader import CHUNK_SIZE, make_session, fetch_pdf
+from rate_limit import HostRateLimiter
+
+# Bigger than a few read chunks, so a cut connection leaves a partial file
+BODY = b"%PDF-1.4\n" + b"% padding\n" * (CHUNK_SIZE // 2) + b"%%EOF\n"
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jul 2026 00:00:00 GMT"
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Serves BODY like a real server (Range, If-Range, If-None-Match) unless
+    # the next scripted action says otherwise:
+    #   cut          headers for the whole body, then the connection drops
+    #   truncated    a complete response for a body without %%EOF
+    #   ignore_range 200 with the whole body, whatever the request said
+    #   416          range not satisfiable
+    def do_GET(self):
+        self.server.seen.append(dict(self.headers))
+        action = self.server.actions.pop(0) if self.server.actions else ""
+
+        if action == "416":
+            return self.reply(416, b"")
+        if action == "cut":
+            return self.reply(200, BODY, cut_at=3 * CHUNK_SIZE + 100)
+        if action == "truncated":
+            return self.reply(200, BODY[:-len(b"%%EOF\n")], length=len(BODY[:-6]))
+        if action == "ignore_range":
+            return self.reply(200, BODY)
+
+        if self.headers.get("If-None-Match") == ETAG:
+            return self.reply(304, b"")
+
+        m = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+        if m and self.headers.get("If-Range", ETAG) == ETAG:
+            start = int(m.group(1))
+            return self.reply(206, BODY[start:], content_range=f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        self.reply(200, BODY)
+
+    def reply(self, status, body, cut_at=None, length=None, content_range=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(length if length is not None else len(body)))
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+        if cut_at is None:
+            self.wfile.write(body)
+            return
+        self.wfile.write(body[:cut_at])
+        self.wfile.flush()
+        self.connection.shutdown(socket.SHUT_RDWR)
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(pdf_downloader.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(pdf_downloader, "count_pages", lambda path: 1)   # no Poppler
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.seen, httpd.actions = [], []
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/doc.pdf"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fetch(server, path, known=None):
+    session = make_session(1)
+    try:
+        return fetch_pdf(session, server.url, str(path), HostRateLimiter(1000), known)
+    finally:
+        session.close()
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_plain_download(server, tmp_path):
+    entry = fetch(server, tmp_path / "doc.pdf")
+    assert read(tmp_path / "doc.pdf") == BODY
+    assert entry["size"] == len(BODY) and entry["pages"] == 1
+    assert entry["etag"] == ETAG and entry["last_modified"] == LAST_MODIFIED
+    assert not os.path.exists(tmp_path / "doc.pdf.part")
+
+
+def test_resumes_after_a_cut_connection(server, tmp_path):
+    server.actions = ["cut"]
+    fetch(server, tmp_path / "doc.pdf")
+
+    assert read(tmp_path / "doc.pdf") == BODY
+    first, second = server.seen
+    assert "Range" not in first
+    offset = int(re.match(r"bytes=(\d+)-$", second["Range"]).group(1))
+    assert CHUNK_SIZE <= offset < len(BODY)
+    assert second["If-Range"] == ETAG
+
+
+def test_server_ignoring_the_range_starts_over(server, tmp_path):
+    server.actions = ["cut", "ignore_range"]
+    fetch(server, tmp_path / "doc.pdf")
+
+    assert "Range" in server.seen[1]
+    assert read(tmp_path / "doc.pdf") == BODY
+
+
+def test_part_longer_than_the_document(server, tmp_path):
+    # 416: the partial file is thrown away and the next attempt starts over
+    with open(tmp_path / "doc.pdf.part", "wb") as f:
+        f.write(BODY + b"stale")
+    server.actions = ["416"]
+    fetch(server, tmp_path / "doc.pdf")
+
+    assert "Range" in server.seen[0] and "Range" not in server.seen[1]
+    assert read(tmp_path / "doc.pdf") == BODY
+
+
+def test_missing_eof_is_resumed(server, tmp_path):
+    server.actions = ["truncated"]
+    fetch(server, tmp_path / "doc.pdf")
+
+    assert server.seen[1]["Range"] == f"bytes={len(BODY) - 6}-"
+    assert read(tmp_path / "doc.pdf") == BODY
+
+
+def test_unchanged_file_is_kept(server, tmp_path):
+    known = fetch(server, tmp_path / "doc.pdf")
+    entry = fetch(server, tmp_path / "doc.pdf", known)
+
+    assert server.seen[1]["If-None-Match"] == ETAG
+    assert server.seen[1]["If-Modified-Since"] == LAST_MODIFIED
+    assert entry["sha256"] == known["sha256"] and entry["verified_at"] == ""
+    assert len(server.seen) == 2
+
+
+def test_gives_up_after_retries(server, tmp_path):
+    server.actions = ["truncated"] * 3
+    assert fetch(server, tmp_path / "doc.pdf") is None
+    assert not os.path.exists(tmp_path / "doc.pdf")
@@ -0,0 +1,153 @@
+import os
+import sys
+import csv
+from datetime import datetime
+
+import pytest
+
+import phase1_scraper as p1
+from fake_playwright import HttpSite, node, install
+from state_store import StateStore
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from fixture_server import PAGE_SIZE, start_server  # noqa: E402
+
+LP = "LIS PENDENS FORECLOSURE"
+ML = "MECHANICS LIEN"
+
+
+@pytest.fixture
+def store(tmp_path):
+    with StateStore(str(tmp_path / "state.db")) as store:
+        yield store
+
+
+def test_month_windows_newest_first_clipped_to_start():
+    windows = list(p1.month_windows(LP, datetime(2024, 1, 15), datetime(2024, 3, 10)))
+    assert windows == [
+        (LP, "03/01/2024", "03/31/2024"),
+        (LP, "02/01/2024", "02/29/2024"),
+        (LP, "01/15/2024", "01/31/2024"),
+    ]
+
+
+def test_parse_recorded():
+    assert p1.parse_recorded("03/02/2024 10:15 AM") == datetime(2024, 3, 2)
+    assert p1.parse_recorded("") is None
+    assert p1.parse_recorded("not a date") is None
+
+
+def test_daily_run_is_one_window_with_overlap(store):
+    marks = store.watermarks()
+    marks.advance(LP, datetime(2024, 3, 20))
+
+    windows = p1.incremental_windows(LP, marks, store.phase("phase1", key="Document Number"),
+                                     datetime(2024, 3, 21))
+    # OVERLAP_DAYS behind the mark: late recordings are picked up
+    assert windows == [(LP, "03/13/2024", "03/21/2024")]
+
+
+def test_long_gap_is_split_into_months(store):
+    marks = store.watermarks()
+    marks.advance(LP, datetime(2024, 1, 20))
+
+    windows = p1.incremental_windows(LP, marks, store.phase("phase1", key="Document Number"),
+                                     datetime(2024, 3, 5))
+    assert windows == [
+        (LP, "03/01/2024", "03/31/2024"),
+        (LP, "02/01/2024", "02/29/2024"),
+        (LP, "01/13/2024", "01/31/2024"),
+    ]
+
+
+def test_no_watermark(store, monkeypatch):
+    monkeypatch.setattr(p1, "BACKFILL_START", datetime(2024, 2, 1))
+    seen_docs = store.phase("phase1", key="Document Number")
+
+    # Nothing stored: from the backfill start
+    windows = p1.incremental_windows(ML, store.watermarks(), seen_docs, datetime(2024, 3, 5))
+    assert [w[1] for w in windows] == ["03/01/2024", "02/01/2024"]
+
+    # Stored before watermarks existed: from the latest recorded date of the type
+    seen_docs.append({"Document Number": "1", "Recorded Date": "03/01/2024", "Document Type": ML})
+    seen_docs.append({"Document Number": "2", "Recorded Date": "03/04/2024", "Document Type": LP})
+    windows = p1.incremental_windows(ML, store.watermarks(), seen_docs, datetime(2024, 3, 5))
+    assert windows == [(ML, "02/23/2024", "03/05/2024")]
+
+
+def test_watermark_advances_to_latest_finished_date(store):
+    marks = store.watermarks()
+    todo = [(LP, "03/01/2024", "03/31/2024"), (LP, "02/01/2024", "02/29/2024")]
+    finished = {todo[0]: datetime(2024, 3, 4), todo[1]: datetime(2024, 2, 28)}
+
+    p1.advance_watermarks(marks, todo, finished)
+    assert marks.get(LP) == datetime(2024, 3, 4)
+
+
+def test_failed_window_blocks_its_type_only(store):
+    marks = store.watermarks()
+    marks.advance(LP, datetime(2024, 2, 1))
+    todo = [
+        (LP, "03/01/2024", "03/31/2024"),
+        (LP, "02/01/2024", "02/29/2024"),
+        (ML, "03/01/2024", "03/31/2024"),
+    ]
+    # The February LP window failed: its documents may still be missing
+    finished = {todo[0]: datetime(2024, 3, 4), todo[2]: datetime(2024, 3, 3)}
+
+    p1.advance_watermarks(marks, todo, finished)
+    assert marks.get(LP) == datetime(2024, 2, 1)
+    assert marks.get(ML) == datetime(2024, 3, 3)
+
+
+def test_empty_windows_leave_the_mark(store):
+    marks = store.watermarks()
+    marks.advance(LP, datetime(2024, 2, 1))
+    todo = [(LP, "02/25/2024", "03/05/2024")]
+
+    p1.advance_watermarks(marks, todo, {todo[0]: None})
+    assert marks.get(LP) == datetime(2024, 2, 1)
+
+
+# =========================
+# ENGINE PARITY (FIXTURE SERVER)
+# =========================
+# Both engines against the offline CRS fixture: the browser engine drives
+# the search form through fake_playwright and runs RESULT_PAGE_JS under
+# Node, so the same documents must come out as the same CSV rows.
+
+@pytest.fixture
+def crs(monkeypatch):
+    server = start_server()
+    monkeypatch.setattr(p1, "BASE_URL", server.base_url)
+    monkeypatch.setattr(p1, "SEARCH_URL", server.base_url + "/Search")
+    monkeypatch.setattr(p1, "RATE_PER_HOST", 1000.0)
+    install(monkeypatch, HttpSite())
+    yield server
+    server.shutdown()
+
+
+def backfill(engine, tmp_path, monkeypatch):
+    workdir = tmp_path / engine
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    # Last month and this one: a few result pages per window
+    today = datetime.today()
+    start = datetime(today.year - (today.month == 1), (today.month - 2) % 12 + 1, 1)
+    p1.run_backfill([LP], start, 2, engine)
+
+    with open(workdir / p1.CSV_FILE, newline="", encoding="utf-8") as f:
+        return sorted(tuple(row) for row in csv.reader(f))
+
+
+def test_engines_write_the_same_rows(crs, tmp_path, monkeypatch):
+    if not node():
+        pytest.skip("needs Node.js")
+
+    http_rows = backfill("http", tmp_path, monkeypatch)
+    browser_rows = backfill("browser", tmp_path, monkeypatch)
+
+    assert len(http_rows) > 2 * PAGE_SIZE    # header plus several pages
+    assert browser_rows == http_rows
+    # Parcel and address cell: <br /> in the HTML, one line in the CSV
+    assert not any("\n" in cell for row in http_rows for cell in row)
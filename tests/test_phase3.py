@@ -0,0 +1,147 @@
+import os
+
+import pytest
+
+import phase3_results as p3
+from state_store import StateStore
+
+NOTICE = (
+    "IN THE CIRCUIT COURT OF COOK COUNTY\n"
+    "CASE NO. 2026-CH-04217\n"
+    "PROPERTY ADDRESS: 123 N MAIN ST, CHICAGO, IL 60601\n"
+)
+AMOUNT = "AMOUNT CLAIMED: $123,456.78\n"
+
+# Read every page, so the cached text is the whole document
+SETTINGS = p3.ocr_settings(early_stop=False)
+
+
+@pytest.fixture
+def pdfs(tmp_path, monkeypatch):
+    # Two-page PDFs: page 1 has a text layer, page 2 is a scan. No Poppler
+    # or Tesseract: page counts, text layers and OCR are stubbed.
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(p3.PDF_DIR)
+    ocr = {"calls": [], "pages": {2: AMOUNT}, "fail": set()}
+
+    def ocr_page(pdf_path, page_no, dpi, variants):
+        ocr["calls"].append((os.path.basename(pdf_path), page_no, dpi))
+        if page_no in ocr["fail"]:
+            raise RuntimeError("tesseract crashed")
+        return ocr["pages"].get(page_no, ""), 0.5, {"dpi": dpi, "render": 0.1, "passes": []}
+
+    monkeypatch.setattr(p3, "count_pages", lambda path: 2)
+    monkeypatch.setattr(p3, "extract_text_layer", lambda path, n: [NOTICE, ""][:n])
+    monkeypatch.setattr(p3, "ocr_page", ocr_page)
+
+    for name in ("1.pdf", "2.pdf"):
+        with open(os.path.join(p3.PDF_DIR, name), "wb") as f:
+            f.write(b"%PDF-1.4 " + name.encode())
+    return ocr
+
+
+def test_cache_key_covers_content_and_settings(tmp_path):
+    cache = p3.OcrCache(str(tmp_path / "cache"))
+    key = cache.key("abc", SETTINGS)
+    assert key == cache.key("abc", p3.ocr_settings(early_stop=False))
+    assert key != cache.key("abd", SETTINGS)
+    assert key != cache.key("abc", p3.ocr_settings(early_stop=True))
+    assert key != cache.key("abc", p3.ocr_settings([(300, ("plain",))], early_stop=False))
+
+
+def test_cached_text_skips_ocr(pdfs):
+    cache = p3.OcrCache()
+    first = p3.process_pdf("1.pdf", SETTINGS, cache)
+    assert first["Amount (USD)"] == "$123,456.78"
+    assert first["Text Source"] == "mixed" and not first["From Cache"]
+    assert len(pdfs["calls"]) == 1
+
+    again = p3.process_pdf("1.pdf", SETTINGS, cache)
+    assert again["From Cache"] and len(pdfs["calls"]) == 1
+    assert again["Case Number"] == first["Case Number"]
+
+    # Other OCR settings: not served from this entry
+    p3.process_pdf("1.pdf", p3.ocr_settings([(300, ("plain",))], early_stop=False), cache)
+    assert len(pdfs["calls"]) == 2
+
+
+def test_failed_page_is_not_cached(pdfs):
+    cache = p3.OcrCache()
+    pdfs["fail"].add(2)
+
+    result = p3.process_pdf("1.pdf", SETTINGS, cache)
+    assert result["Error"] == "OCR failed: tesseract crashed"
+    assert cache.entries() == []
+
+    pdfs["fail"].clear()
+    assert not p3.process_pdf("1.pdf", SETTINGS, cache).get("Error")
+    assert len(cache.entries()) == 1
+
+
+def test_empty_entry_is_ignored(pdfs):
+    # Left by an older version that cached PDFs it could not read
+    cache = p3.OcrCache()
+    job = p3.PdfJob(os.path.join(p3.PDF_DIR, "1.pdf"), 0, SETTINGS)
+    job.content_hash = p3.file_sha256(job.pdf_path)
+    cache.put(job)
+
+    result = p3.process_pdf("1.pdf", SETTINGS, cache)
+    assert not result["From Cache"] and result["Amount (USD)"] == "$123,456.78"
+
+
+def test_eviction_drops_least_recently_used(pdfs):
+    cache = p3.OcrCache()
+    p3.process_pdf("1.pdf", SETTINGS, cache)
+    p3.process_pdf("2.pdf", SETTINGS, cache)
+    first, second = sorted(cache.entries(), key=os.path.getmtime)
+    os.utime(first, (1, 1))
+    os.utime(second, (2, 2))
+
+    cache.get(p3.file_sha256(os.path.join(p3.PDF_DIR, "1.pdf")), SETTINGS)   # 1.pdf used again
+    cache.max_bytes = cache.size - 1
+    cache.evict()
+
+    assert cache.entries() == [first]
+    assert cache.size == os.path.getsize(first)
+
+
+def test_reextract_uses_cached_text_only(pdfs, tmp_path):
+    cache = p3.OcrCache()
+    p3.process_pdf("1.pdf", SETTINGS, cache)
+    calls = len(pdfs["calls"])
+
+    with StateStore(str(tmp_path / "state.db")) as store:
+        journal = p3.open_journal(store)
+        # Any OCR settings will do for re-extraction
+        p3.reextract_all(journal, cache, p3.ocr_settings([(400, ("plain",))]))
+
+        assert len(pdfs["calls"]) == calls
+        assert journal.get("1.pdf")["Amount (USD)"] == "$123,456.78"
+        assert "2.pdf" not in journal    # never OCR'd: nothing to re-extract
+
+
+
+def test_reextract_skips_early_stopped_entries(pdfs, tmp_path, monkeypatch):
+    # Page 1 has every field, so early stop never reads page 2
+    monkeypatch.setattr(p3, "extract_text_layer", lambda path, n: [NOTICE + AMOUNT, ""][:n])
+    cache = p3.OcrCache()
+    early = p3.ocr_settings(early_stop=True)
+
+    assert p3.process_pdf("1.pdf", early, cache)["Amount (USD)"] == "$123,456.78"
+    assert pdfs["calls"] == []
+    assert p3.process_pdf("1.pdf", early, cache)["From Cache"]    # same settings: fine
+
+    with StateStore(str(tmp_path / "state.db")) as store:
+        journal = p3.open_journal(store)
+        p3.reextract_all(journal, cache)
+        assert "1.pdf" not in journal    # page 2 was never read
+
+        p3.process_pdf("1.pdf", SETTINGS, cache)    # --read-all-pages
+        p3.reextract_all(journal, cache)
+        assert journal.get("1.pdf")["Amount (USD)"] == "$123,456.78"
+
+
+def test_cache_key_covers_render_window(tmp_path):
+    # With early stop, the window decides which pages were read
+    cache = p3.OcrCache(str(tmp_path / "cache"))
+    assert cache.key("abc", p3.ocr_settings(window=1)) != cache.key("abc", p3.ocr_settings(window=4))
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from fake_playwright import Site, Page, install
+from rate_limit import HostRateLimiter
+from state_store import StateStore
+
+JUDGMENT = [["01/05/2026", "Judgment of Foreclosure", "Judgment for plaintiff"]]
+
+
+@pytest.fixture
+def phase4(monkeypatch):
+    import phase4_results
+    monkeypatch.setattr(phase4_results, "JITTER", (0, 0))
+    return phase4_results
+
+
+def check(phase4, site, limiter, case_number="2026CH00001"):
+    return asyncio.run(phase4.check_case(Page(site), case_number, limiter))
+
+
+def test_check_case_reads_the_docket(phase4):
+    site = Site({"2026CH00001": JUDGMENT})
+    limiter = HostRateLimiter(1000)
+
+    status, color, docket = check(phase4, site, limiter)
+
+    assert (status, color) == ("Judgment of Foreclosure", "GREEN")
+    assert docket == [("2026-01-05", "Judgment of Foreclosure", "Judgment for plaintiff")]
+    assert [what for what, _ in site.navigations] == ["goto", "click"]
+
+
+def test_no_docket_is_neutral(phase4):
+    status, color, _ = check(phase4, Site(), HostRateLimiter(1000))
+    assert (status, color) == ("No Judgment Found", "NEUTRAL")
+
+
+def test_429_on_the_search_page(phase4):
+    site = Site({"2026CH00001": JUDGMENT}, statuses=[429], retry_after="0")
+    limiter = HostRateLimiter(1000)
+
+    with pytest.raises(phase4.TooManyRequests):
+        check(phase4, site, limiter)
+    assert len(site.navigations) == 1
+    assert list(limiter.rates().values()) == [500]
+
+
+def test_429_on_the_postback(phase4):
+    site = Site({"2026CH00001": JUDGMENT}, statuses=[200, 429], retry_after="0")
+    limiter = HostRateLimiter(1000)
+
+    with pytest.raises(phase4.TooManyRequests):
+        check(phase4, site, limiter)
+    assert len(site.navigations) == 2
+    assert list(limiter.rates().values()) == [500]
+
+
+def test_failed_case_does_not_stop_the_worker(phase4, tmp_path, monkeypatch):
+    # One context: the first case is rate limited, the second is checked
+    # on a fresh context
+    site = Site({"2026CH00002": JUDGMENT}, statuses=[429], retry_after="0")
+    install(monkeypatch, site)
+    cases = [
+        {"Case Number": "2026CH00001", "Address": "1 MAIN ST"},
+        {"Case Number": "2026CH00002", "Address": "2 MAIN ST"},
+    ]
+
+    with StateStore(str(tmp_path / "state.db")) as store:
+        journal = phase4.init_files(store)
+        dockets = phase4.open_dockets(store)
+        schedule = store.schedule()
+        asyncio.run(phase4.check_cases(cases, journal, dockets, schedule, contexts=1, rate=1000))
+
+        assert "2026CH00001" not in journal
+        assert schedule.get("2026CH00001") is None    # still never checked
+        assert journal.get("2026CH00002")["Status"] == "Judgment of Foreclosure"
+        assert "2026CH00002" in dockets
+        assert schedule.get("2026CH00002")["terminal"] == 0
+
+    assert site.contexts == 2 and site.closed == 2
+
+
+def test_defer_keeps_never_checked_cases_first(phase4, tmp_path):
+    with StateStore(str(tmp_path / "state.db")) as store:
+        schedule = store.schedule()
+        phase4.reschedule(schedule, "2026CH00001", "No Judgment Found", [])
+        schedule.save("2026CH00001", next_due="2026-01-01")
+
+        phase4.defer(schedule, "2026CH00002")    # never checked
+        phase4.defer(schedule, "2026CH00001")    # checked before: tomorrow
+
+        assert schedule.get("2026CH00002") is None
+        assert schedule.get("2026CH00001")["next_due"] > "2026-01-01"
+        cases = [{"Case Number": "2026CH00001"}, {"Case Number": "2026CH00002"}]
+        assert [r["Case Number"] for r in phase4.due_cases(cases, schedule)] == ["2026CH00002"]
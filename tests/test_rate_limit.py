@@ -0,0 +1,58 @@
+import pytest
+
+import rate_limit
+from rate_limit import TokenBucket, HostRateLimiter, retry_after_seconds, RECOVER_AFTER
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Frozen monotonic clock, advanced by hand
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_wait(clock):
+    bucket = TokenBucket(rate=2, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)   # callers queue in arrival order
+
+    clock[0] += 10
+    assert bucket.reserve() == 0.0                  # refilled, capped at the burst
+
+
+def test_penalize_halves_rate_and_honours_retry_after(clock):
+    bucket = TokenBucket(rate=4, burst=4)
+    bucket.penalize(retry_after=3)
+    assert bucket.rate == 2
+    assert bucket.reserve() == pytest.approx(3.5)
+
+
+def test_recovers_towards_ceiling(clock):
+    bucket = TokenBucket(rate=10)
+    bucket.penalize()
+    for _ in range(RECOVER_AFTER):
+        bucket.success()
+    assert bucket.rate == pytest.approx(6)
+
+    for _ in range(RECOVER_AFTER * 10):
+        bucket.success()
+    assert bucket.rate == 10
+
+
+def test_one_bucket_per_host(clock):
+    limiter = HostRateLimiter(rate=1)
+    assert limiter.bucket("https://a.example/x") is limiter.bucket("https://a.example/y")
+    assert limiter.bucket("https://a.example/x") is not limiter.bucket("https://b.example/x")
+
+    assert limiter.penalize("https://a.example/x") == 0.5
+    assert limiter.rates() == {"a.example": 0.5, "b.example": 1}
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds("7") == 7.0
+    assert retry_after_seconds("-2") == 0.0
+    assert retry_after_seconds("Wed, 21 Oct 2026 07:28:00 GMT") is None
+    assert retry_after_seconds(None) is None
@@ -0,0 +1,112 @@
+import csv
+import json
+from datetime import datetime
+
+import pytest
+
+from state_store import StateStore, DONE, FAILED, document_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    with StateStore(str(tmp_path / "state.db")) as store:
+        yield store
+
+
+def test_document_key():
+    assert document_key("pdf/2412345678.pdf") == "2412345678"
+    assert document_key(" 2412345678 ") == "2412345678"
+
+
+def test_upsert_and_lookup(store):
+    docs = store.phase("phase2", key="Document Number", artifact="PDF Path")
+    docs.append({"Document Number": "1", "PDF Path": "pdf/1.pdf"})
+    docs.append({"Document Number": "1", "PDF Path": "pdf/1.pdf", "Pages": 2})
+
+    assert "1" in docs and "2" not in docs
+    assert len(docs) == 1
+    assert docs.get("1")["Pages"] == 2
+    assert store.document("1")["phase2"][0] == DONE
+    assert store.document("1")["phase2"][2] == "pdf/1.pdf"
+
+
+def test_fail_keeps_earlier_success(store):
+    docs = store.phase("phase3", key="Source PDF")
+    docs.fail("1.pdf", "boom")
+    assert docs.status("1") == FAILED
+    assert "1.pdf" not in docs
+
+    docs.append({"Source PDF": "1.pdf", "Case Number": "2024CH01234"})
+    docs.fail("1.pdf", "later failure")
+    assert docs.status("1") == DONE
+    assert docs.values(FAILED) == []
+
+
+def test_seed_imports_each_file_once(store, tmp_path):
+    path = tmp_path / "phase1_results.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["Document Number", "Doc Type"])
+        writer.writeheader()
+        writer.writerows([{"Document Number": "1", "Doc Type": "LP"}, {"Document Number": "", "Doc Type": "LP"}])
+
+    docs = store.phase("phase1", key="Document Number")
+    assert docs.seed(str(path), str(tmp_path / "missing.json")) == 1
+    assert docs.seed(str(path)) == 0
+    assert len(docs) == 1
+
+
+def test_export_is_not_imported_back(store, tmp_path):
+    cases = store.phase("phase4", key="Case Number")
+    cases.append({"Case Number": "2024CH01234", "Status": "Active"})
+    cases.fail("2024CH09999", "timeout")
+
+    csv_path, json_path = str(tmp_path / "out.csv"), str(tmp_path / "out.json")
+    cases.export(csv_path, json_path, fieldnames=["Case Number", "Status", "Color Tag"], indent=2)
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        assert list(csv.DictReader(f)) == [{"Case Number": "2024CH01234", "Status": "Active", "Color Tag": ""}]
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f) == [{"Case Number": "2024CH01234", "Status": "Active"}]
+
+    assert cases.seed(csv_path, json_path) == 0
+
+
+def test_manifest(store):
+    manifest = store.manifest()
+    entry = manifest.put({"key": "pdf/1.pdf", "path": "pdf/1.pdf", "size": "12345", "sha256": "ab"})
+    assert entry["key"] == "1" and entry["size"] == 12345 and entry["pages"] == 0
+    assert "1" in manifest
+    assert manifest.all()["1"]["sha256"] == "ab"
+
+
+def test_window_checkpoints(store):
+    windows = store.windows()
+    window = ("LIS PENDENS", "01/01/2026", "01/31/2026")
+    windows.page_done(window, 1, "?page=2", 25)
+    windows.page_done(window, 2, "?page=3", 25)
+    assert windows.get(window)["rows"] == 50
+    assert windows.get(window)["next_url"] == "?page=3"
+    assert not windows.done(window)
+
+    windows.complete(window)
+    assert windows.done(window)
+    assert windows.get(window)["next_url"] == ""
+
+
+def test_schedule_due(store):
+    schedule = store.schedule()
+    schedule.save("due", interval_days=7, next_due="2026-03-01")
+    schedule.save("busy", interval_days=1, next_due="2026-03-02")
+    schedule.save("later", interval_days=1, next_due="2026-04-01")
+    schedule.save("closed", terminal=1, next_due="2026-01-01")
+
+    keys = ["closed", "later", "due", "busy", "new"]
+    assert schedule.due(keys, "2026-03-15") == ["new", "busy", "due"]
+    assert [k for k in keys if schedule.is_due(k, "2026-03-15")] == ["due", "busy", "new"]
+
+
+def test_watermark_only_moves_forward(store):
+    marks = store.watermarks()
+    assert marks.advance("LP", datetime(2026, 3, 1)) == datetime(2026, 3, 1)
+    assert marks.advance("LP", datetime(2026, 2, 1)) == datetime(2026, 3, 1)
+    assert marks.get("LP") == datetime(2026, 3, 1)
@@ -0,0 +1,50 @@
+import asyncio
+import types
+
+import pytest
+
+
+@pytest.fixture
+def stream(tmp_path, monkeypatch):
+    # Phase 2 (imported by the pipeline) creates pdf/ in the working directory
+    monkeypatch.chdir(tmp_path)
+    import stream_pipeline
+    return stream_pipeline
+
+
+def test_failed_case_checks_do_not_block_the_run(stream, monkeypatch):
+    # Case checks die at once; run() still queues its cases and one None
+    # per worker through a one-slot queue, and must finish
+    async def check_queue(*args):
+        raise RuntimeError("browser gone")
+
+    monkeypatch.setattr(stream.phase4, "check_queue", check_queue)
+    monkeypatch.setattr(stream.phase3, "print_summary", lambda results: None)
+
+    async def main():
+        run = object.__new__(stream.StreamRun)
+        run.stages = {"cases": 3}
+        run.view_queue, run.case_queue = asyncio.Queue(1), asyncio.Queue(1)
+        run.cases_closed = False
+        run.queued_cases = set()
+        run.ocr_results = []
+        run.start = 0
+        run.case_journal = run.dockets = run.case_rate = None
+        run.schedule = types.SimpleNamespace(is_due=lambda case_number, today: True)
+        run.pdf_feed = types.SimpleNamespace(close=lambda: None)
+        run.ocr_thread = lambda loop: None
+
+        async def nothing():
+            pass
+
+        async def due_cases():
+            for n in range(1, 4):
+                await run.to_cases({"Case Number": f"2026CH0000{n}"})
+
+        run.fetch = run.pending_pdfs = nothing
+        run.due_cases = due_cases
+        await asyncio.wait_for(run.run(), timeout=5)
+        return run
+
+    run = asyncio.run(main())
+    assert run.cases_closed and run.case_queue.empty()